@@ -7,6 +7,9 @@ from typing import Dict, Any, List
 import json
 import logging
 from .base_agent import BaseAgent, AgentResult
+from llm_json import parse_llm_json, StructuredOutputError
+from llm_limiter import PRIORITY_SYNTHESIS
+from llm_router import CALL_SYNTHESIS
 
 logger = logging.getLogger(__name__)
 
@@ -114,18 +117,13 @@ Please synthesize this data and provide integrated insights.
 """}
             ]
             
-            response = await self.cerebras_service.generate_response(messages)
+            response = await self.cerebras_service.generate_response(
+                messages, priority=PRIORITY_SYNTHESIS, call_class=CALL_SYNTHESIS
+            )
             
             # Parse JSON response
             try:
-                if "```json" in response:
-                    json_str = response.split("```json")[1].split("```")[0].strip()
-                elif "```" in response:
-                    json_str = response.split("```")[1].split("```")[0].strip()
-                else:
-                    json_str = response.strip()
-                
-                synthesis = json.loads(json_str)
+                synthesis = parse_llm_json(response)
                 
                 # Validate and enhance synthesis
                 synthesis = self._validate_synthesis(synthesis, tool_results)
@@ -142,7 +140,7 @@ Please synthesize this data and provide integrated insights.
                     }
                 )
                 
-            except json.JSONDecodeError as e:
+            except StructuredOutputError as e:
                 logger.error(f"Failed to parse synthesis JSON: {e}, Response: {response}")
                 
                 # Fallback to simple synthesis
@@ -4,9 +4,10 @@ Analyzes incoming queries to determine complexity, required tools, and reasoning
 """
 
 from typing import Dict, Any, List
-import json
 import logging
 from .base_agent import BaseAgent, AgentResult
+from llm_json import parse_llm_json, StructuredOutputError
+from llm_router import CALL_ANALYSIS
 
 logger = logging.getLogger(__name__)
 
@@ -95,18 +96,11 @@ Examples of simple queries:
                 context_msg = f"Previous conversation context: {conversation_history[-2:]}"
                 messages.insert(-1, {"role": "system", "content": context_msg})
             
-            response = await self.cerebras_service.generate_response(messages)
+            response = await self.cerebras_service.generate_response(messages, call_class=CALL_ANALYSIS)
             
             # Parse JSON response
             try:
-                if "```json" in response:
-                    json_str = response.split("```json")[1].split("```")[0].strip()
-                elif "```" in response:
-                    json_str = response.split("```")[1].split("```")[0].strip()
-                else:
-                    json_str = response.strip()
-                
-                analysis = json.loads(json_str)
+                analysis = parse_llm_json(response)
                 
                 # Validate and enhance analysis
                 analysis = self._validate_and_enhance_analysis(analysis, user_message)
@@ -123,7 +117,7 @@ Examples of simple queries:
                     }
                 )
                 
-            except json.JSONDecodeError as e:
+            except StructuredOutputError as e:
                 logger.error(f"Failed to parse analysis JSON: {e}, Response: {response}")
                 
                 # Fallback to simple analysis
@@ -0,0 +1,223 @@
+"""
+Warm-Start Cache Preloading
+After a deploy every TTL cache is empty. The warmer runs once in the
+background at startup and, within a fixed time budget, restores the cached
+answers to recently repeated questions, prefetches crop prices for the most
+asked-about state/commodity pairs and hydrates the conversation caches of
+recently active users. It never blocks readiness.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+from language_id import detect_language
+from speculative_prefetch import ToolPreclassifier
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "conversation_id": 1, "role": 1, "content": 1,
+    "language": 1, "tools_used": 1, "reply_to": 1, "created_at": 1
+}
+
+
+class CacheWarmer:
+    """
+    Background warm-up of the response, tool-result and conversation caches
+
+    The caches themselves stay owned by the server; the warmer is handed the
+    functions that write to them.
+    """
+
+    def __init__(self, database,
+                 make_cache_key: Callable[[str, str, str], str],
+                 store_response: Callable[[str, Dict[str, Any], int], Awaitable[None]],
+                 store_conversation: Callable[[str, str, List[Dict]], Awaitable[None]],
+                 fetch_crop_price: Callable[[str, str, str], Awaitable[Dict[str, Any]]],
+                 time_budget: float = 20.0, lookback_hours: float = 6.0, scan_limit: int = 5000,
+                 top_queries: int = 200, top_price_pairs: int = 10, recent_conversations: int = 100,
+                 history_window: int = 6, response_ttl: int = 180, concurrency: int = 4):
+        self.database = database
+        self.make_cache_key = make_cache_key
+        self.store_response = store_response
+        self.store_conversation = store_conversation
+        self.fetch_crop_price = fetch_crop_price
+        self.time_budget = time_budget
+        self.lookback_hours = lookback_hours
+        self.scan_limit = scan_limit
+        self.top_queries = top_queries
+        self.top_price_pairs = top_price_pairs
+        self.recent_conversations = recent_conversations
+        self.history_window = history_window
+        self.response_ttl = response_ttl
+        self.concurrency = concurrency
+        self.preclassifier = ToolPreclassifier()
+
+        self._task: Optional[asyncio.Task] = None
+        self._deadline = 0.0
+        self.stats = {
+            "state": "idle",
+            "messages_scanned": 0,
+            "responses_warmed": 0,
+            "crop_prices_warmed": 0,
+            "conversations_warmed": 0,
+            "phases_skipped": [],
+            "duration": 0.0
+        }
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Schedule the warm-up; returns immediately"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _remaining(self) -> float:
+        return self._deadline - time.monotonic()
+
+    async def run(self):
+        started = time.monotonic()
+        self._deadline = started + self.time_budget
+        self.stats["state"] = "running"
+        try:
+            messages = await self._bounded(self._load_recent_messages(), "load_messages") or []
+            self.stats["messages_scanned"] = len(messages)
+
+            await self._bounded(self._warm_responses(messages), "responses")
+            await self._bounded(self._warm_crop_prices(messages), "crop_prices")
+            await self._bounded(self._warm_conversations(), "conversations")
+            self.stats["state"] = "done"
+        except asyncio.CancelledError:
+            self.stats["state"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.warning(f"Cache warm-up failed: {e}")
+            self.stats["state"] = "failed"
+        finally:
+            self.stats["duration"] = round(time.monotonic() - started, 3)
+            logger.info(f"Cache warm-up {self.stats['state']} in {self.stats['duration']}s: "
+                        f"{self.stats['responses_warmed']} responses, {self.stats['crop_prices_warmed']} prices, "
+                        f"{self.stats['conversations_warmed']} conversations")
+
+    async def _bounded(self, phase: Awaitable, name: str):
+        """Run a phase within what is left of the budget; a phase that runs out is abandoned"""
+        remaining = self._remaining()
+        if remaining <= 0:
+            self.stats["phases_skipped"].append(name)
+            phase.close()
+            return None
+        try:
+            return await asyncio.wait_for(phase, timeout=remaining)
+        except asyncio.TimeoutError:
+            self.stats["phases_skipped"].append(name)
+            return None
+
+    async def _load_recent_messages(self) -> List[Dict[str, Any]]:
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=self.lookback_hours)).isoformat()
+        return await self.database.chat_messages.find(
+            {"created_at": {"$gte": cutoff}}, MESSAGE_PROJECTION
+        ).sort("created_at", -1).limit(self.scan_limit).to_list(self.scan_limit)
+
+    async def _warm_responses(self, messages: List[Dict[str, Any]]):
+        """Re-cache stored answers to the questions asked most often
+
+        Answers come from chat_messages, so no LLM call is made. Only answers the
+        chat endpoint itself would cache (no tools, message longer than 10 chars)
+        are restored.
+        """
+        # Answers name their question in reply_to; older pairs shared a created_at
+        answers: Dict[Any, Dict[str, Any]] = {}
+        for msg in messages:
+            if msg.get("role") == "assistant":
+                answers[msg.get("reply_to") or (msg.get("conversation_id"), msg.get("created_at"))] = msg
+
+        # Newest first, so the first answer seen for a (user, question) pair is the latest
+        pairs: Dict[Tuple[str, str], Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        frequency = Counter()
+        for msg in messages:
+            content = msg.get("content") or ""
+            if msg.get("role") != "user" or len(content) <= 10:
+                continue
+            answer = answers.get(msg.get("id")) or answers.get((msg.get("conversation_id"), msg.get("created_at")))
+            if not answer or answer.get("tools_used"):
+                continue
+            normalized = content.lower().strip()
+            frequency[normalized] += 1
+            pairs.setdefault((msg["user_id"], normalized), (msg, answer))
+
+        top = {query for query, _ in frequency.most_common(self.top_queries)}
+        for (user_id, normalized), (question, answer) in pairs.items():
+            if normalized not in top:
+                continue
+            # The chat endpoint keys its cache by the locally identified language
+            await self.store_response(
+                self.make_cache_key(user_id, question["content"], detect_language(question["content"])),
+                {
+                    "message": answer["content"],
+                    "language": answer.get("language", "en"),
+                    "tools_used": [],
+                    "reasoning_steps": []
+                },
+                self.response_ttl
+            )
+            self.stats["responses_warmed"] += 1
+
+    async def _warm_crop_prices(self, messages: List[Dict[str, Any]]):
+        """Prefetch prices for the state/commodity pairs users ask about most"""
+        demand = Counter()
+        for msg in messages:
+            if msg.get("role") != "user":
+                continue
+            params = self.preclassifier.predict(msg.get("content") or "").get("crop_price")
+            if params:
+                demand[(params["state"], params["commodity"])] += 1
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prefetch(state: str, commodity: str):
+            async with semaphore:
+                result = await self.fetch_crop_price(state, commodity, "")
+                if not result.get("error"):
+                    self.stats["crop_prices_warmed"] += 1
+
+        await asyncio.gather(
+            *(prefetch(state, commodity) for (state, commodity), _ in demand.most_common(self.top_price_pairs)),
+            return_exceptions=True
+        )
+
+    async def _warm_conversations(self):
+        """Load the history window of the most recently active conversations"""
+        conversations = await self.database.conversations.find(
+            {}, {"_id": 0, "id": 1, "user_id": 1}
+        ).sort("updated_at", -1).limit(self.recent_conversations).to_list(self.recent_conversations)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def hydrate(conversation: Dict[str, Any]):
+            async with semaphore:
+                recent = await self.database.chat_messages.find(
+                    {"conversation_id": conversation["id"], "user_id": conversation["user_id"]},
+                    {"content": 1, "role": 1, "_id": 0}
+                ).sort("created_at", -1).limit(self.history_window).to_list(self.history_window)
+                history = [{"role": msg["role"], "content": msg["content"]} for msg in reversed(recent)]
+                await self.store_conversation(conversation["id"], conversation["user_id"], history)
+                self.stats["conversations_warmed"] += 1
+
+        await asyncio.gather(
+            *(hydrate(conversation) for conversation in conversations if conversation.get("id")),
+            return_exceptions=True
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, time_budget=self.time_budget)
@@ -0,0 +1,123 @@
+"""
+Chat History Storage Helpers
+Index definitions, server-side projections and keyset cursors for chat messages and conversations
+"""
+
+import base64
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# Compound indexes backing the history, conversation list and pipeline lookups.
+# Keyset pagination relies on (sort field, id) being the trailing index keys.
+# Unique ids keep the persistence queue's upserts idempotent across retries.
+CHAT_MESSAGE_INDEXES = [
+    ("user_conversation_created", [("user_id", ASCENDING), ("conversation_id", ASCENDING),
+                                   ("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("user_created", [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("message_id_unique", [("id", ASCENDING)], {"unique": True}),
+]
+
+CONVERSATION_INDEXES = [
+    ("user_updated", [("user_id", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("conversation_id_unique", [("id", ASCENDING)], {"unique": True}),
+]
+
+# Fields the history screen actually renders - reasoning_steps stays on the server
+MESSAGE_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "content": 1,
+    "role": 1,
+    "conversation_id": 1,
+    "language": 1,
+    "tools_used": 1,
+    "has_reasoning": 1,
+    "created_at": 1
+}
+
+CONVERSATION_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "last_message": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+MAX_PAGE_SIZE = 200
+
+
+async def ensure_chat_indexes(database) -> None:
+    """Create the chat collection indexes if they do not exist yet"""
+    for collection_name, indexes in (("chat_messages", CHAT_MESSAGE_INDEXES),
+                                     ("conversations", CONVERSATION_INDEXES)):
+        collection = getattr(database, collection_name)
+        for index_name, keys, options in indexes:
+            try:
+                await collection.create_index(keys, name=index_name, background=True, **options)
+            except Exception as e:
+                logger.warning(f"Could not ensure index {collection_name}.{index_name}: {e}")
+
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    """Encode the last seen (sort value, id) pair into an opaque cursor"""
+    raw = json.dumps([sort_value, doc_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode an opaque cursor, raising ValueError if it was tampered with"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+    if not isinstance(doc_id, str):
+        raise ValueError("Invalid cursor: malformed id")
+    return sort_value, doc_id
+
+
+def keyset_filter(sort_field: str, cursor: str) -> Dict[str, Any]:
+    """Build the filter selecting documents strictly after the cursor in descending order"""
+    sort_value, doc_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "id": {"$lt": doc_id}}
+        ]
+    }
+
+
+async def fetch_page(collection, query: Dict[str, Any], projection: Dict[str, Any],
+                     sort_field: str, limit: int,
+                     cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of documents newest-first using keyset pagination
+
+    Returns:
+        Tuple of (documents in descending order, cursor for the next page or None)
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    page_query = dict(query)
+    if cursor:
+        page_query.update(keyset_filter(sort_field, cursor))
+
+    # Fetch one extra document to know whether another page exists
+    documents = await collection.find(page_query, projection).sort(
+        [(sort_field, DESCENDING), ("id", DESCENDING)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last.get("id"))
+
+    return documents, next_cursor
@@ -0,0 +1,304 @@
+"""
+Write-Behind Persistence Queue for Chat Messages
+Coalesces message inserts, conversation creation and last_message updates
+from many requests into periodic bulk_write calls, and drains on shutdown.
+Every write is an upsert keyed on the document id, so retrying a partly
+applied batch never duplicates anything.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class ChatPersistenceQueue:
+    """
+    Buffers chat writes in memory and flushes them in batches
+
+    Conversation updates are coalesced per conversation so a burst of
+    messages in one thread costs a single update. Updates to conversations
+    created in the same batch are folded into the insert document.
+    """
+
+    def __init__(self, db, reasoning_store=None, flush_interval: float = 0.5,
+                 max_batch_size: int = 500, max_queue_size: int = 20000, max_retries: int = 5):
+        self.db = db
+        self.reasoning_store = reasoning_store
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+
+        self._messages: List[Dict[str, Any]] = []
+        self._traces: List[Dict[str, Any]] = []
+        self._new_conversations: Dict[str, Dict[str, Any]] = {}
+        self._conversation_updates: Dict[str, Dict[str, Any]] = {}
+        self._attempts: Dict[str, int] = {}  # document key -> failed writes so far
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        self.stats = {
+            "flushes": 0,
+            "messages_written": 0,
+            "conversation_ops_written": 0,
+            "traces_written": 0,
+            "write_ops": 0,
+            "failed_flushes": 0,
+            "dropped": 0,
+            "abandoned": 0,
+            "last_flush_duration": 0.0,
+            "max_depth_seen": 0
+        }
+
+    @property
+    def depth(self) -> int:
+        """Number of pending write operations"""
+        return (len(self._messages) + len(self._traces) +
+                len(self._new_conversations) + len(self._conversation_updates))
+
+    def start(self):
+        """Start the background flush loop"""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Chat persistence queue started (flush every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flush loop and drain everything still buffered"""
+        self._running = False
+        self._wakeup.set()
+        if self._task:
+            try:
+                await self._task
+            except Exception as e:
+                logger.error(f"Chat persistence loop ended with error: {e}")
+            self._task = None
+
+        # Drain until empty or a flush stops making progress
+        while self.depth:
+            before = self.depth
+            await self.flush()
+            if self.depth >= before:
+                logger.error(f"Chat persistence queue could not drain {self.depth} pending writes")
+                break
+        logger.info("Chat persistence queue drained")
+
+    def enqueue_conversation(self, conversation: Dict[str, Any]):
+        """Queue creation of a new conversation document"""
+        self._new_conversations[conversation["id"]] = conversation
+        self._after_enqueue()
+
+    def enqueue_messages(self, messages: List[Dict[str, Any]], conversation_update: Optional[Dict[str, Any]] = None,
+                         reasoning_steps: Optional[List[Dict[str, Any]]] = None):
+        """Queue a user/assistant message pair and the matching conversation update"""
+        if not messages:
+            return
+
+        conversation_id = messages[0]["conversation_id"]
+        user_id = messages[0]["user_id"]
+        self._messages.extend(messages)
+
+        if conversation_update:
+            if conversation_id in self._new_conversations:
+                self._new_conversations[conversation_id].update(conversation_update)
+            else:
+                self._conversation_updates[conversation_id] = conversation_update
+
+        if reasoning_steps and self.reasoning_store:
+            assistant = messages[-1]
+            self._traces.append(self.reasoning_store.build_document(
+                assistant["id"], user_id, conversation_id, reasoning_steps
+            ))
+
+        self._after_enqueue()
+
+    def _after_enqueue(self):
+        depth = self.depth
+        self.stats["max_depth_seen"] = max(self.stats["max_depth_seen"], depth)
+
+        if depth > self.max_queue_size:
+            # Shed the oldest writes rather than growing without bound, traces first
+            overflow = depth - self.max_queue_size
+            traces = min(overflow, len(self._traces))
+            del self._traces[:traces]
+            messages = min(overflow - traces, len(self._messages))
+            del self._messages[:messages]
+            self.stats["dropped"] += traces + messages
+            logger.error(f"Chat persistence queue overflow, dropped {traces} trace and {messages} message writes")
+
+        if depth >= self.max_batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self.depth:
+                await self.flush()
+
+    async def flush(self):
+        """Write everything currently buffered with one bulk_write per collection
+        
+        Writes that fail are re-queued individually, up to max_retries times.
+        """
+        async with self._flush_lock:
+            if not self.depth:
+                return
+
+            messages, self._messages = self._messages, []
+            traces, self._traces = self._traces, []
+            new_conversations, self._new_conversations = self._new_conversations, {}
+            updates, self._conversation_updates = self._conversation_updates, {}
+
+            start_time = time.time()
+            # None until that collection has been written
+            failed_conversations: Optional[Dict[str, Dict[str, Any]]] = None
+            failed_updates: Optional[Dict[str, Dict[str, Any]]] = None
+            failed_messages: Optional[List[Dict[str, Any]]] = None
+            failed_traces: Optional[List[Dict[str, Any]]] = None
+            try:
+                conversation_items = [("new", conversation_id, doc) for conversation_id, doc in new_conversations.items()]
+                conversation_items += [("update", conversation_id, fields) for conversation_id, fields in updates.items()]
+                conversation_ops = [
+                    UpdateOne({"id": conversation_id}, {"$set": self._without(doc, "id")}, upsert=True)
+                    if kind == "new" else UpdateOne({"id": conversation_id}, {"$set": doc})
+                    for kind, conversation_id, doc in conversation_items
+                ]
+                # Ordered so creations land before updates queued after a failed flush
+                failed = await self._bulk_write(self.db.conversations, conversation_ops, ordered=True)
+                failed_conversations, failed_updates = {}, {}
+                for index in failed:
+                    kind, conversation_id, doc = conversation_items[index]
+                    (failed_conversations if kind == "new" else failed_updates)[conversation_id] = doc
+                self.stats["conversation_ops_written"] += len(conversation_ops) - len(failed_conversations) - len(failed_updates)
+
+                message_ops = [
+                    UpdateOne({"id": message["id"]}, {"$setOnInsert": self._without(message, "id")}, upsert=True)
+                    for message in messages
+                ]
+                failed_messages = [messages[index] for index in await self._bulk_write(self.db.chat_messages, message_ops)]
+                self.stats["messages_written"] += len(messages) - len(failed_messages)
+
+                failed_traces = []
+                if traces:
+                    trace_ops = [
+                        UpdateOne({"message_id": trace["message_id"]},
+                                  {"$setOnInsert": self._without(trace, "message_id")}, upsert=True)
+                        for trace in traces
+                    ]
+                    failed_traces = [
+                        traces[index] for index in await self._bulk_write(self.reasoning_store.collection, trace_ops)
+                    ]
+                    self.stats["traces_written"] += len(traces) - len(failed_traces)
+
+                self.stats["flushes"] += 1
+
+            except Exception as e:
+                logger.error(f"Chat persistence flush failed, re-queueing unwritten batch: {e}")
+            finally:
+                self.stats["last_flush_duration"] = time.time() - start_time
+
+            # Collections not reached are retried whole; the upserts make that safe
+            if failed_conversations is None:
+                failed_conversations, failed_updates = new_conversations, updates
+            if failed_messages is None:
+                failed_messages = messages
+            if failed_traces is None:
+                failed_traces = traces
+            if self._attempts:
+                self._forget_attempts(messages, traces, new_conversations, updates, failed_messages,
+                                      failed_traces, failed_conversations, failed_updates)
+
+            if failed_conversations or failed_updates or failed_messages or failed_traces:
+                self.stats["failed_flushes"] += 1
+                self._requeue(failed_messages, failed_traces, failed_conversations, failed_updates)
+
+    async def _bulk_write(self, collection, ops: List[UpdateOne], ordered: bool = False) -> List[int]:
+        """Run ops, returning the indexes of those that did not apply
+        
+        A duplicate key means a concurrent upsert already wrote the document.
+        Errors other than per-op write errors propagate.
+        """
+        if not ops:
+            return []
+        try:
+            await collection.bulk_write(ops, ordered=ordered)
+            self.stats["write_ops"] += 1
+            return []
+        except BulkWriteError as e:
+            self.stats["write_ops"] += 1
+            errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in errors if error.get("code") != DUPLICATE_KEY}
+            if ordered and errors:
+                # An ordered batch stops at its first error
+                failed.update(range(errors[0]["index"] + 1, len(ops)))
+            if failed:
+                logger.warning(f"{len(failed)} chat persistence writes failed: {errors[0].get('errmsg')}")
+            return sorted(failed)
+
+    @staticmethod
+    def _without(document: Dict[str, Any], key: str) -> Dict[str, Any]:
+        return {field: value for field, value in document.items() if field != key}
+
+    def _retry_allowed(self, key: str) -> bool:
+        """Count a failed write; False once it has failed max_retries times"""
+        attempts = self._attempts.get(key, 0) + 1
+        if attempts > self.max_retries:
+            self._attempts.pop(key, None)
+            self.stats["abandoned"] += 1
+            logger.error(f"Giving up on chat persistence write {key} after {self.max_retries} retries")
+            return False
+        self._attempts[key] = attempts
+        return True
+
+    def _forget_attempts(self, messages, traces, new_conversations, updates, failed_messages,
+                         failed_traces, failed_conversations, failed_updates):
+        """Drop the retry counts of writes that have now gone through"""
+        failed = {id(doc) for doc in failed_messages + failed_traces}
+        for message in messages:
+            if id(message) not in failed:
+                self._attempts.pop(f"message:{message['id']}", None)
+        for trace in traces:
+            if id(trace) not in failed:
+                self._attempts.pop(f"trace:{trace['message_id']}", None)
+        for conversation_id in set(new_conversations) - set(failed_conversations):
+            self._attempts.pop(f"conversation:{conversation_id}", None)
+        for conversation_id in set(updates) - set(failed_updates):
+            self._attempts.pop(f"update:{conversation_id}", None)
+
+    def _requeue(self, messages, traces, new_conversations, updates):
+        """Put failed writes back in front of anything queued meanwhile"""
+        self._messages = [m for m in messages if self._retry_allowed(f"message:{m['id']}")] + self._messages
+        self._traces = [t for t in traces if self._retry_allowed(f"trace:{t['message_id']}")] + self._traces
+        for conversation_id, doc in new_conversations.items():
+            if self._retry_allowed(f"conversation:{conversation_id}"):
+                self._new_conversations.setdefault(conversation_id, doc)
+        for conversation_id, fields in updates.items():
+            if self._retry_allowed(f"update:{conversation_id}"):
+                self._conversation_updates.setdefault(conversation_id, fields)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters for the metrics endpoints"""
+        return {
+            "queue_depth": self.depth,
+            "pending_messages": len(self._messages),
+            "pending_conversation_ops": len(self._new_conversations) + len(self._conversation_updates),
+            "pending_traces": len(self._traces),
+            "running": self._running,
+            **self.stats
+        }
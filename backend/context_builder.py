@@ -0,0 +1,192 @@
+"""
+Token-Budget-Aware Prompt Context Builder
+Estimates prompt size, compacts tool payloads and fits prioritized context
+sections and conversation history under a token budget before LLM calls.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Budgets are in estimated tokens; llama3.1-8b on Cerebras has an 8k window
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("LLM_CONTEXT_TOKEN_BUDGET", "2500"))
+HISTORY_TOKEN_BUDGET = int(os.environ.get("LLM_HISTORY_TOKEN_BUDGET", "800"))
+SYNTHESIS_DATA_TOKEN_BUDGET = int(os.environ.get("LLM_SYNTHESIS_TOKEN_BUDGET", "2000"))
+
+TOP_N_PRICE_RECORDS = 8
+TOP_N_SEARCH_RESULTS = 3
+SEARCH_SNIPPET_CHARS = 300
+
+PRICE_COLUMNS = ["market", "district", "variety", "arrival_date", "min_price", "max_price", "modal_price"]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer
+
+    Latin text averages ~4 characters per token; Indic scripts tokenize far
+    worse, so non-ASCII characters are counted at ~2 characters per token.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    ascii_count = len(text) - non_ascii
+    return (ascii_count + 3) // 4 + (non_ascii + 1) // 2
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly max_tokens, preferring a line or word boundary"""
+    cost = estimate_tokens(text)
+    if cost <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    keep = int(len(text) * max_tokens / cost)
+    cut = text[:keep]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > keep // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + " ..."
+
+
+def _compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def compact_price_records(data: Dict[str, Any], top_n: int = TOP_N_PRICE_RECORDS) -> str:
+    """Render mandi price records as a compact pipe-separated table"""
+    records = data.get("records") or []
+    if not records:
+        return _compact_json(data)
+
+    columns = [column for column in PRICE_COLUMNS if any(column in record for record in records[:top_n])]
+    if not columns:
+        return _compact_json(records[:top_n])
+
+    commodity = records[0].get("commodity", "")
+    state = records[0].get("state", "")
+    lines = [f"{commodity} prices {state} (Rs/quintal), {min(top_n, len(records))} of {len(records)} records:".strip()]
+    lines.append(" | ".join(columns))
+    for record in records[:top_n]:
+        lines.append(" | ".join(str(record.get(column, "")) for column in columns))
+    return "\n".join(lines)
+
+
+def compact_search_results(results: List[Any], top_n: int = TOP_N_SEARCH_RESULTS) -> str:
+    """Keep title and a short snippet of the top search results"""
+    lines = []
+    for result in results[:top_n]:
+        if not isinstance(result, dict):
+            lines.append(f"- {str(result)[:SEARCH_SNIPPET_CHARS]}")
+            continue
+        title = result.get("title", "")
+        snippet = result.get("text") or result.get("snippet") or result.get("summary") or result.get("content") or ""
+        snippet = " ".join(str(snippet).split())[:SEARCH_SNIPPET_CHARS]
+        lines.append(f"- {title}: {snippet}" if title else f"- {snippet}")
+    return "\n".join(lines)
+
+
+def compact_tool_payload(tool_name: str, payload: Any) -> str:
+    """Render one tool's result in the most compact form the LLM still understands"""
+    if tool_name == "crop_price" and isinstance(payload, dict):
+        return compact_price_records(payload)
+    if tool_name == "web_search" and isinstance(payload, list):
+        return compact_search_results(payload)
+    return _compact_json(payload)
+
+
+def compact_tool_results(tool_results: Dict[str, Any], token_budget: int = SYNTHESIS_DATA_TOKEN_BUDGET) -> str:
+    """Compact a whole tool_results dict for prompts, sharing the budget across tools"""
+    builder = ContextBuilder(token_budget)
+    for priority, (tool_name, result) in enumerate(tool_results.items()):
+        if not isinstance(result, dict):
+            builder.add_section(tool_name, f"{tool_name}: {_compact_json(result)}", priority)
+            continue
+        if result.get("error"):
+            builder.add_section(tool_name, f"{tool_name}: unavailable ({result['error']})", priority)
+            continue
+        payload = result.get("data") if result.get("data") is not None else result.get("results", result)
+        builder.add_section(tool_name, f"{tool_name}:\n{compact_tool_payload(tool_name, payload)}", priority)
+    return builder.build()
+
+
+def fit_history(history: List[Dict[str, str]], token_budget: int = HISTORY_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """Keep the most recent history messages that fit the budget, oldest dropped first"""
+    fitted = []
+    remaining = token_budget
+    for message in reversed(history):
+        cost = estimate_tokens(message.get("content", "")) + 4  # role/formatting overhead
+        if cost > remaining:
+            if not fitted and remaining > 32:
+                # Always keep a trimmed copy of the latest turn
+                fitted.append({**message, "content": truncate_to_tokens(message.get("content", ""), remaining - 4)})
+            break
+        fitted.append(message)
+        remaining -= cost
+    fitted.reverse()
+    return fitted
+
+
+@dataclass
+class ContextSection:
+    """A named block of prompt context; lower priority values are kept first"""
+    name: str
+    text: str
+    priority: int
+    min_tokens: int = 48
+
+
+class ContextBuilder:
+    """Assembles prioritized context sections under a token budget"""
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.sections: List[ContextSection] = []
+        self.included: List[str] = []
+        self.truncated: List[str] = []
+        self.dropped: List[str] = []
+        self.used_tokens = 0
+
+    def add_section(self, name: str, text: Optional[str], priority: int, min_tokens: int = 48):
+        """Register a section; empty text is ignored"""
+        if text and text.strip():
+            self.sections.append(ContextSection(name, text.strip(), priority, min_tokens))
+
+    def build(self, separator: str = "\n\n") -> str:
+        """Fit sections by priority: whole if possible, else truncated, else dropped"""
+        self.included, self.truncated, self.dropped = [], [], []
+        remaining = self.token_budget
+        parts = []
+
+        for section in sorted(self.sections, key=lambda s: s.priority):
+            cost = estimate_tokens(section.text)
+            if cost <= remaining:
+                parts.append(section.text)
+                self.included.append(section.name)
+                remaining -= cost
+            elif remaining >= section.min_tokens:
+                parts.append(truncate_to_tokens(section.text, remaining))
+                self.truncated.append(section.name)
+                remaining = 0
+            else:
+                self.dropped.append(section.name)
+
+        self.used_tokens = self.token_budget - remaining
+        if self.truncated or self.dropped:
+            logger.info(f"Context budget {self.token_budget}: truncated {self.truncated}, dropped {self.dropped}")
+        return separator.join(parts)
+
+    def get_report(self) -> Dict[str, Any]:
+        """Summary of the last build for reasoning traces and tuning"""
+        return {
+            "token_budget": self.token_budget,
+            "used_tokens": self.used_tokens,
+            "included": self.included,
+            "truncated": self.truncated,
+            "dropped": self.dropped
+        }
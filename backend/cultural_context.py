@@ -8,6 +8,49 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
+from language_id import detect_language
+
+COMPLEX_STRUCTURE_WORDS = ['however', 'therefore', 'consequently', 'furthermore', 'moreover',
+                           'because', 'although', 'whereas', 'nevertheless']
+
+SIMPLIFICATIONS = {
+    'en': {
+        'recommendation': 'advice',
+        'application': 'use',
+        'fertilizer': 'khad',
+        'pesticide': 'dawa',
+        'irrigation': 'pani dena'
+    },
+    'hi': {
+        'अनुशंसा': 'सलाह',
+        'प्रयोग': 'इस्तेमाल',
+        'उर्वरक': 'खाद'
+    }
+}
+
+
+def compile_word_pattern(words: List[str]) -> "re.Pattern":
+    """One case-insensitive whole-word alternation, longest words first"""
+    alternation = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(r'\b(?:' + alternation + r')\b', re.IGNORECASE)
+
+
+class TermReplacer:
+    """Replaces whole-word terms case-insensitively in a single pass over the text"""
+
+    def __init__(self, terms: Dict[str, str]):
+        self.terms = {term.lower(): replacement for term, replacement in terms.items()}
+        self.pattern = compile_word_pattern(list(terms)) if terms else None
+
+    def _substitute(self, match: "re.Match") -> str:
+        return self.terms[match.group(0).lower()]
+
+    def replace(self, text: str) -> str:
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._substitute, text)
+
+
 @dataclass
 class CulturalContext:
     """Represents cultural context for a user interaction"""
@@ -40,6 +83,16 @@ class CulturalContextManager:
         self.agricultural_terms = self._load_agricultural_terms()
         self.seasonal_calendar = self._load_seasonal_calendar()
         self.regional_practices = self._load_regional_practices()
+
+        # Matchers are compiled once here; adapt_response runs on every reply
+        self._complex_structure_pattern = compile_word_pattern(COMPLEX_STRUCTURE_WORDS)
+        self._simplifiers = {
+            language: TermReplacer(words) for language, words in SIMPLIFICATIONS.items()
+        }
+        self._term_replacers: Dict[Tuple[Tuple[str, str], ...], TermReplacer] = {}
+        for regions in self.agricultural_terms.values():
+            for terms in regions.values():
+                self._get_term_replacer(terms)
     
     def detect_language_and_context(self, text: str, user_profile: Dict[str, Any] = None) -> CulturalContext:
         """
@@ -113,32 +166,8 @@ class CulturalContextManager:
         return adapted_response
     
     def _detect_language(self, text: str) -> str:
-        """Detect language from text patterns"""
-        # Hindi patterns
-        hindi_patterns = [
-            r'[\u0900-\u097F]',  # Devanagari script
-            r'\b(kya|hai|mein|aur|ke|ki|ko|se|me|par)\b',  # Common Hindi words
-            r'\b(fasal|khet|kheti|pani|mitti)\b'  # Agricultural Hindi terms
-        ]
-        
-        # Punjabi patterns  
-        punjabi_patterns = [
-            r'[\u0A00-\u0A7F]',  # Gurmukhi script
-            r'\b(ki|hai|te|da|de|nu|ch|nal)\b',  # Common Punjabi words
-            r'\b(fasal|khet|kheti|pani|mitti)\b'  # Agricultural Punjabi terms
-        ]
-        
-        # Check for script patterns first
-        for pattern in hindi_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return 'hi'
-        
-        for pattern in punjabi_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return 'pa'
-        
-        # Default to English if no patterns match
-        return 'en'
+        """Detect language locally from script and romanized n-grams"""
+        return detect_language(text)
     
     def _infer_region(self, text: str, user_profile: Dict[str, Any] = None) -> str:
         """Infer region from text and user profile"""
@@ -169,12 +198,7 @@ class CulturalContextManager:
         word_count = len(text.split())
         
         # Check for complex sentence structures
-        complex_indicators = [
-            r'\b(however|therefore|consequently|furthermore|moreover)\b',
-            r'\b(because|although|whereas|nevertheless)\b'
-        ]
-        
-        has_complex_structure = any(re.search(pattern, text, re.IGNORECASE) for pattern in complex_indicators)
+        has_complex_structure = self._complex_structure_pattern.search(text) is not None
         
         if word_count > 20 and has_complex_structure:
             return 'high'
@@ -234,39 +258,27 @@ class CulturalContextManager:
         """Get cultural terms for language and region"""
         return self.agricultural_terms.get(language, {}).get(region, {})
     
+    def _get_term_replacer(self, terms: Dict[str, str]) -> TermReplacer:
+        """Compiled replacer for a term dictionary, built on first use"""
+        key = tuple(terms.items())
+        replacer = self._term_replacers.get(key)
+        if replacer is None:
+            replacer = TermReplacer(terms)
+            self._term_replacers[key] = replacer
+        return replacer
+    
     def _translate_agricultural_terms(self, text: str, context: CulturalContext) -> str:
         """Translate agricultural terms to local language"""
-        terms = context.cultural_terms
-        
-        for english_term, local_term in terms.items():
-            # Replace English terms with local equivalents
-            text = re.sub(r'\b' + re.escape(english_term) + r'\b', local_term, text, flags=re.IGNORECASE)
-        
-        return text
+        if not context.cultural_terms:
+            return text
+        return self._get_term_replacer(context.cultural_terms).replace(text)
     
     def _simplify_language(self, text: str, language: str) -> str:
         """Simplify language for low literacy users"""
-        # Replace complex words with simpler alternatives
-        simplifications = {
-            'en': {
-                'recommendation': 'advice',
-                'application': 'use',
-                'fertilizer': 'khad',
-                'pesticide': 'dawa',
-                'irrigation': 'pani dena'
-            },
-            'hi': {
-                'अनुशंसा': 'सलाह',
-                'प्रयोग': 'इस्तेमाल',
-                'उर्वरक': 'खाद'
-            }
-        }
-        
-        if language in simplifications:
-            for complex_word, simple_word in simplifications[language].items():
-                text = re.sub(r'\b' + re.escape(complex_word) + r'\b', simple_word, text, flags=re.IGNORECASE)
-        
-        return text
+        simplifier = self._simplifiers.get(language)
+        if simplifier is None:
+            return text
+        return simplifier.replace(text)
     
     def _add_regional_context(self, text: str, context: CulturalContext) -> str:
         """Add regional context to response"""
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -21,33 +22,34 @@ except Exception as e:
 async def get_database():
     """Get database instance"""
 =======
-# Try to connect to MongoDB, but don't fail if it's not available
+# The connection is opened on the first get_database() call rather than at
+# import, so importing this module never blocks on a Mongo round trip.
+# Falls back to a mock database when MongoDB is not reachable.
 client = None
 db = None
-mongodb_available = False
+mongodb_available = None  # Unknown until the first connection attempt
+MONGO_CONNECT_TIMEOUT = float(os.environ.get('MONGO_CONNECT_TIMEOUT', '1.0'))
+_connect_lock = None
 
-try:
-    # Try to connect with a very short timeout
-    import asyncio
-    from pymongo import MongoClient
-    
-    # Use synchronous client for connection test
-    test_client = MongoClient(mongo_url, serverSelectionTimeoutMS=1000)
-    test_client.admin.command('ping')
-    test_client.close()
-    
-    # If we get here, MongoDB is available
-    client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
-    db = client[os.environ.get('DB_NAME', 'farmchat')]
-    mongodb_available = True
-    print(f"✅ MongoDB connection successful: {mongo_url.split('@')[1] if '@' in mongo_url else 'localhost'}")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    print("💡 Using mock database for development")
-    print("   To use real MongoDB: brew install mongodb-community && brew services start mongodb-community")
-    client = None
-    db = None
-    mongodb_available = False
+async def _connect():
+    global client, db, mongodb_available
+    candidate = None
+    try:
+        candidate = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+        await asyncio.wait_for(candidate.admin.command('ping'), timeout=MONGO_CONNECT_TIMEOUT)
+        client = candidate
+        db = client[os.environ.get('DB_NAME', 'farmchat')]
+        mongodb_available = True
+        print(f"✅ MongoDB connection successful: {mongo_url.split('@')[1] if '@' in mongo_url else 'localhost'}")
+    except Exception as e:
+        if candidate is not None:
+            candidate.close()
+        print(f"❌ MongoDB connection failed: {e}")
+        print("💡 Using mock database for development")
+        print("   To use real MongoDB: brew install mongodb-community && brew services start mongodb-community")
+        client = None
+        db = None
+        mongodb_available = False
 
 class MockCollection:
     """Mock MongoDB collection for development without database"""
@@ -59,13 +61,25 @@ class MockCollection:
         print(f"Mock DB: Inserting {len(documents)} documents into collection")
         return type('MockResult', (), {'inserted_ids': ['mock_id_1', 'mock_id_2']})()
     
-    async def find_one(self, query):
+    async def find_one(self, query, projection=None):
         print(f"Mock DB: Finding one document with query: {query}")
         return None  # Always return None (user not found)
     
     async def update_one(self, query, update, **kwargs):
         print(f"Mock DB: Updating document with query: {query}")
-        return type('MockResult', (), {'modified_count': 1})()
+        return type('MockResult', (), {'matched_count': 1, 'modified_count': 1})()
+    
+    async def find_one_and_update(self, query, update, **kwargs):
+        print(f"Mock DB: Finding and updating document with query: {query}")
+        return None
+    
+    async def update_many(self, query, update, **kwargs):
+        print(f"Mock DB: Updating documents with query: {query}")
+        return type('MockResult', (), {'matched_count': 0, 'modified_count': 0})()
+    
+    async def bulk_write(self, requests, ordered=True):
+        print(f"Mock DB: Bulk writing {len(requests)} operations")
+        return type('MockResult', (), {'inserted_count': len(requests), 'modified_count': 0})()
     
     async def delete_one(self, query):
         print(f"Mock DB: Deleting document with query: {query}")
@@ -78,6 +92,10 @@ class MockCollection:
     def find(self, query=None, projection=None):
         print(f"Mock DB: Finding documents with query: {query}")
         return MockCursor()
+    
+    async def create_index(self, keys, **kwargs):
+        print(f"Mock DB: Creating index {kwargs.get('name', keys)}")
+        return kwargs.get('name', 'mock_index')
 
 class MockCursor:
     """Mock MongoDB cursor with full method support"""
@@ -111,7 +129,14 @@ class MockDatabase:
         return {"ok": 1}
 
 async def get_database():
-    """Get database instance"""
+    """Get database instance, connecting on first use"""
+    global _connect_lock
+    if mongodb_available is None:
+        if _connect_lock is None:
+            _connect_lock = asyncio.Lock()
+        async with _connect_lock:
+            if mongodb_available is None:
+                await _connect()
     if not mongodb_available or db is None:
         print("Using mock database for development")
         return MockDatabase()
@@ -120,4 +145,5 @@ async def get_database():
 
 async def close_database():
     """Close database connection"""
-    client.close()
\ No newline at end of file
+    if client is not None:
+        client.close()
\ No newline at end of file
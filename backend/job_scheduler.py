@@ -0,0 +1,184 @@
+"""
+Persistent Background Job Scheduler
+Recurring jobs are registered in-process and their schedule lives in the
+scheduled_jobs collection, so no broker is needed. Every worker polls,
+but a job runs on only one of them at a time: a run starts by taking a
+lease on the job document, and an expired lease can be taken over after a
+crash. The lease is renewed while the job runs, so a long run is never
+taken over by another worker.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    handler: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    interval: float  # seconds between the end of one run and the next
+    runs: int = 0
+    failures: int = 0
+    last_duration: float = 0.0
+
+
+class JobScheduler:
+    """
+    Runs registered jobs on their interval, coordinated through Mongo
+
+    The collection holds next_run_at, the lease and the outcome of the last
+    run for each job. Scheduling survives restarts: a job that was due while
+    every worker was down runs at the next poll.
+    """
+
+    def __init__(self, database, poll_interval: float = 30.0, lease_seconds: float = 1800.0,
+                 worker_id: Optional[str] = None):
+        self.collection = database.scheduled_jobs
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    def register(self, job_id: str, handler: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+                 interval: float):
+        """Add a recurring job; call before start()"""
+        self.jobs[job_id] = ScheduledJob(job_id, handler, interval)
+
+    async def start(self):
+        """Record the registered jobs and start polling; returns immediately"""
+        if self._task is not None:
+            return
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            try:
+                await self.collection.update_one(
+                    {"job_id": job.job_id},
+                    {"$set": {"interval": job.interval}, "$setOnInsert": {"next_run_at": now, "lease_until": None}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"Could not register scheduled job {job.job_id}: {e}")
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Job scheduler started with {len(self.jobs)} jobs (worker {self.worker_id})")
+
+    async def stop(self):
+        # The flag as well as the cancel: wait_for can swallow a cancel that races the wakeup
+        self._running = False
+        self._wakeup.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def trigger(self, job_id: str) -> bool:
+        """Make a job due now; whichever worker polls first runs it"""
+        if job_id not in self.jobs:
+            return False
+        await self.collection.update_one({"job_id": job_id}, {"$set": {"next_run_at": datetime.now(timezone.utc)}})
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while self._running:
+            for job in list(self.jobs.values()):
+                try:
+                    if await self._claim(job):
+                        await self._execute(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Scheduler error for job {job.job_id}: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._running:
+                self._wakeup.clear()
+
+    async def _claim(self, job: ScheduledJob) -> bool:
+        """Take the lease on a due job; False if it is not due or another worker holds it"""
+        now = datetime.now(timezone.utc)
+        document = await self.collection.find_one_and_update(
+            {
+                "job_id": job.job_id,
+                "next_run_at": {"$lte": now},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lte": now}}]
+            },
+            {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds), "lease_owner": self.worker_id}},
+            return_document=ReturnDocument.AFTER
+        )
+        return document is not None
+
+    async def _renew_lease(self, job: ScheduledJob):
+        """Extend the lease every third of its length until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                result = await self.collection.update_one(
+                    {"job_id": job.job_id, "lease_owner": self.worker_id},
+                    {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}}
+                )
+                if not result.matched_count:
+                    logger.warning(f"Lease on scheduled job {job.job_id} was lost")
+            except Exception as e:
+                logger.warning(f"Could not renew lease on scheduled job {job.job_id}: {e}")
+
+    async def _execute(self, job: ScheduledJob):
+        started = time.monotonic()
+        outcome: Dict[str, Any] = {}
+        heartbeat = asyncio.create_task(self._renew_lease(job))
+        try:
+            outcome["last_result"] = await job.handler()
+            outcome["last_error"] = None
+            job.runs += 1
+        except Exception as e:
+            logger.error(f"Scheduled job {job.job_id} failed: {e}")
+            outcome["last_error"] = str(e)
+            job.failures += 1
+        finally:
+            heartbeat.cancel()
+        job.last_duration = round(time.monotonic() - started, 3)
+
+        finished = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"job_id": job.job_id, "lease_owner": self.worker_id},
+            {"$set": dict(
+                outcome,
+                next_run_at=finished + timedelta(seconds=job.interval),
+                lease_until=None,
+                last_run_at=finished,
+                last_duration=job.last_duration
+            )}
+        )
+        logger.info(f"Scheduled job {job.job_id} finished in {job.last_duration}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "worker_id": self.worker_id,
+            "jobs": {
+                job.job_id: {
+                    "interval": job.interval,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_duration": job.last_duration
+                } for job in self.jobs.values()
+            }
+        }
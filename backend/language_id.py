@@ -0,0 +1,214 @@
+"""
+Local Language Identification
+Identifies the ten supported languages without an LLM call: a Unicode block
+histogram settles native-script text, and a character trigram model separates
+English from romanized Hindi and Punjabi. Runs well under a millisecond for
+chat-sized messages.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Unicode blocks of the Indic scripts, mapped to the language that writes them.
+# Devanagari is shared by Hindi and Marathi and is split by marker words.
+SCRIPT_RANGES = [
+    (0x0900, 0x097F, 'hi'),  # Devanagari
+    (0x0980, 0x09FF, 'bn'),  # Bengali
+    (0x0A00, 0x0A7F, 'pa'),  # Gurmukhi
+    (0x0A80, 0x0AFF, 'gu'),  # Gujarati
+    (0x0B80, 0x0BFF, 'ta'),  # Tamil
+    (0x0C00, 0x0C7F, 'te'),  # Telugu
+    (0x0C80, 0x0CFF, 'kn'),  # Kannada
+    (0x0D00, 0x0D7F, 'ml'),  # Malayalam
+]
+
+INDIC_START = 0x0900
+INDIC_END = 0x0D7F
+
+# Only the head of long messages is scanned; the language is settled by then
+MAX_SCAN_CHARS = 600
+
+# Words far more common in one of the two Devanagari languages than the other
+MARATHI_MARKERS = {
+    'आहे', 'आहेत', 'आणि', 'नाही', 'काय', 'माझ्या', 'माझा', 'माझी', 'माझे', 'कोणते', 'कोणती',
+    'कसे', 'करावे', 'करावी', 'पाहिजे', 'मध्ये', 'साठी', 'आला', 'आली', 'झाला', 'झाली', 'किती',
+    'आम्ही', 'तुम्ही', 'शेतात', 'पिकावर', 'पिकाला', 'होते', 'येथे'
+}
+HINDI_MARKERS = {
+    'है', 'हैं', 'में', 'और', 'क्या', 'का', 'की', 'के', 'को', 'मेरे', 'मेरी', 'मेरा', 'कैसे',
+    'चाहिए', 'नहीं', 'कौन', 'कौनसी', 'कितना', 'रहा', 'रही', 'रहे', 'गया', 'गई', 'लिए', 'भी',
+    'से', 'पर', 'यह', 'वह', 'खेत', 'बताइए', 'बताओ'
+}
+
+# Seed text for the romanized trigram model - farmer chat as it is typed
+ROMANIZED_SAMPLES = {
+    'en': (
+        "what is the price of wheat in the market today. how much fertilizer should i apply to my crop. "
+        "when should i sow mustard this season. my cotton leaves are turning yellow what should i do. "
+        "which pesticide is best for pink bollworm. will it rain this week in my district. "
+        "how to increase the yield of paddy. the soil in my field is very dry. please tell me about "
+        "government schemes for farmers. what is the best time to harvest sugarcane. how do i get a "
+        "loan for a tractor. there are insects on the tomato plants. should i irrigate before or after "
+        "spraying. thank you for the advice. can you check the weather forecast for tomorrow. "
+        "the seeds did not germinate properly. what are the symptoms of leaf rust"
+    ),
+    'hi': (
+        "gehun ka bhav kya hai aaj mandi mein. meri fasal mein kitna khad dalna chahiye. is mausam mein "
+        "sarson kab boni chahiye. mere kapas ke patte peele ho rahe hain kya karun. gulabi sundi ke "
+        "liye kaunsi dawai sabse achhi hai. kya is hafte mere zile mein barish hogi. dhan ki paidavar "
+        "kaise badhayen. mere khet ki mitti bahut sukhi hai. kisanon ke liye sarkari yojana ke bare mein "
+        "batao. ganna katne ka sahi samay kya hai. tractor ke liye loan kaise milega. tamatar ke paudhon "
+        "par keede lag gaye hain. spray se pehle pani dena chahiye ya baad mein. salah ke liye dhanyavad. "
+        "kal ka mausam bata do. beej theek se nahi uge. patton par ratua rog ke lakshan kya hain. "
+        "mujhe apni kheti ke bare mein jankari chahiye aur pani kab dena hai"
+    ),
+    'pa': (
+        "kanak da bhaa ajj mandi vich ki hai. meri fasal vich kinni khaad paauni chahidi hai. is mausam "
+        "vich sarhon kado bijni chahidi hai. mere narme de patte peele ho rahe ne ki karaan. gulabi sundi "
+        "layi kehdi dawai sab ton vadhiya hai. ki is hafte mere zile vich meenh pavega. jhone da jhaad "
+        "kive vadhaiye. mere khet di mitti bahut sukki hai. kisaanan layi sarkari skeem bare dasso. "
+        "ganna vaddan da sahi vela ki hai. tractor layi karza kive milu. tamatar de boote te keede lagg "
+        "gaye ne. spray ton pehlan paani laaiye ke baad vich. salaah layi dhanvaad. kal da mausam dass "
+        "deo. beej theek tarah nahi uge. pattiyan te kungi de lakshan ki ne. menu apni kheti bare "
+        "jaankari chahidi hai te paani kado laauna hai"
+    ),
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+# Log-probability margin (per trigram) at which a romanized guess counts as certain
+CONFIDENT_MARGIN = 0.35
+
+# Below this a romanized guess is no better than the English default
+MIN_CONFIDENCE = 0.15
+
+
+@dataclass
+class LanguageGuess:
+    """Result of local identification"""
+    language: str
+    confidence: float
+    script: str  # 'indic', 'latin' or 'none'
+
+
+def _trigrams(text: str) -> List[str]:
+    grams = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        padded = f" {token} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramModel:
+    """Add-one smoothed character trigram log-probabilities per language"""
+
+    def __init__(self, samples: Dict[str, str]):
+        self.log_probs: Dict[str, Dict[str, float]] = {}
+        self.unseen: Dict[str, float] = {}
+        vocabulary = set()
+        counts = {}
+        for language, text in samples.items():
+            counts[language] = Counter(_trigrams(text))
+            vocabulary.update(counts[language])
+
+        size = len(vocabulary) + 1
+        for language, counter in counts.items():
+            total = sum(counter.values()) + size
+            self.log_probs[language] = {gram: math.log((n + 1) / total) for gram, n in counter.items()}
+            self.unseen[language] = math.log(1 / total)
+
+    def score(self, text: str) -> Tuple[Dict[str, float], int]:
+        """Mean log-probability per trigram for each language"""
+        grams = _trigrams(text)
+        if not grams:
+            return {}, 0
+        scores = {}
+        for language, table in self.log_probs.items():
+            unseen = self.unseen[language]
+            scores[language] = sum(table.get(gram, unseen) for gram in grams) / len(grams)
+        return scores, len(grams)
+
+
+class LanguageIdentifier:
+    """Identifies en, hi, pa, ta, te, mr, bn, gu, kn and ml locally"""
+
+    def __init__(self, samples: Optional[Dict[str, str]] = None):
+        self.model = TrigramModel(samples or ROMANIZED_SAMPLES)
+
+    def _script_histogram(self, text: str) -> Tuple[Counter, int]:
+        indic = Counter()
+        latin = 0
+        for char in text[:MAX_SCAN_CHARS]:
+            code = ord(char)
+            if code < 0x80:
+                if char.isalpha():
+                    latin += 1
+            elif INDIC_START <= code <= INDIC_END:
+                for start, end, language in SCRIPT_RANGES:
+                    if start <= code <= end:
+                        indic[language] += 1
+                        break
+        return indic, latin
+
+    def _split_devanagari(self, text: str) -> str:
+        words = text[:MAX_SCAN_CHARS].split()
+        marathi = sum(1 for word in words if word.strip('?,.।!') in MARATHI_MARKERS)
+        hindi = sum(1 for word in words if word.strip('?,.।!') in HINDI_MARKERS)
+        # ळ is a Marathi letter that Hindi practically never uses
+        marathi += text.count('ळ')
+        return 'mr' if marathi > hindi else 'hi'
+
+    def identify(self, text: str) -> LanguageGuess:
+        """Best guess with a 0-1 confidence"""
+        if not text or not text.strip():
+            return LanguageGuess('en', 0.0, 'none')
+
+        indic, latin = self._script_histogram(text)
+        indic_total = sum(indic.values())
+
+        # Native script wins unless it is a stray word inside Latin text
+        if indic_total and indic_total * 3 >= latin:
+            language, count = indic.most_common(1)[0]
+            if language == 'hi':
+                language = self._split_devanagari(text)
+            return LanguageGuess(language, round(count / (indic_total + latin), 3), 'indic')
+
+        if not latin:
+            return LanguageGuess('en', 0.0, 'none')
+
+        scores, gram_count = self.model.score(text[:MAX_SCAN_CHARS])
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best, best_score = ranked[0]
+        margin = best_score - ranked[1][1]
+        # Short messages carry little evidence, so scale the margin by length
+        evidence = min(1.0, gram_count / 12)
+        confidence = min(1.0, margin / CONFIDENT_MARGIN) * evidence
+        if confidence < MIN_CONFIDENCE:
+            best = 'en'
+        return LanguageGuess(best, round(confidence, 3), 'latin')
+
+    def detect(self, text: str) -> str:
+        """Language code only"""
+        return self.identify(text).language
+
+
+_default_identifier: Optional[LanguageIdentifier] = None
+
+
+def get_language_identifier() -> LanguageIdentifier:
+    """Shared identifier; the trigram tables are built once per process"""
+    global _default_identifier
+    if _default_identifier is None:
+        _default_identifier = LanguageIdentifier()
+    return _default_identifier
+
+
+def identify_language(text: str) -> LanguageGuess:
+    return get_language_identifier().identify(text)
+
+
+def detect_language(text: str) -> str:
+    return get_language_identifier().detect(text)
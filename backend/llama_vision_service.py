@@ -4,16 +4,32 @@ Hackathon-ready implementation with in-memory processing and agricultural prompt
 """
 
 import base64
-import json
 import logging
 from typing import Dict, Any, Optional
 import httpx
 import asyncio
 import os
 from treatments_database import treatments_db
+from llm_json import parse_llm_json, StructuredOutputError
+from llm_limiter import LLMOverloadedError
+from llm_router import LLMRouter, LLMProviderError, CALL_VISION
 
 logger = logging.getLogger(__name__)
 
+# Shape of the JSON the vision prompt asks for; bad fields fall back to safe defaults
+VISION_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analysis_type": {"type": "string", "default": "general_agriculture"},
+        "diagnosis": {"type": "string", "default": "Analysis completed"},
+        "confidence_score": {"type": "number", "default": 0.7},
+        "severity": {"type": "string", "enum": ["low", "medium", "high"], "default": "medium"},
+        "treatment": {"type": "string", "default": "Consult agricultural expert"},
+        "cost_estimate": {"type": "string", "default": "₹200-500 per acre"},
+        "additional_info": {"type": "object", "default": {}}
+    }
+}
+
 
 class LlamaVisionServiceError(Exception):
     """Custom exception for LlamaVisionService errors"""
@@ -23,8 +39,10 @@ class LlamaVisionServiceError(Exception):
 class LlamaVisionService:
     """Simplified service for agricultural image analysis using OpenRouter API"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, router: Optional[LLMRouter] = None):
         self.api_key = api_key or os.getenv('OPENROUTER_API_KEY')
+        # When set, vision calls go through the LLM router for health tracking and failover
+        self.router = router
         self.model = "meta-llama/llama-3.2-11b-vision-instruct"
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         self.timeout = 30.0  # Reduced timeout for hackathon
@@ -114,6 +132,16 @@ If you cannot clearly identify agricultural issues, provide general crop health
             "X-Title": "FarmChat Agricultural Analysis"
         }
         
+        if self.router:
+            try:
+                return await self.router.complete(request_payload, CALL_VISION)
+            except LLMOverloadedError:
+                raise LlamaVisionServiceError("Rate limit exceeded. Please try again in a moment.")
+            except LLMProviderError as e:
+                if e.status_code == 429:
+                    raise LlamaVisionServiceError("Rate limit exceeded. Please try again in a moment.")
+                raise LlamaVisionServiceError(f"API request failed: {e}")
+        
         try:
             logger.info("Making OpenRouter API request")
             
@@ -157,26 +185,10 @@ If you cannot clearly identify agricultural issues, provide general crop health
             
             # Try to parse JSON from the response
             try:
-                # Look for JSON in the response (it might be wrapped in markdown code blocks)
-                json_start = content.find('{')
-                json_end = content.rfind('}') + 1
-                
-                if json_start != -1 and json_end > json_start:
-                    json_str = content[json_start:json_end]
-                    analysis_data = json.loads(json_str)
-                else:
-                    # If no JSON found, create a structured response from the text
-                    analysis_data = {
-                        "analysis_type": "general_agriculture",
-                        "diagnosis": content[:300] + "..." if len(content) > 300 else content,
-                        "confidence_score": 0.7,
-                        "severity": "medium",
-                        "treatment": "Please consult with an agricultural expert for specific treatment recommendations.",
-                        "cost_estimate": "₹200-500 per acre",
-                        "additional_info": {}
-                    }
+                # JSON may be wrapped in markdown code blocks or prose
+                analysis_data = parse_llm_json(content, VISION_ANALYSIS_SCHEMA)
             
-            except json.JSONDecodeError:
+            except StructuredOutputError:
                 # Fallback: create structured response from text content
                 analysis_data = {
                     "analysis_type": "general_agriculture",
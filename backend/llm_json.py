@@ -0,0 +1,343 @@
+"""
+Structured Output Parsing for LLM Responses
+Extracts JSON objects from model output wrapped in prose or code fences,
+repairs common generation mistakes, validates against a small JSON-Schema
+subset and parses streamed output incrementally, field by field.
+"""
+
+import copy
+import json
+import logging
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CODE_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"'})
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+_BOOLEAN_STRINGS = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+_SCHEMA_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "number": (int, float),
+    "integer": int,
+}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when no valid JSON object can be recovered from model output"""
+    pass
+
+
+def _scan(text: str, start: int) -> Tuple[Optional[int], List[str], bool]:
+    """
+    Walk a JSON value from its opening brace
+
+    Returns:
+        Tuple of (index after the matching close or None if truncated,
+        stack of unclosed openers, whether the text ends inside a string)
+    """
+    stack = []
+    in_string = False
+    escape = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return index + 1, [], False
+    return None, stack, in_string
+
+
+def _close_truncated(body: str, stack: List[str], in_string: bool) -> str:
+    """Close a JSON value that was cut off mid-generation"""
+    if in_string:
+        body += '"'
+    body = body.rstrip()
+    if body.endswith(","):
+        body = body[:-1]
+    elif body.endswith(":"):
+        body += " null"
+    return body + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def repair_json(body: str) -> str:
+    """
+    Fix the mistakes small models make most often
+
+    Handles trailing commas, Python literals (True/False/None) and curly
+    quotes; string contents are left untouched.
+    """
+    body = body.translate(_SMART_QUOTES)
+    output = []
+    in_string = False
+    escape = False
+    index = 0
+    length = len(body)
+
+    while index < length:
+        char = body[index]
+        if in_string:
+            output.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            index += 1
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char == ",":
+            # Drop the comma if the next significant character closes the container
+            lookahead = index + 1
+            while lookahead < length and body[lookahead].isspace():
+                lookahead += 1
+            if lookahead < length and body[lookahead] in "}]":
+                index += 1
+                continue
+        elif char.isalpha():
+            end = index
+            while end < length and body[end].isalnum():
+                end += 1
+            word = body[index:end]
+            output.append(_PYTHON_LITERALS.get(word, word))
+            index = end
+            continue
+
+        output.append(char)
+        index += 1
+
+    return "".join(output)
+
+
+def _loads(body: str) -> Any:
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(body))
+
+
+def parse_llm_json(text: str, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Extract, repair and validate the first JSON object in model output
+
+    Args:
+        text: Raw model output, possibly with prose or markdown fences around the JSON
+        schema: Optional JSON-Schema subset to validate and coerce against
+
+    Raises:
+        StructuredOutputError: If no object can be recovered or it fails validation
+    """
+    if not text:
+        raise StructuredOutputError("Empty model output")
+
+    stripped = text.strip()
+    data = None
+
+    # Fast path: the model returned bare JSON as instructed
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError:
+            data = None
+
+    if data is None:
+        fence = _CODE_FENCE.search(stripped)
+        candidate = fence.group(1) if fence and "{" in fence.group(1) else stripped
+
+        start = candidate.find("{")
+        if start == -1:
+            raise StructuredOutputError("No JSON object found in model output")
+
+        end, stack, in_string = _scan(candidate, start)
+        body = candidate[start:end] if end else _close_truncated(candidate[start:], stack, in_string)
+        try:
+            data = _loads(body)
+        except json.JSONDecodeError as e:
+            raise StructuredOutputError(f"Unrecoverable JSON in model output: {e}")
+
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"Expected a JSON object, got {type(data).__name__}")
+
+    return validate_schema(data, schema) if schema else data
+
+
+def _coerce(value: Any, expected: str) -> Any:
+    """Coerce a value to a schema type, raising TypeError when it cannot be"""
+    python_type = _SCHEMA_TYPES.get(expected)
+    if python_type is None:
+        return value
+
+    if expected == "boolean":
+        if isinstance(value, bool):
+            return value
+        key = str(value).strip().lower()
+        if key in _BOOLEAN_STRINGS:
+            return _BOOLEAN_STRINGS[key]
+    elif expected in ("number", "integer"):
+        if isinstance(value, bool):
+            raise TypeError(f"boolean is not a {expected}")
+        if isinstance(value, python_type):
+            return value
+        try:
+            number = float(str(value).strip())
+            return int(number) if expected == "integer" else number
+        except ValueError:
+            pass
+    elif expected == "string":
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+    elif expected == "array":
+        if isinstance(value, list):
+            return value
+        if isinstance(value, (str, dict)):
+            return [value]
+    elif isinstance(value, python_type):
+        return value
+
+    raise TypeError(f"expected {expected}, got {type(value).__name__}")
+
+
+def validate_schema(data: Dict[str, Any], schema: Dict[str, Any], path: str = "") -> Dict[str, Any]:
+    """
+    Validate and coerce an object against a JSON-Schema subset
+
+    Supports type, properties, required, enum and default. Invalid or
+    missing properties fall back to their default when one is given;
+    unknown properties are kept as-is.
+    """
+    result = dict(data)
+
+    for name in schema.get("required", []):
+        if name not in result:
+            raise StructuredOutputError(f"Missing required field {path}{name}")
+
+    for name, spec in schema.get("properties", {}).items():
+        field_path = f"{path}{name}"
+        if name not in result or result[name] is None:
+            if "default" in spec:
+                result[name] = copy.deepcopy(spec["default"])
+            continue
+
+        value = result[name]
+        try:
+            if "type" in spec:
+                value = _coerce(value, spec["type"])
+            if "enum" in spec and value not in spec["enum"]:
+                lowered = str(value).strip().lower()
+                if lowered not in spec["enum"]:
+                    raise TypeError(f"{value!r} not in {spec['enum']}")
+                value = lowered
+            if spec.get("type") == "object" and "properties" in spec:
+                value = validate_schema(value, spec, f"{field_path}.")
+        except TypeError as e:
+            if "default" not in spec:
+                raise StructuredOutputError(f"Invalid field {field_path}: {e}")
+            logger.debug(f"Invalid field {field_path} ({e}), using default")
+            value = copy.deepcopy(spec["default"])
+
+        result[name] = value
+
+    return result
+
+
+class IncrementalJSONParser:
+    """
+    Parses a streamed JSON object and reports each top-level field as soon as its value is complete
+
+    Feed it raw token chunks; prose or a code fence before the object is
+    skipped. Only the new characters are scanned on each feed.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._segment_start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add a chunk and return the (key, value) pairs completed by it"""
+        self.text += chunk
+        completed = []
+        text = self.text
+
+        for index in range(self._pos, len(text)):
+            if self.complete:
+                break
+            char = text[index]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._segment_start = index + 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._emit(text[self._segment_start:index]))
+                    self.complete = True
+            elif char == "," and self._depth == 1:
+                completed.extend(self._emit(text[self._segment_start:index]))
+                self._segment_start = index + 1
+
+        self._pos = len(text)
+        return completed
+
+    def _emit(self, segment: str) -> List[Tuple[str, Any]]:
+        segment = segment.strip()
+        if not segment:
+            return []
+        try:
+            field = _loads("{" + segment + "}")
+        except json.JSONDecodeError:
+            # Leave it to the final whole-object parse
+            return []
+        self.fields.update(field)
+        return list(field.items())
+
+    def result(self, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Parse everything received so far as a whole object"""
+        return parse_llm_json(self.text, schema)
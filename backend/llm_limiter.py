@@ -0,0 +1,186 @@
+"""
+Adaptive Concurrency Limiter for Upstream LLM Calls
+AIMD-controlled cap on in-flight LLM requests with a priority wait queue.
+The limit grows slowly while the provider keeps up and is cut sharply on
+429/503/timeouts, so bursts queue (and low-priority work is shed) instead
+of turning into a synchronized failure storm.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_WORKFLOW = 1
+PRIORITY_SYNTHESIS = 2
+PRIORITY_BACKGROUND = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_WORKFLOW: "workflow",
+    PRIORITY_SYNTHESIS: "synthesis",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Longest a call may wait for a slot before it is shed (seconds)
+DEFAULT_MAX_QUEUE_TIME = {
+    PRIORITY_INTERACTIVE: 15.0,
+    PRIORITY_WORKFLOW: 30.0,
+    PRIORITY_SYNTHESIS: 5.0,   # synthesis is optional, skipping it beats waiting
+    PRIORITY_BACKGROUND: 120.0,
+}
+
+OVERLOAD_STATUS_CODES = {429, 503, 529}
+
+
+class LLMOverloadedError(Exception):
+    """Raised when a call waited too long for an LLM concurrency slot"""
+    pass
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Provider rate limiting, overload or timeouts - signals to back off"""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) in OVERLOAD_STATUS_CODES:
+        return True
+    return isinstance(error, asyncio.TimeoutError) or "Timeout" in type(error).__name__
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Additive-increase / multiplicative-decrease limit on concurrent calls
+
+    Every successful call raises the limit by 1/limit (about +1 per full
+    window); an overload signal multiplies it by backoff_factor, at most
+    once per backoff_cooldown so one burst of 429s counts as one signal.
+    """
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 backoff_factor: float = 0.5, backoff_cooldown: float = 2.0,
+                 max_queue_time: Optional[Dict[int, float]] = None,
+                 classifier: Callable[[BaseException], bool] = is_overload_error):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.backoff_cooldown = backoff_cooldown
+        self.max_queue_time = {**DEFAULT_MAX_QUEUE_TIME, **(max_queue_time or {})}
+        self.classifier = classifier
+
+        self.in_flight = 0
+        self._waiters = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+        self._last_backoff = 0.0
+
+        self.stats = {"successes": 0, "overloads": 0, "backoffs": 0, "errors": 0}
+        self._priority_stats = {
+            priority: {"requests": 0, "shed": 0, "queued": 0} for priority in PRIORITY_NAMES
+        }
+        self._queue_times = {priority: deque(maxlen=500) for priority in PRIORITY_NAMES}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """Wait for a slot, highest priority first; raise LLMOverloadedError if shed"""
+        started = time.monotonic()
+        self._priority_stats[priority]["requests"] += 1
+
+        if self.in_flight < int(self.limit) and not self.queue_depth:
+            self.in_flight += 1
+            self._queue_times[priority].append(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._priority_stats[priority]["queued"] += 1
+
+        try:
+            await asyncio.wait_for(future, timeout=self.max_queue_time[priority])
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted in the same tick the timeout fired - keep the slot
+                self._queue_times[priority].append(time.monotonic() - started)
+                return
+            self._priority_stats[priority]["shed"] += 1
+            logger.warning(
+                f"Shedding {PRIORITY_NAMES[priority]} LLM call after {time.monotonic() - started:.1f}s in queue "
+                f"(limit {int(self.limit)}, in flight {self.in_flight})"
+            )
+            raise LLMOverloadedError("LLM capacity exhausted")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller went away - hand the slot on
+                self._release_slot()
+            raise
+
+        self._queue_times[priority].append(time.monotonic() - started)
+
+    def release(self, outcome: str = "success"):
+        """Return a slot; outcome is success, overload or error (neutral)"""
+        if outcome == "success":
+            self.stats["successes"] += 1
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        elif outcome == "overload":
+            self.stats["overloads"] += 1
+            now = time.monotonic()
+            if now - self._last_backoff >= self.backoff_cooldown:
+                self._last_backoff = now
+                self.stats["backoffs"] += 1
+                self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                logger.warning(f"LLM provider overloaded, concurrency limit reduced to {int(self.limit)}")
+        else:
+            self.stats["errors"] += 1
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._grant()
+
+    def _grant(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # waiter timed out or was cancelled
+            self.in_flight += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """Hold a concurrency slot for the duration of one upstream call"""
+        await self.acquire(priority)
+        outcome = "success"
+        try:
+            yield
+        except BaseException as e:
+            outcome = "overload" if self.classifier(e) else "error"
+            raise
+        finally:
+            self.release(outcome)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limit, queue depth and per-priority queue-time metrics"""
+        priorities = {}
+        for priority, name in PRIORITY_NAMES.items():
+            times = sorted(self._queue_times[priority])
+            priorities[name] = {
+                **self._priority_stats[priority],
+                "avg_queue_ms": round(sum(times) / len(times) * 1000, 1) if times else 0.0,
+                "p95_queue_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 1) if times else 0.0
+            }
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            **self.stats,
+            "priorities": priorities
+        }
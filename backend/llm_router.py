@@ -0,0 +1,374 @@
+"""
+Multi-Provider LLM Router
+Tracks live latency and error rates per provider/model, routes each call
+class (analysis, synthesis, final answer, vision) to the fastest healthy
+backend and fails over automatically. All providers speak the
+OpenAI-compatible chat completions API, so base URLs can point at local
+stub servers for testing.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from llm_limiter import AdaptiveConcurrencyLimiter, LLMOverloadedError, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+CALL_ANALYSIS = "analysis"
+CALL_SYNTHESIS = "synthesis"
+CALL_FINAL_ANSWER = "final_answer"
+CALL_VISION = "vision"
+
+CALL_CLASSES = [CALL_ANALYSIS, CALL_SYNTHESIS, CALL_FINAL_ANSWER, CALL_VISION]
+
+# Latency assumed for a provider with no samples yet, so it still gets tried
+UNSAMPLED_LATENCY = 1.0
+
+# HTTP statuses worth retrying on another provider; other 4xx mean the request itself is bad
+RETRYABLE_STATUS_CODES = {408, 429}
+
+
+class LLMProviderError(Exception):
+    """Raised when a provider call fails; status_code is set for HTTP errors"""
+
+    def __init__(self, message: str, provider: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        """True for timeouts, connection errors, 429 and 5xx; False for other client errors"""
+        return self.status_code is None or self.status_code >= 500 or self.status_code in RETRYABLE_STATUS_CODES
+
+
+class ProviderHealth:
+    """Rolling latency/error window with a simple circuit breaker"""
+
+    def __init__(self, window_size: int = 200, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)  # True = success
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            # Re-opens for another cooldown if the half-open trial call fails too
+            self.open_until = time.monotonic() + self.cooldown
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit is open; one trial call is let through after the cooldown"""
+        return time.monotonic() >= self.open_until
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def score(self) -> float:
+        """Expected cost of a call: p95 latency inflated by the error rate"""
+        p95 = self.percentile(0.95)
+        return (p95 if p95 is not None else UNSAMPLED_LATENCY) * (1 + 4 * self.error_rate)
+
+
+class LLMProvider:
+    """One OpenAI-compatible endpoint + model, with its own concurrency limiter and health"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str, timeout: float = 60.0,
+                 extra_headers: Optional[Dict[str, str]] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.extra_headers = extra_headers or {}
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.health = ProviderHealth()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so providers can be built before the event loop starts
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            **self.extra_headers
+        }
+
+    async def complete(self, payload: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """POST a chat completion and return the raw response JSON"""
+        try:
+            async with self.limiter.slot(priority):
+                # Timed from inside the slot: local queueing is not provider latency
+                started = time.monotonic()
+                response = await self.client.post(
+                    self.base_url, json={**payload, "model": self.model}, headers=self._headers()
+                )
+                response.raise_for_status()
+                data = response.json()
+        except LLMOverloadedError:
+            raise
+        except httpx.HTTPStatusError as e:
+            error = LLMProviderError(f"{self.name} returned {e.response.status_code}", self.name, e.response.status_code)
+            if error.retryable:
+                self.health.record_failure()
+            raise error
+        except Exception as e:
+            self.health.record_failure()
+            raise LLMProviderError(f"{self.name} request failed: {e}", self.name)
+
+        self.health.record_success(time.monotonic() - started)
+        return data
+
+    async def generate(self, messages: List[Dict[str, Any]], temperature: float = 0.7,
+                       max_tokens: int = 1024, priority: int = PRIORITY_INTERACTIVE) -> str:
+        """Return the assistant message text for a chat completion"""
+        data = await self.complete(
+            {"messages": messages, "temperature": temperature, "max_tokens": max_tokens}, priority
+        )
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            self.health.record_failure()
+            raise LLMProviderError(f"{self.name} returned no message content", self.name)
+
+    async def stream(self, messages: List[Dict[str, Any]], temperature: float = 0.7,
+                     max_tokens: int = 1024, priority: int = PRIORITY_INTERACTIVE):
+        """Yield content deltas from a streamed chat completion"""
+        first_token = None
+        try:
+            async with self.limiter.slot(priority):
+                started = time.monotonic()
+                async with self.client.stream(
+                    "POST",
+                    self.base_url,
+                    json={"model": self.model, "messages": messages, "temperature": temperature,
+                          "max_tokens": max_tokens, "stream": True},
+                    headers=self._headers()
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[5:].strip()
+                        if payload == "[DONE]":
+                            break
+                        delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                        if delta:
+                            if first_token is None:
+                                first_token = time.monotonic() - started
+                            yield delta
+        except LLMOverloadedError:
+            raise
+        except httpx.HTTPStatusError as e:
+            error = LLMProviderError(f"{self.name} returned {e.response.status_code}", self.name, e.response.status_code)
+            if error.retryable:
+                self.health.record_failure()
+            raise error
+        except Exception as e:
+            self.health.record_failure()
+            raise LLMProviderError(f"{self.name} stream failed: {e}", self.name)
+
+        # Time to first token is what streaming callers wait on
+        self.health.record_success(first_token if first_token is not None else time.monotonic() - started)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50 = self.health.percentile(0.5)
+        p95 = self.health.percentile(0.95)
+        return {
+            "model": self.model,
+            "available": self.health.available,
+            "samples": len(self.health.latencies),
+            "p50_latency": round(p50, 3) if p50 is not None else None,
+            "p95_latency": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.health.error_rate, 3),
+            "concurrency": self.limiter.get_stats()
+        }
+
+
+class LLMRouter:
+    """Routes each call class to the fastest healthy provider, failing over in order of score
+
+    Only transient errors fail over; a client error (e.g. 400, 401) is raised at once.
+    """
+
+    def __init__(self, providers: List[LLMProvider], routes: Dict[str, List[str]]):
+        self.providers = {provider.name: provider for provider in providers}
+        self.routes = {
+            call_class: [name for name in names if name in self.providers]
+            for call_class, names in routes.items()
+        }
+        self.stats = {"calls": 0, "failovers": 0, "exhausted": 0}
+
+    def candidates(self, call_class: str) -> List[LLMProvider]:
+        """Healthy providers fastest first, then open-circuit ones as a last resort"""
+        providers = [self.providers[name] for name in self.routes.get(call_class, [])]
+        if not providers:
+            raise LLMProviderError(f"No LLM provider configured for {call_class}", "router")
+        healthy = sorted((p for p in providers if p.health.available), key=lambda p: p.health.score())
+        tripped = [p for p in providers if not p.health.available]
+        return healthy + tripped
+
+    async def _call(self, call_class: str, method: str, *args, **kwargs):
+        self.stats["calls"] += 1
+        last_error = None
+        for attempt, provider in enumerate(self.candidates(call_class)):
+            if attempt:
+                self.stats["failovers"] += 1
+                logger.warning(f"Failing over {call_class} call to {provider.name} after: {last_error}")
+            try:
+                return await getattr(provider, method)(*args, **kwargs)
+            except LLMProviderError as e:
+                if not e.retryable:
+                    raise
+                last_error = e
+            except LLMOverloadedError as e:
+                last_error = e
+        self.stats["exhausted"] += 1
+        raise last_error
+
+    async def generate(self, messages: List[Dict[str, Any]], call_class: str = CALL_FINAL_ANSWER,
+                       priority: int = PRIORITY_INTERACTIVE, **options) -> str:
+        """Generate a chat completion for a call class"""
+        return await self._call(call_class, "generate", messages, priority=priority, **options)
+
+    async def complete(self, payload: Dict[str, Any], call_class: str,
+                       priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """Send a raw chat completion payload (e.g. multimodal) for a call class"""
+        return await self._call(call_class, "complete", payload, priority)
+
+    async def stream(self, messages: List[Dict[str, Any]], call_class: str = CALL_FINAL_ANSWER,
+                     priority: int = PRIORITY_INTERACTIVE, **options):
+        """Stream a completion; fails over only if a provider breaks before its first token"""
+        self.stats["calls"] += 1
+        last_error = None
+        for attempt, provider in enumerate(self.candidates(call_class)):
+            if attempt:
+                self.stats["failovers"] += 1
+                logger.warning(f"Failing over {call_class} stream to {provider.name} after: {last_error}")
+            started = False
+            try:
+                async for delta in provider.stream(messages, priority=priority, **options):
+                    started = True
+                    yield delta
+                return
+            except (LLMProviderError, LLMOverloadedError) as e:
+                if started or (isinstance(e, LLMProviderError) and not e.retryable):
+                    raise
+                last_error = e
+        self.stats["exhausted"] += 1
+        raise last_error
+
+    async def close(self):
+        for provider in self.providers.values():
+            await provider.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-provider latency/health and the current preferred order per call class"""
+        return {
+            **self.stats,
+            "routes": {
+                call_class: [p.name for p in self.candidates(call_class)]
+                for call_class, names in self.routes.items() if names
+            },
+            "providers": {name: provider.get_stats() for name, provider in self.providers.items()}
+        }
+
+
+def _limiter_from_env() -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(
+        initial_limit=int(os.environ.get("LLM_CONCURRENCY_INITIAL", "8")),
+        max_limit=int(os.environ.get("LLM_CONCURRENCY_MAX", "64"))
+    )
+
+
+def build_router_from_env() -> LLMRouter:
+    """
+    Build the router from environment configuration
+
+    Providers are enabled by their API key; *_BASE_URL overrides point them
+    at other endpoints (or local stubs). LLM_ROUTE_<CALL_CLASS> lists
+    provider names in fallback order, e.g. LLM_ROUTE_ANALYSIS=cerebras,openrouter.
+    """
+    providers = []
+
+    cerebras_key = os.environ.get("CEREBRAS_API_KEY")
+    if cerebras_key:
+        providers.append(LLMProvider(
+            "cerebras",
+            os.environ.get("CEREBRAS_BASE_URL", "https://api.cerebras.ai/v1/chat/completions"),
+            cerebras_key,
+            os.environ.get("CEREBRAS_MODEL", "llama3.1-8b"),
+            limiter=_limiter_from_env()
+        ))
+
+    openrouter_key = os.environ.get("OPENROUTER_API_KEY")
+    if openrouter_key:
+        openrouter_url = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1/chat/completions")
+        openrouter_headers = {"HTTP-Referer": "https://farmchat.ai", "X-Title": "FarmChat Agricultural Analysis"}
+        providers.append(LLMProvider(
+            "openrouter",
+            openrouter_url,
+            openrouter_key,
+            os.environ.get("OPENROUTER_CHAT_MODEL", "meta-llama/llama-3.1-8b-instruct"),
+            extra_headers=openrouter_headers,
+            limiter=_limiter_from_env()
+        ))
+        providers.append(LLMProvider(
+            "openrouter-vision",
+            openrouter_url,
+            openrouter_key,
+            os.environ.get("OPENROUTER_VISION_MODEL", "meta-llama/llama-3.2-11b-vision-instruct"),
+            timeout=30.0,
+            extra_headers=openrouter_headers,
+            limiter=_limiter_from_env()
+        ))
+
+    default_routes = {
+        CALL_ANALYSIS: "cerebras,openrouter",
+        CALL_SYNTHESIS: "cerebras,openrouter",
+        CALL_FINAL_ANSWER: "cerebras,openrouter",
+        CALL_VISION: "openrouter-vision",
+    }
+    routes = {
+        call_class: [name.strip() for name in os.environ.get(f"LLM_ROUTE_{call_class.upper()}", default).split(",")
+                     if name.strip()]
+        for call_class, default in default_routes.items()
+    }
+
+    logger.info(f"LLM router providers: {[p.name for p in providers]}")
+    return LLMRouter(providers, routes)
@@ -8,12 +8,17 @@ import random
 from datetime import datetime, timedelta
 import uuid
 
+from shared_state import SharedStateBackend, InMemoryStateBackend
+
+LISTINGS_NAMESPACE = "marketplace_listings"
+
 class MarketplaceDatabase:
     """Database for surplus marketplace functionality"""
     
-    def __init__(self):
-        # In-memory storage for hackathon demo
-        self.listings = {}
+    def __init__(self, state: Optional[SharedStateBackend] = None):
+        # Listings live in the shared state backend so every worker sees them;
+        # the server swaps in the configured backend on startup
+        self.state = state or InMemoryStateBackend()
         self.mock_buyers = [
             {
                 "id": "buyer_001",
@@ -137,7 +142,7 @@ class MarketplaceDatabase:
             }
         ]
     
-    def create_listing(self, user_id: str, listing_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_listing(self, user_id: str, listing_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new surplus listing"""
         listing_id = str(uuid.uuid4())
         
@@ -156,53 +161,65 @@ class MarketplaceDatabase:
             "updated_at": datetime.now().isoformat()
         }
         
-        self.listings[listing_id] = listing
+        await self.state.set(LISTINGS_NAMESPACE, listing_id, listing)
+        return listing
+    
+    async def get_listing(self, listing_id: str, viewer_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get one listing with its offers; views by anyone but the seller are counted"""
+        listing = await self.state.get(LISTINGS_NAMESPACE, listing_id)
+        if not listing:
+            return None
+        if viewer_id != listing["user_id"]:
+            listing["views"] = await self.record_view(listing_id) or listing["views"]
+        listing["offers"] = self.generate_mock_offers(listing)
         return listing
     
-    def get_user_listings(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_user_listings(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all listings for a specific user"""
         user_listings = []
-        for listing in self.listings.values():
+        for listing in await self.state.values(LISTINGS_NAMESPACE):
             if listing["user_id"] == user_id:
                 # Add mock offers for each listing
                 listing_with_offers = listing.copy()
                 listing_with_offers["offers"] = self.generate_mock_offers(listing)
-                listing_with_offers["views"] = random.randint(5, 50)
+                # Demo view count until real views are recorded
+                listing_with_offers["views"] = listing["views"] or random.randint(5, 50)
                 user_listings.append(listing_with_offers)
         
         # Sort by creation date (newest first)
         user_listings.sort(key=lambda x: x["created_at"], reverse=True)
         return user_listings
     
-    def update_listing(self, listing_id: str, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def update_listing(self, listing_id: str, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a listing"""
-        if listing_id not in self.listings:
+        listing = await self.state.get(LISTINGS_NAMESPACE, listing_id)
+        if not listing:
             return None
         
-        listing = self.listings[listing_id]
         if listing["user_id"] != user_id:
             return None  # User can only update their own listings
         
-        # Update allowed fields
+        # Update allowed fields; only the changed fields are written
         allowed_fields = ["crop_type", "quantity", "price_per_unit", "ready_date", "quality_grade", "description", "status"]
-        for field in allowed_fields:
-            if field in updates:
-                listing[field] = updates[field]
-        
-        listing["updated_at"] = datetime.now().isoformat()
-        return listing
+        changes = {field: updates[field] for field in allowed_fields if field in updates}
+        changes["updated_at"] = datetime.now().isoformat()
+        return await self.state.update(LISTINGS_NAMESPACE, listing_id, changes)
     
-    def delete_listing(self, listing_id: str, user_id: str) -> bool:
+    async def delete_listing(self, listing_id: str, user_id: str) -> bool:
         """Delete a listing"""
-        if listing_id not in self.listings:
+        listing = await self.state.get(LISTINGS_NAMESPACE, listing_id)
+        if not listing:
             return False
         
-        listing = self.listings[listing_id]
         if listing["user_id"] != user_id:
             return False  # User can only delete their own listings
         
-        del self.listings[listing_id]
-        return True
+        return await self.state.delete(LISTINGS_NAMESPACE, listing_id)
+    
+    async def record_view(self, listing_id: str) -> int:
+        """Count a buyer view of a listing; atomic across workers"""
+        views = await self.state.incr_existing(LISTINGS_NAMESPACE, listing_id, "views")
+        return views or 0
     
     def generate_mock_offers(self, listing: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate realistic mock offers for a listing"""
@@ -283,16 +300,17 @@ class MarketplaceDatabase:
         
         return 500  # Default fallback
     
-    def get_marketplace_stats(self) -> Dict[str, Any]:
+    async def get_marketplace_stats(self) -> Dict[str, Any]:
         """Get marketplace statistics"""
-        total_listings = len(self.listings)
-        active_listings = len([l for l in self.listings.values() if l["status"] == "active"])
+        listings = await self.state.values(LISTINGS_NAMESPACE)
+        total_listings = len(listings)
+        active_listings = len([l for l in listings if l["status"] == "active"])
         total_buyers = len(self.mock_buyers)
         
         # Calculate total value of active listings
         total_value = sum(
             l["quantity"] * l["price_per_unit"] 
-            for l in self.listings.values() 
+            for l in listings 
             if l["status"] == "active"
         )
         
@@ -301,7 +319,7 @@ class MarketplaceDatabase:
             "active_listings": active_listings,
             "total_buyers": total_buyers,
             "total_value": round(total_value, 2),
-            "avg_price_per_kg": round(total_value / max(sum(l["quantity"] for l in self.listings.values() if l["status"] == "active"), 1), 2)
+            "avg_price_per_kg": round(total_value / max(sum(l["quantity"] for l in listings if l["status"] == "active"), 1), 2)
         }
 
 # Global instance for easy access
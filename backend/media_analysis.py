@@ -9,7 +9,6 @@ import json
 import logging
 from typing import Dict, List, Optional, Any, Literal
 from datetime import datetime, timezone
-from PIL import Image
 import httpx
 from pydantic import BaseModel
 import os
@@ -32,9 +31,9 @@ class MediaAnalysis(BaseModel):
     created_at: datetime
 
 class MediaAnalysisService:
-    def __init__(self, openrouter_api_key: str):
+    def __init__(self, openrouter_api_key: str, llm_router=None):
         self.api_key = openrouter_api_key
-        self.llama_vision = LlamaVisionService(openrouter_api_key)
+        self.llama_vision = LlamaVisionService(openrouter_api_key, llm_router)
         
         # Supported formats
         self.supported_image_formats = {'jpeg', 'jpg', 'png', 'webp', 'heic'}
@@ -79,6 +78,8 @@ class MediaAnalysisService:
     def compress_image(self, image_data: bytes) -> bytes:
         """Simple image compression for large files"""
         try:
+            # Pillow is only needed for uploads, so it is imported on first use
+            from PIL import Image
             image = Image.open(io.BytesIO(image_data))
             
             # Resize if too large
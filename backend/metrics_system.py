@@ -9,8 +9,13 @@ import json
 from collections import defaultdict, Counter
 import asyncio
 
+from shared_state import SharedStateBackend, InMemoryStateBackend
+
 logger = logging.getLogger(__name__)
 
+COUNTERS_NAMESPACE = "metrics"
+PERFORMANCE_COUNTERS_KEY = "performance"
+
 class PerformanceMetrics:
     """Tracks system performance metrics"""
     
@@ -239,8 +244,10 @@ class ComparisonMetrics:
 class MetricsSystem:
     """Comprehensive metrics system for agricultural AI"""
     
-    def __init__(self, db):
+    def __init__(self, db, state: Optional[SharedStateBackend] = None):
         self.db = db
+        # With a shared backend the request counters are aggregated across workers
+        self.state = state or InMemoryStateBackend()
         self.performance = PerformanceMetrics()
         self.impact = ImpactMetrics()
         self.comparison = ComparisonMetrics()
@@ -313,10 +320,51 @@ class MetricsSystem:
         else:
             self.performance.record_error("request_failed", tool_used)
         
+        if self.state.shared:
+            await self._record_shared_counters(tool_used, language, success)
+        
         # Save to database periodically
         if self.performance.total_requests % 10 == 0:
             await self._save_metrics_to_db()
     
+    async def _record_shared_counters(self, tool_used: Optional[str], language: str, success: bool):
+        """Mirror the request counters into the shared backend in one atomic update"""
+        increments = {"total_requests": 1}
+        if success:
+            increments[f"language:{language}"] = 1
+            if tool_used:
+                increments[f"tool:{tool_used}"] = 1
+        else:
+            error_key = f"request_failed_{tool_used}" if tool_used else "request_failed"
+            increments[f"error:{error_key}"] = 1
+        try:
+            await self.state.incr_many(COUNTERS_NAMESPACE, PERFORMANCE_COUNTERS_KEY, increments)
+        except Exception as e:
+            logger.error(f"Failed to update shared metrics counters: {e}")
+    
+    async def sync_shared_counters(self):
+        """Replace the local request counters with the totals across all workers"""
+        if not self.state.shared:
+            return
+        try:
+            counters = await self.state.get(COUNTERS_NAMESPACE, PERFORMANCE_COUNTERS_KEY)
+        except Exception as e:
+            logger.error(f"Failed to read shared metrics counters: {e}")
+            return
+        if not counters:
+            return
+        
+        tools, languages, errors = defaultdict(int), defaultdict(int), defaultdict(int)
+        groups = {"tool": tools, "language": languages, "error": errors}
+        for name, value in counters.items():
+            group, _, label = name.partition(":")
+            if group in groups:
+                groups[group][label] = value
+        self.performance.total_requests = counters.get("total_requests", 0)
+        self.performance.tool_usage_stats = tools
+        self.performance.language_usage = languages
+        self.performance.error_counts = errors
+    
     async def record_agricultural_impact(self, impact_type: str, value: float, 
                                        farmer_id: str, category: str):
         """Record agricultural impact metrics"""
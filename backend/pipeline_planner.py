@@ -0,0 +1,110 @@
+"""
+Adaptive Pipeline Planner
+Chooses how many LLM hops a request needs after analysis and tool execution,
+and keeps per-plan latency/quality statistics for tuning the thresholds.
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Full: separate synthesis call, then response (3 LLM calls including analysis)
+PLAN_FULL = "full"
+# Merged: synthesis instructions folded into the response call (2 LLM calls)
+PLAN_MERGED = "merged"
+# Direct: no synthesis at all (2 LLM calls, smallest prompt)
+PLAN_DIRECT = "direct"
+
+LLM_CALLS_PER_PLAN = {PLAN_FULL: 3, PLAN_MERGED: 2, PLAN_DIRECT: 2}
+
+MAX_RESPONSE_WORDS = 150
+_NUMBER_PATTERN = re.compile(r"\d[\d,]*")
+
+
+def estimate_response_quality(response: str, tool_results: Dict[str, Any], tools_used: List[str]) -> float:
+    """
+    Cheap 0-1 quality proxy for comparing plans
+
+    Rewards a non-empty answer within the word limit that carries through
+    the numbers from price data and mentions more than one data source when
+    several tools contributed.
+    """
+    if not response or not response.strip():
+        return 0.0
+
+    score = 0.4
+    words = len(response.split())
+    if words <= MAX_RESPONSE_WORDS:
+        score += 0.2
+    elif words <= MAX_RESPONSE_WORDS * 1.5:
+        score += 0.1
+
+    if "crop-price" in tools_used:
+        if _NUMBER_PATTERN.search(response):
+            score += 0.2
+    else:
+        score += 0.2
+
+    if len(tools_used) > 1:
+        # Multi-source answers should be noticeably longer than a one-liner
+        if words >= 40:
+            score += 0.2
+    else:
+        score += 0.2
+
+    return round(min(score, 1.0), 3)
+
+
+class PipelinePlanner:
+    """Picks the reduced plan when a separate synthesis call is unlikely to pay off"""
+
+    def __init__(self, min_tools_for_full: int = 2, window_size: int = 500):
+        self.min_tools_for_full = min_tools_for_full
+        self.window_size = window_size
+        self.history: Dict[str, deque] = {
+            plan: deque(maxlen=window_size) for plan in LLM_CALLS_PER_PLAN
+        }
+
+    def choose_plan(self, analysis: Dict[str, Any], tools_used: List[str]) -> str:
+        """Decide the plan from analysis complexity and which tools returned data"""
+        complexity = analysis.get("complexity_level", "simple")
+        synthesis_requirements = analysis.get("synthesis_requirements") or []
+
+        if complexity not in ("moderate", "complex") or not tools_used or not synthesis_requirements:
+            return PLAN_DIRECT
+
+        # Correlating data needs at least two sources; with one the response call can do it
+        if complexity == "complex" and len(tools_used) >= self.min_tools_for_full:
+            return PLAN_FULL
+
+        return PLAN_MERGED
+
+    def record(self, plan: str, durations: Dict[str, float], quality: float,
+               complexity: Optional[str] = None):
+        """Record one request's latency and quality under the plan it used"""
+        total = durations.get("total_duration", 0.0)
+        self.history[plan].append({"total": total, "quality": quality, "complexity": complexity})
+        logger.info(
+            f"Pipeline plan {plan} ({complexity}): {total:.2f}s, quality {quality:.2f}, "
+            f"{LLM_CALLS_PER_PLAN[plan]} LLM calls"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-plan latency/quality comparison over the recent window"""
+        stats = {}
+        for plan, samples in self.history.items():
+            if not samples:
+                stats[plan] = {"requests": 0, "llm_calls": LLM_CALLS_PER_PLAN[plan]}
+                continue
+            totals = sorted(sample["total"] for sample in samples)
+            stats[plan] = {
+                "requests": len(samples),
+                "llm_calls": LLM_CALLS_PER_PLAN[plan],
+                "avg_duration": round(sum(totals) / len(totals), 3),
+                "p95_duration": round(totals[min(len(totals) - 1, int(len(totals) * 0.95))], 3),
+                "avg_quality": round(sum(sample["quality"] for sample in samples) / len(samples), 3)
+            }
+        return stats
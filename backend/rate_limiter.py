@@ -0,0 +1,331 @@
+"""
+Cost-Weighted Rate Limiting
+Token buckets keyed per user, per phone number and per client IP guard the
+endpoints that spend LLM, vision and SMS budget. Each request takes tokens
+according to its cost, so a vision upload drains a bucket faster than a chat
+message. Buckets refill continuously, which gives a sliding window rather than
+fixed windows that allow double bursts at the boundaries.
+
+Two backends: an in-process one for a single worker, and a Redis one whose
+check-and-take is a single Lua script, so limits hold across workers.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCOPE_USER = "user"
+SCOPE_PHONE = "phone"
+SCOPE_IP = "ip"
+
+
+@dataclass
+class BucketLimit:
+    """Bucket size and refill speed for one scope"""
+    capacity: float
+    refill_per_second: float
+
+
+@dataclass
+class RateDecision:
+    allowed: bool
+    remaining: float
+    retry_after: float  # seconds until the request would be allowed
+
+
+@dataclass
+class RouteRule:
+    """Which buckets a route draws from, and how much it costs"""
+    method: str
+    path: str
+    scopes: Tuple[str, ...]
+    cost: Callable[[Dict[str, str]], float]
+
+
+def _take(tokens: float, updated_at: float, now: float, cost: float,
+          limit: BucketLimit) -> Tuple[float, RateDecision]:
+    """Refill then try to take cost tokens; returns the new level and the decision"""
+    tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_per_second)
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, RateDecision(True, tokens, 0.0)
+    return tokens, RateDecision(False, tokens, (cost - tokens) / limit.refill_per_second)
+
+
+class InMemoryRateLimitBackend:
+    """Buckets in a process-local dict ordered by last use; the least recently used are evicted when full"""
+
+    name = "memory"
+
+    def __init__(self, max_buckets: int = 50000):
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _store(self, key: str, tokens: float, now: float):
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_buckets:
+            self.buckets.popitem(last=False)
+
+    async def acquire(self, key: str, cost: float, limit: BucketLimit, limits: Dict[str, BucketLimit]) -> RateDecision:
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (limit.capacity, now))
+        tokens, decision = _take(tokens, updated_at, now, cost, limit)
+        self._store(key, tokens, now)
+        return decision
+
+    async def charge(self, key: str, cost: float, limit: BucketLimit):
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_per_second)
+        # Post-hoc charges may overdraw the bucket, delaying the next request
+        self._store(key, max(tokens - cost, -limit.capacity), now)
+
+
+# KEYS[1] bucket hash; ARGV: capacity, refill/s, cost, now (s), allow_debt (0/1)
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local allow_debt = ARGV[5] == '1'
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+elseif allow_debt then
+    tokens = math.max(tokens - cost, -capacity)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity * 2 / rate) * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Buckets in Redis hashes, checked and updated atomically by one script call"""
+
+    name = "redis"
+
+    def __init__(self, redis_url: str, prefix: str = "farmchat:ratelimit"):
+        import redis.asyncio as redis_asyncio
+        self.client = redis_asyncio.from_url(redis_url, decode_responses=True)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def _run(self, key: str, cost: float, limit: BucketLimit, allow_debt: bool) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(
+            keys=[f"{self.prefix}:{key}"],
+            args=[limit.capacity, limit.refill_per_second, cost, time.time(), "1" if allow_debt else "0"]
+        )
+        return bool(allowed), float(tokens)
+
+    async def acquire(self, key: str, cost: float, limit: BucketLimit, limits: Dict[str, BucketLimit]) -> RateDecision:
+        allowed, tokens = await self._run(key, cost, limit, allow_debt=False)
+        if allowed:
+            return RateDecision(True, tokens, 0.0)
+        return RateDecision(False, tokens, (cost - tokens) / limit.refill_per_second)
+
+    async def charge(self, key: str, cost: float, limit: BucketLimit):
+        await self._run(key, cost, limit, allow_debt=True)
+
+    async def close(self):
+        await self.client.close()
+
+
+class RateLimiter:
+    """Applies per-scope bucket limits through a backend"""
+
+    def __init__(self, limits: Dict[str, BucketLimit], backend=None, enabled: bool = True):
+        self.limits = limits
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.enabled = enabled
+        self.stats = {"allowed": 0, "limited": 0, "backend_errors": 0, "limited_by_scope": {}}
+
+    async def check(self, identities: Dict[str, str], cost: float) -> RateDecision:
+        """Take cost tokens from every identified scope; limited if any bucket is short
+
+        Buckets are drawn one at a time, so a request refused by a later scope
+        has already spent tokens in the earlier ones - it still counts as traffic.
+        """
+        if not self.enabled:
+            return RateDecision(True, math.inf, 0.0)
+
+        worst = RateDecision(True, math.inf, 0.0)
+        for scope, identity in identities.items():
+            limit = self.limits.get(scope)
+            if limit is None or not identity:
+                continue
+            try:
+                decision = await self.backend.acquire(f"{scope}:{identity}", cost, limit, self.limits)
+            except Exception as e:
+                # Fail open: an unavailable limiter must not take the API down
+                self.stats["backend_errors"] += 1
+                logger.warning(f"Rate limit backend error: {e}")
+                continue
+            if not decision.allowed:
+                self.stats["limited_by_scope"][scope] = self.stats["limited_by_scope"].get(scope, 0) + 1
+                if worst.allowed or decision.retry_after > worst.retry_after:
+                    worst = decision
+            elif worst.allowed:
+                worst = RateDecision(True, min(worst.remaining, decision.remaining), 0.0)
+
+        self.stats["allowed" if worst.allowed else "limited"] += 1
+        return worst
+
+    async def charge(self, scope: str, identity: str, cost: float):
+        """Bill extra cost discovered after the request ran (e.g. tool calls)"""
+        limit = self.limits.get(scope)
+        if not self.enabled or limit is None or not identity or cost <= 0:
+            return
+        try:
+            await self.backend.charge(f"{scope}:{identity}", cost, limit)
+        except Exception as e:
+            self.stats["backend_errors"] += 1
+            logger.warning(f"Rate limit backend error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, backend=self.backend.name, enabled=self.enabled)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing RouteRules before the request reaches the app
+
+    The user is identified by identify_user(authorization_header); the phone
+    number is read from the JSON body for rules with the phone scope (the body
+    is buffered and replayed to the app). The client IP is the X-Forwarded-For
+    entry added by the outermost of trusted_proxy_hops proxies; entries to its
+    left are client-supplied and ignored.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, rules: List[RouteRule],
+                 identify_user: Callable[[str], Optional[str]],
+                 normalize_phone: Callable[[str], str],
+                 messages: Dict[str, str], trusted_proxy_hops: int = 1):
+        self.app = app
+        self.limiter = limiter
+        self.rules = {(rule.method, rule.path): rule for rule in rules}
+        self.identify_user = identify_user
+        self.normalize_phone = normalize_phone
+        self.messages = messages
+        self.trusted_proxy_hops = trusted_proxy_hops
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        rule = self.rules.get((scope["method"], scope["path"]))
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        identities = {}
+        if SCOPE_IP in rule.scopes:
+            identities[SCOPE_IP] = self._client_ip(scope, headers)
+        if SCOPE_USER in rule.scopes:
+            identities[SCOPE_USER] = self.identify_user(headers.get("authorization", ""))
+        if SCOPE_PHONE in rule.scopes:
+            body, receive = await self._buffer_body(receive)
+            identities[SCOPE_PHONE] = self._phone_from_body(body)
+
+        decision = await self.limiter.check(identities, rule.cost(headers))
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = max(1, math.ceil(decision.retry_after))
+        language = headers.get("accept-language", "en")[:2].lower()
+        payload = json.dumps({"detail": {
+            "error": "rate_limit_error",
+            "message": self.messages.get(language, self.messages["en"]),
+            "retry_after": retry_after
+        }}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"retry-after", str(retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    def _client_ip(self, scope, headers: Dict[str, str]) -> str:
+        # Each trusted proxy appends the address it received from, so counting
+        # from the right skips whatever the client put in the header itself
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded and self.trusted_proxy_hops > 0:
+            entries = [entry.strip() for entry in forwarded.split(",")]
+            if len(entries) >= self.trusted_proxy_hops and entries[-self.trusted_proxy_hops]:
+                return entries[-self.trusted_proxy_hops]
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    @staticmethod
+    async def _buffer_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    def _phone_from_body(self, body: bytes) -> Optional[str]:
+        try:
+            return self.normalize_phone(json.loads(body).get("phone_number", ""))
+        except Exception:
+            return None  # Invalid numbers are rejected by the endpoint itself
+
+
+def build_rate_limiter_from_env() -> RateLimiter:
+    """
+    RATE_LIMIT_ENABLED toggles limiting; RATE_LIMIT_BACKEND is memory or redis.
+    Bucket sizes come from RATE_LIMIT_<SCOPE>_CAPACITY and RATE_LIMIT_<SCOPE>_PER_MINUTE.
+    """
+    defaults = {
+        SCOPE_USER: (30, 30),    # ~30 chat messages a minute, bursts of 30
+        SCOPE_IP: (60, 60),      # Shared NAT on rural networks needs headroom
+        SCOPE_PHONE: (3, 0.5),   # 3 OTP SMS, then one every 2 minutes
+    }
+    limits = {}
+    for scope, (capacity, per_minute) in defaults.items():
+        capacity = float(os.environ.get(f"RATE_LIMIT_{scope.upper()}_CAPACITY", capacity))
+        per_minute = float(os.environ.get(f"RATE_LIMIT_{scope.upper()}_PER_MINUTE", per_minute))
+        limits[scope] = BucketLimit(capacity, per_minute / 60)
+
+    backend = None
+    if os.environ.get("RATE_LIMIT_BACKEND", "memory").lower() == "redis":
+        try:
+            backend = RedisRateLimitBackend(os.environ.get("REDIS_URL", "redis://localhost:6379"))
+        except Exception as e:
+            logger.warning(f"Redis rate limit backend unavailable, using in-process buckets: {e}")
+
+    enabled = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    return RateLimiter(limits, backend, enabled)
@@ -0,0 +1,131 @@
+"""
+Reasoning Trace Cold Storage
+Keeps bulky reasoning_steps payloads out of the hot chat_messages collection.
+Traces are compressed and stored in a side collection keyed by message id,
+and only loaded when a client explicitly asks to see the reasoning.
+"""
+
+import json
+import logging
+import zlib
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+
+
+class ReasoningStore:
+    """Compressed, lazily loaded storage for assistant reasoning traces"""
+
+    def __init__(self, db, collection_name: str = "reasoning_traces", compression_level: int = 6):
+        self.db = db
+        self.collection_name = collection_name
+        self.compression_level = compression_level
+        self.codec = CODEC_ZSTD if zstandard else CODEC_ZLIB
+
+    @property
+    def collection(self):
+        return getattr(self.db, self.collection_name)
+
+    async def ensure_indexes(self):
+        """Create the lookup indexes for the trace collection"""
+        try:
+            await self.collection.create_index(
+                [("message_id", ASCENDING)], name="message_id", unique=True, background=True
+            )
+            await self.collection.create_index(
+                [("user_id", ASCENDING), ("conversation_id", ASCENDING)],
+                name="user_conversation", background=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not ensure reasoning trace indexes: {e}")
+
+    def compress(self, reasoning_steps: List[Dict[str, Any]]) -> bytes:
+        """Serialize and compress a reasoning trace"""
+        raw = json.dumps(reasoning_steps, separators=(",", ":"), default=str).encode("utf-8")
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(raw)
+        return zlib.compress(raw, self.compression_level)
+
+    def decompress(self, payload: bytes, codec: str) -> List[Dict[str, Any]]:
+        """Decompress a stored trace written with the given codec"""
+        if codec == CODEC_ZSTD:
+            if not zstandard:
+                raise RuntimeError("zstandard is required to read zstd-compressed reasoning traces")
+            raw = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            raw = zlib.decompress(payload)
+        return json.loads(raw)
+
+    def build_document(self, message_id: str, user_id: str, conversation_id: str,
+                       reasoning_steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the side-collection document for a trace"""
+        payload = self.compress(reasoning_steps)
+        return {
+            "message_id": message_id,
+            "user_id": user_id,
+            "conversation_id": conversation_id,
+            "codec": self.codec,
+            "payload": payload,
+            "step_count": len(reasoning_steps),
+            "compressed_size": len(payload),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+
+    async def save(self, message_id: str, user_id: str, conversation_id: str,
+                   reasoning_steps: List[Dict[str, Any]]) -> bool:
+        """Store a reasoning trace for an assistant message"""
+        if not reasoning_steps:
+            return False
+
+        try:
+            document = self.build_document(message_id, user_id, conversation_id, reasoning_steps)
+            await self.collection.insert_one(document)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to store reasoning trace for {message_id}: {e}")
+            return False
+
+    async def load(self, message_id: str, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Load the reasoning trace for a single message owned by the user"""
+        document = await self.collection.find_one(
+            {"message_id": message_id, "user_id": user_id},
+            {"_id": 0, "payload": 1, "codec": 1}
+        )
+        if not document:
+            return None
+        return self.decompress(document["payload"], document.get("codec", CODEC_ZLIB))
+
+    async def load_many(self, message_ids: List[str], user_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Load reasoning traces for several messages in one round-trip"""
+        if not message_ids:
+            return {}
+
+        documents = await self.collection.find(
+            {"message_id": {"$in": message_ids}, "user_id": user_id},
+            {"_id": 0, "message_id": 1, "payload": 1, "codec": 1}
+        ).to_list(len(message_ids))
+
+        traces = {}
+        for document in documents:
+            try:
+                traces[document["message_id"]] = self.decompress(
+                    document["payload"], document.get("codec", CODEC_ZLIB)
+                )
+            except Exception as e:
+                logger.error(f"Failed to decode reasoning trace {document.get('message_id')}: {e}")
+        return traces
+
+    async def delete_conversation(self, conversation_id: str, user_id: str):
+        """Remove all traces belonging to a conversation"""
+        await self.collection.delete_many({"conversation_id": conversation_id, "user_id": user_id})
@@ -1,40 +1,72 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from dotenv import load_dotenv
-from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-import logging
-from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
-import uuid
-from datetime import datetime, timedelta, timezone
-import jwt
-import bcrypt
-import httpx
-import json
-import time
-import asyncio
-from functools import lru_cache
-import redis
-from cachetools import TTLCache
-import aiofiles
-
-# Import backend modules
-from database import get_database
-from models import User, ChatMessage, Conversation
-from cultural_context import CulturalContextManager
-from conversational_memory import ConversationalMemory, FarmProfile
-from agricultural_rag import AgriculturalRAG
-from voice_stt_service import VoiceSTTService
-from workflow_engine import WorkflowEngine
-from metrics_system import MetricsSystem
-from media_analysis import MediaAnalysisService, MediaAnalysis
-from schemes_database import schemes_db
-from marketplace_database import marketplace_db
+# Imported first so the rest of the import cost is measured
+from service_container import startup_profiler, lazy_service, timed_init
+
+with startup_profiler.phase("imports.framework"):
+    from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Response
+    from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+    from fastapi.middleware.gzip import GZipMiddleware
+    from fastapi.middleware.trustedhost import TrustedHostMiddleware
+    from fastapi.responses import StreamingResponse
+    from dotenv import load_dotenv
+    from starlette.middleware.cors import CORSMiddleware
+    from motor.motor_asyncio import AsyncIOMotorClient
+    import os
+    import logging
+    from pathlib import Path
+    from pydantic import BaseModel, Field, EmailStr
+    from typing import List, Optional, Dict, Any
+    import uuid
+    from datetime import datetime, timedelta, timezone
+    import jwt
+    import bcrypt
+    import httpx
+    import json
+    import time
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import lru_cache
+    import redis
+    from cachetools import TTLCache
+    import aiofiles
+
+# Import backend modules. Optional subsystems (voice, conversational memory)
+# are imported by their lazy_service factories instead.
+with startup_profiler.phase("imports.backend"):
+    from database import get_database, MockDatabase
+    from models import User, ChatMessage, Conversation
+    from cultural_context import CulturalContextManager
+    from agricultural_rag import AgriculturalRAG
+    from workflow_engine import WorkflowEngine, WORKFLOW_BUSY_ERROR
+    from metrics_system import MetricsSystem
+    from media_analysis import MediaAnalysisService, MediaAnalysis
+    from schemes_database import schemes_db
+    from marketplace_database import marketplace_db
+    from chat_history import (
+        ensure_chat_indexes, fetch_page,
+        MESSAGE_SUMMARY_PROJECTION, CONVERSATION_SUMMARY_PROJECTION
+    )
+    from reasoning_store import ReasoningStore
+    from chat_persistence import ChatPersistenceQueue
+    from context_builder import (
+        ContextBuilder, compact_tool_payload, compact_tool_results, fit_history,
+        CONTEXT_TOKEN_BUDGET
+    )
+    from speculative_prefetch import SpeculativePrefetcher, Speculation
+    from llm_limiter import LLMOverloadedError, OVERLOAD_STATUS_CODES, PRIORITY_INTERACTIVE, PRIORITY_SYNTHESIS
+    from llm_router import (
+        LLMRouter, LLMProviderError, build_router_from_env, CALL_ANALYSIS, CALL_SYNTHESIS, CALL_FINAL_ANSWER
+    )
+    from llm_json import parse_llm_json, IncrementalJSONParser, StructuredOutputError
+    from pipeline_planner import (
+        PipelinePlanner, PLAN_FULL, PLAN_MERGED, LLM_CALLS_PER_PLAN, estimate_response_quality
+    )
+    from language_id import LanguageGuess, identify_language
+    from template_answers import TemplateAnswerEngine
+    from cache_warmer import CacheWarmer
+    from text_helpers import clean_markdown, extract_crop_from_message, create_cache_key
+    from shared_state import SharedStateBackend, InMemoryStateBackend, MongoStateBackend, build_state_backend_from_env
+    from rate_limiter import RateLimitMiddleware, RouteRule, build_rate_limiter_from_env, SCOPE_USER, SCOPE_PHONE, SCOPE_IP
+    from job_scheduler import JobScheduler
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -79,8 +111,25 @@ conversation_cache = TTLCache(maxsize=5000, ttl=600)  # 10 minute TTL for conver
 tool_result_cache = TTLCache(maxsize=1500, ttl=900)  # 15 minute TTL for tool results
 voice_cache = TTLCache(maxsize=500, ttl=300)  # 5 minute TTL for voice responses
 
-# Redis connection will be initialized after logger is defined
+# Conversation history ring buffer: the window evaluate_and_respond actually sends to the LLM
+CONVERSATION_HISTORY_WINDOW = 6  # Last 3 exchanges
+CONVERSATION_CACHE_TTL = 600
+
+# Redis is connected in the background from the startup hook; until then caches are in-memory only
 redis_client = None
+redis_connect_task = None
+REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', '1.0'))
+
+# Compressed reasoning trace storage and write-behind chat persistence, bound to the database on startup
+reasoning_store = None
+persistence_queue = None
+cache_warmer = None
+# Recurring background jobs (scheduled workflow refreshes), started on startup
+job_scheduler = None
+
+# OTP codes, listings, workflow instances and metrics counters; replaced on startup
+# by the backend chosen with SHARED_STATE_BACKEND so several workers can share it
+shared_state: SharedStateBackend = InMemoryStateBackend()
 
 # Performance monitoring
 request_times = []
@@ -123,15 +172,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Redis connection after logger is available
-try:
-    redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379')
-    redis_client = redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=5)
-    redis_client.ping()  # Test connection
-    logger.info("Redis connected successfully")
-except Exception as e:
-    logger.info(f"Redis not available, using in-memory cache only: {e}")
-    redis_client = None
+def connect_redis():
+    """Connect the response/conversation cache to Redis; blocking, so run it off the event loop"""
+    global redis_client
+    try:
+        redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379')
+        candidate = redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=REDIS_CONNECT_TIMEOUT)
+        candidate.ping()  # Test connection
+        redis_client = candidate
+        logger.info("Redis connected successfully")
+    except Exception as e:
+        logger.info(f"Redis not available, using in-memory cache only: {e}")
+        redis_client = None
 
 # ==================== Error Messages ====================
 
@@ -194,22 +246,17 @@ async def set_cached_response(cache_key: str, response: Dict[str, Any], ttl: int
     except Exception as e:
         logger.debug(f"Cache storage error: {e}")
 
-def create_cache_key(user_id: str, message: str, language: str = "en") -> str:
-    """Create a cache key for responses"""
-    import hashlib
-    # Normalize message for caching
-    normalized = message.lower().strip()
-    key_data = f"{user_id}:{normalized}:{language}"
-    return f"response:{hashlib.md5(key_data.encode()).hexdigest()}"
-
 async def get_conversation_from_cache(conversation_id: str, user_id: str) -> Optional[List[Dict]]:
-    """Get conversation history from cache"""
+    """Get conversation history from cache, None on a miss"""
     cache_key = f"conv:{conversation_id}:{user_id}"
     try:
         if redis_client:
-            cached = redis_client.get(cache_key)
-            if cached:
-                return json.loads(cached)
+            pipe = redis_client.pipeline()
+            pipe.exists(cache_key)
+            pipe.lrange(cache_key, 0, -1)
+            exists, cached = pipe.execute()
+            if exists:
+                return [json.loads(item) for item in cached]
         
         return conversation_cache.get(cache_key)
     except Exception as e:
@@ -217,16 +264,50 @@ async def get_conversation_from_cache(conversation_id: str, user_id: str) -> Opt
         return None
 
 async def cache_conversation(conversation_id: str, user_id: str, messages: List[Dict]):
-    """Cache conversation history"""
+    """Cache conversation history, trimmed to the history window"""
     cache_key = f"conv:{conversation_id}:{user_id}"
+    window = list(messages[-CONVERSATION_HISTORY_WINDOW:])
     try:
         if redis_client:
-            redis_client.setex(cache_key, 600, json.dumps(messages))
-        
-        conversation_cache[cache_key] = messages
+            # Redis cannot hold an empty list, so empty histories live in memory only
+            pipe = redis_client.pipeline()
+            pipe.delete(cache_key)
+            if window:
+                pipe.rpush(cache_key, *[json.dumps(msg) for msg in window])
+                pipe.expire(cache_key, CONVERSATION_CACHE_TTL)
+            pipe.execute()
+        
+        conversation_cache[cache_key] = window
     except Exception as e:
         logger.debug(f"Conversation cache storage error: {e}")
 
+async def append_to_conversation_cache(conversation_id: str, user_id: str,
+                                       known_history: List[Dict], new_messages: List[Dict]):
+    """Append new messages to the cached ring buffer in place
+    
+    known_history is the window this request already loaded; it seeds the buffer
+    when the entry expired so the cache never holds a truncated conversation.
+    """
+    cache_key = f"conv:{conversation_id}:{user_id}"
+    try:
+        if redis_client:
+            pipe = redis_client.pipeline()
+            pipe.exists(cache_key)
+            pipe.rpush(cache_key, *[json.dumps(msg) for msg in new_messages])
+            pipe.ltrim(cache_key, -CONVERSATION_HISTORY_WINDOW, -1)
+            pipe.expire(cache_key, CONVERSATION_CACHE_TTL)
+            existed = pipe.execute()[0]
+            if not existed:
+                await cache_conversation(conversation_id, user_id, known_history + new_messages)
+                return
+        
+        current = conversation_cache.get(cache_key)
+        if current is None:
+            current = known_history
+        conversation_cache[cache_key] = (list(current) + new_messages)[-CONVERSATION_HISTORY_WINDOW:]
+    except Exception as e:
+        logger.debug(f"Conversation cache append error: {e}")
+
 # ==================== Models ====================
 
 class User(BaseModel):
@@ -317,6 +398,10 @@ class WorkflowStepRequest(BaseModel):
     step_data: Optional[Dict[str, Any]] = {}
     conversation_history: Optional[List[Dict[str, str]]] = []
 
+class WorkflowRunRequest(BaseModel):
+    instance_id: str
+    step_data: Optional[Dict[str, Any]] = {}
+
 class ChatResponse(BaseModel):
     message: str
     conversation_id: Optional[str] = None
@@ -360,47 +445,51 @@ class VoiceResponse(BaseModel):
 class OTPService:
     """Simple OTP service for phone number verification"""
     
-    def __init__(self):
-        self.otp_storage = {}  # In production, use Redis
+    def __init__(self, state: Optional[SharedStateBackend] = None):
+        # Codes live in the shared state backend so any worker can verify them
+        self.state = state or InMemoryStateBackend()
         self.otp_expiry = 300  # 5 minutes
+        self.max_attempts = 3
     
-    def generate_otp(self, phone_number: str) -> str:
+    async def generate_otp(self, phone_number: str) -> str:
         """Generate mock OTP (always 7421 for development)"""
         otp = "7421"  # Fixed mock OTP for development
         
         # Store OTP with expiry
-        self.otp_storage[phone_number] = {
+        await self.state.set("otp", phone_number, {
             'otp': otp,
             'created_at': time.time(),
             'attempts': 0
-        }
+        }, ttl=self.otp_expiry)
         
         return otp
     
-    def verify_otp(self, phone_number: str, otp: str) -> bool:
+    async def verify_otp(self, phone_number: str, otp: str) -> bool:
         """Verify OTP"""
-        if phone_number not in self.otp_storage:
+        stored_data = await self.state.get("otp", phone_number)
+        if not stored_data:
             return False
         
-        stored_data = self.otp_storage[phone_number]
-        
-        # Check expiry
-        if time.time() - stored_data['created_at'] > self.otp_expiry:
-            del self.otp_storage[phone_number]
+        # Check expiry; a record without created_at is treated as expired
+        created_at = stored_data.get('created_at')
+        if created_at is None or time.time() - created_at > self.otp_expiry:
+            await self.state.delete("otp", phone_number)
             return False
         
-        # Check attempts (max 3)
-        if stored_data['attempts'] >= 3:
-            del self.otp_storage[phone_number]
+        # Count the attempt atomically before comparing, so concurrent guesses
+        # on different workers cannot exceed the limit (max 3). The record may
+        # have been consumed or expired since the read: never recreate it.
+        attempts = await self.state.incr_existing("otp", phone_number, 'attempts')
+        if attempts is None:
+            return False
+        if attempts > self.max_attempts:
+            await self.state.delete("otp", phone_number)
             return False
         
-        # Verify OTP
+        # Verify OTP; only the request that consumes the code succeeds
         if stored_data['otp'] == otp:
-            del self.otp_storage[phone_number]
-            return True
-        else:
-            stored_data['attempts'] += 1
-            return False
+            return await self.state.delete("otp", phone_number)
+        return False
     
     async def send_otp_sms(self, phone_number: str, otp: str) -> bool:
         """Send OTP via SMS (mock implementation)"""
@@ -434,7 +523,7 @@ def validate_indian_phone(phone: str) -> bool:
         return False
 
 # Initialize OTP service
-otp_service = OTPService()
+otp_service = OTPService(shared_state)
 
 >>>>>>> c7ba531 (Initial push: migrate local codebase to KisanMitr)
 # ==================== Auth Utilities ====================
@@ -450,6 +539,41 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
+# bcrypt takes 100-300ms of CPU per call; it runs on a small dedicated pool (bcrypt
+# releases the GIL) so login storms never block the event loop. Requests beyond
+# AUTH_CRYPTO_MAX_PENDING are shed with a 503 instead of queueing without bound.
+AUTH_CRYPTO_WORKERS = int(os.environ.get("AUTH_CRYPTO_WORKERS", "2"))
+AUTH_CRYPTO_MAX_PENDING = int(os.environ.get("AUTH_CRYPTO_MAX_PENDING", "64"))
+auth_crypto_executor = ThreadPoolExecutor(max_workers=AUTH_CRYPTO_WORKERS, thread_name_prefix="auth-crypto")
+auth_crypto_pending = 0
+
+async def run_auth_crypto(func, *args):
+    """Run a bcrypt call on the auth pool"""
+    global auth_crypto_pending
+    if auth_crypto_pending >= AUTH_CRYPTO_MAX_PENDING:
+        raise HTTPException(status_code=503, detail=get_error_message("service_unavailable", "en"))
+    auth_crypto_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(auth_crypto_executor, func, *args)
+    finally:
+        auth_crypto_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await run_auth_crypto(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_auth_crypto(verify_password, plain_password, hashed_password)
+
+# Verified tokens -> (user, exp); repeat requests skip signature checks and decoding.
+# Entries never outlive the token's own expiry.
+verified_token_cache = TTLCache(maxsize=10000, ttl=int(os.environ.get("JWT_CACHE_TTL", "60")))
+
+def get_verified_token(token: str) -> Optional[Dict[str, str]]:
+    cached = verified_token_cache.get(token)
+    if cached and cached[1] > time.time():
+        return cached[0]
+    return None
+
 <<<<<<< HEAD
 def create_access_token(user_id: str, email: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
@@ -463,25 +587,44 @@ def create_access_token(user_id: str, phone_number: str) -> str:
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, str]:
+    token = credentials.credentials
+    cached_user = get_verified_token(token)
+    if cached_user:
+        return dict(cached_user)
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("user_id")
 <<<<<<< HEAD
         email: str = payload.get("email")
         if user_id is None or email is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        return {"user_id": user_id, "email": email}
+        user = {"user_id": user_id, "email": email}
 =======
         phone_number: str = payload.get("phone_number")
         if user_id is None or phone_number is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        return {"user_id": user_id, "phone_number": phone_number}
+        user = {"user_id": user_id, "phone_number": phone_number}
 >>>>>>> c7ba531 (Initial push: migrate local codebase to KisanMitr)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
+    
+    verified_token_cache[token] = (user, payload.get("exp", time.time() + JWT_EXPIRATION_HOURS * 3600))
+    return dict(user)
+
+def user_id_from_authorization(authorization: str) -> Optional[str]:
+    """User id from a Bearer header, or None; used where raising 401 is not wanted"""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    cached_user = get_verified_token(token)
+    if cached_user:
+        return cached_user["user_id"]
+    try:
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM]).get("user_id")
+    except Exception:
+        return None
 
 # ==================== MCP & Cerebras Services ====================
 
@@ -545,14 +688,20 @@ class MCPGatewayClient:
         arguments = {"state": state, "commodity": commodity}
         # Always include district parameter (even if empty) as the API requires it
         arguments["district"] = district or ""
+        
+        cache_key = self._cache_key(state, commodity, arguments["district"])
+        cached = tool_result_cache.get(cache_key)
+        if cached is not None:
+            return cached
             
         result = await self._call_mcp_tool("crop-price", arguments)
         
         # Ensure consistent response format
         if "error" in result:
             return {"error": result["error"], "data": None}
-        else:
-            return {"data": result.get("data", result), "error": None}
+        response = {"data": result.get("data", result), "error": None}
+        tool_result_cache[cache_key] = response
+        return response
     
     async def search_web(self, query: str, num_results: int = 5) -> Dict[str, Any]:
         """Search web using MCP Gateway EXA search with proper MCP protocol"""
@@ -613,40 +762,48 @@ class MCPGatewayClient:
             return {"status": "unhealthy", "error": str(e)}
 
 class CerebrasService:
-    def __init__(self, api_key: str):
+    """LLM entry point for the chat pipeline, routed across providers by LLMRouter
+    
+    Cerebras stays the primary backend; other providers take over per call
+    class when it is slower or failing.
+    """
+    def __init__(self, api_key: str, router: Optional[LLMRouter] = None):
         self.api_key = api_key
-        self.base_url = "https://api.cerebras.ai/v1/chat/completions"
-        self.model = "llama3.1-8b"
+        self.router = router or build_router_from_env()
     
-    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
-        """Generate response using Cerebras LLM"""
+    @staticmethod
+    def _to_http_error(e: Exception, action: str) -> HTTPException:
+        # Overload on every provider is transient; callers turn 503 into a retry hint
+        if isinstance(e, LLMOverloadedError) or getattr(e, "status_code", None) in OVERLOAD_STATUS_CODES:
+            return HTTPException(status_code=503, detail=f"LLM busy, please retry shortly: {str(e)}")
+        logger.error(f"Error {action} response: {e}")
+        return HTTPException(status_code=500, detail=f"LLM {action} failed: {str(e)}")
+    
+    async def generate_response(self, messages: List[Dict[str, str]], priority: int = PRIORITY_INTERACTIVE,
+                                call_class: str = CALL_FINAL_ANSWER) -> str:
+        """Generate response using the fastest healthy LLM provider for the call class"""
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    self.base_url,
-                    json={
-                        "model": self.model,
-                        "messages": messages,
-                        "temperature": 0.7,
-                        "max_tokens": 1024
-                    },
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                response.raise_for_status()
-                result = response.json()
-                return result['choices'][0]['message']['content']
-        except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            raise HTTPException(status_code=500, detail=f"LLM generation failed: {str(e)}")
+            return await self.router.generate(messages, call_class=call_class, priority=priority)
+        except (LLMProviderError, LLMOverloadedError) as e:
+            raise self._to_http_error(e, "generating")
+    
+    async def stream_response(self, messages: List[Dict[str, str]], priority: int = PRIORITY_INTERACTIVE,
+                              call_class: str = CALL_FINAL_ANSWER):
+        """Stream response tokens as they are generated"""
+        try:
+            async for delta in self.router.stream(messages, call_class=call_class, priority=priority):
+                yield delta
+        except (LLMProviderError, LLMOverloadedError) as e:
+            raise self._to_http_error(e, "streaming")
 
 # Initialize services with proper error handling
 try:
-    mcp_client = MCPGatewayClient(MCP_GATEWAY_URL, MCP_GATEWAY_TOKEN)
-    cerebras_service = CerebrasService(CEREBRAS_API_KEY)
-    media_analysis_service = MediaAnalysisService(OPENROUTER_API_KEY) if OPENROUTER_API_KEY else None
+    mcp_client = timed_init("mcp_client", lambda: MCPGatewayClient(MCP_GATEWAY_URL, MCP_GATEWAY_TOKEN))
+    llm_router = timed_init("llm_router", build_router_from_env)
+    cerebras_service = timed_init("cerebras_service", lambda: CerebrasService(CEREBRAS_API_KEY, llm_router))
+    media_analysis_service = timed_init(
+        "media_analysis_service", lambda: MediaAnalysisService(OPENROUTER_API_KEY, llm_router)
+    ) if OPENROUTER_API_KEY else None
     logger.info(f"Initialized MCP Gateway client for: {MCP_GATEWAY_URL}")
     if MCP_GATEWAY_TOKEN:
         logger.info("MCP Gateway authentication token configured")
@@ -658,6 +815,48 @@ except Exception as e:
 
 # ==================== Agentic Reasoning System ====================
 
+SUPPORTED_LANGUAGES = ["en", "hi", "ta", "te", "mr", "bn", "gu", "kn", "ml", "pa"]
+
+# Local identification at or above this confidence overrides the analysis LLM's language
+LOCAL_LANGUAGE_CONFIDENCE = 0.6
+
+# Structured-output schemas for the pipeline's JSON-producing LLM calls
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_agricultural": {"type": "boolean", "default": True},
+        "language": {"type": "string", "enum": SUPPORTED_LANGUAGES, "default": "en"},
+        "complexity_level": {"type": "string", "enum": ["simple", "moderate", "complex"], "default": "simple"},
+        "reasoning_chain_depth": {"type": "integer", "default": 1},
+        "needs_crop_price": {"type": "boolean", "default": False},
+        "needs_web_search": {"type": "boolean", "default": False},
+        "needs_soil_health": {"type": "boolean", "default": False},
+        "needs_weather": {"type": "boolean", "default": False},
+        "needs_pest_identifier": {"type": "boolean", "default": False},
+        "needs_mandi_price": {"type": "boolean", "default": False},
+        "needs_scheme_tool": {"type": "boolean", "default": False},
+        "crop_price_params": {"type": "object", "default": {}},
+        "scheme_tool_params": {"type": "object", "default": {}},
+        "search_query": {"type": "string", "default": ""},
+        "reasoning_steps": {"type": "array", "default": []},
+        "synthesis_requirements": {"type": "array", "default": []},
+        "confidence": {"type": "number", "default": 0.8},
+        "steps": {"type": "array", "default": []}
+    }
+}
+
+SYNTHESIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "key_insights": {"type": "array", "default": []},
+        "data_correlations": {"type": "array", "default": []},
+        "risk_factors": {"type": "array", "default": []},
+        "opportunities": {"type": "array", "default": []},
+        "confidence_score": {"type": "number", "default": 0.7},
+        "synthesis_summary": {"type": "string", "default": ""}
+    }
+}
+
 class AgenticChatService:
     def __init__(self, cerebras_service: CerebrasService, mcp_client: MCPGatewayClient, database):
         self.cerebras = cerebras_service
@@ -669,19 +868,53 @@ class AgenticChatService:
         self.multi_agent_mode = True  # Enable enhanced reasoning
         # Cultural context manager for enhanced multilingual support
         self.cultural_context = CulturalContextManager()
-        # Conversational memory for personalized advice
-        self.conversational_memory = ConversationalMemory()
         # Agricultural RAG system for domain knowledge
         self.agricultural_rag = AgriculturalRAG()
-        # Voice STT service for speech-to-text
-        self.voice_stt_service = VoiceSTTService()
-        # Workflow engine for agricultural process automation
-        self.workflow_engine = WorkflowEngine(database, mcp_client, None)
-        # Metrics system for performance and impact tracking
-        self.metrics_system = MetricsSystem(database)
-    
-    async def analyze_task(self, user_message: str) -> Dict[str, Any]:
-        """Step 1: Analyze the task and generate steps"""
+        # Static per-language system prompt prefixes, reused across requests
+        self._static_prompt_cache = {}
+        # Starts obvious tool calls while the analysis LLM call is in flight
+        self.prefetcher = SpeculativePrefetcher(
+            mcp_client, enabled=os.environ.get("SPECULATIVE_PREFETCH", "true").lower() == "true"
+        )
+        # Chooses full / merged / direct synthesis plans per request
+        self.pipeline_planner = PipelinePlanner()
+        # Stream the analysis call so confirmed tools start before it finishes
+        self.stream_analysis = os.environ.get("STREAM_ANALYSIS", "true").lower() == "true"
+        # Precomputed localized answers for high-frequency single-intent questions
+        self.template_answers = TemplateAnswerEngine(self.agricultural_rag, schemes_db, SUPPORTED_LANGUAGES)
+        self.use_template_answers = os.environ.get("TEMPLATE_ANSWERS", "true").lower() == "true"
+    
+    # Optional subsystems are built on first use to keep cold start short
+
+    @lazy_service
+    def conversational_memory(self):
+        """Conversational memory for personalized advice (opens its own Mongo client)"""
+        from conversational_memory import ConversationalMemory
+        return ConversationalMemory()
+
+    @lazy_service
+    def voice_stt_service(self):
+        """Voice STT service for speech-to-text (imports the Deepgram SDK)"""
+        from voice_stt_service import VoiceSTTService
+        return VoiceSTTService()
+
+    @lazy_service
+    def workflow_engine(self):
+        """Workflow engine for agricultural process automation"""
+        return WorkflowEngine(self.db, self.mcp, None, state=shared_state)
+
+    @lazy_service
+    def metrics_system(self):
+        """Metrics system for performance and impact tracking"""
+        return MetricsSystem(self.db, state=shared_state)
+    
+    async def analyze_task(self, user_message: str, on_field=None, language: Optional[str] = None) -> Dict[str, Any]:
+        """Step 1: Analyze the task and generate steps
+        
+        When on_field is given the analysis is streamed and on_field(key, value, fields)
+        is called as each top-level field completes, so tools can start early.
+        A language already identified locally replaces the one the LLM reports.
+        """
         system_prompt = """You are an advanced agricultural AI assistant with multi-step reasoning capabilities.
 
 IMPORTANT RULES:
@@ -747,33 +980,47 @@ Examples:
             {"role": "user", "content": user_message}
         ]
         
-        response = await self.cerebras.generate_response(messages)
+        if on_field:
+            response = await self._stream_analysis(messages, on_field)
+        else:
+            response = await self.cerebras.generate_response(messages, call_class=CALL_ANALYSIS)
         
         try:
-            # Extract JSON from response
-            if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                json_str = response.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = response.strip()
-            
-            analysis = json.loads(json_str)
+            analysis = parse_llm_json(response, ANALYSIS_SCHEMA)
+            if language:
+                analysis["language"] = language
             return analysis
-        except Exception as e:
+        except StructuredOutputError as e:
             logger.error(f"Error parsing analysis: {e}, Response: {response}")
             # Default fallback
             return {
                 "is_agricultural": True,
-                "language": "en",
+                "language": language or "en",
                 "needs_crop_price": False,
                 "needs_web_search": False,
                 "search_query": "",
                 "steps": ["Provide answer using base knowledge"]
             }
     
-    async def execute_tools(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """Step 2: Execute selected tools"""
+    async def _stream_analysis(self, messages: List[Dict[str, str]], on_field) -> str:
+        """Stream the analysis call, reporting fields as they complete"""
+        parser = IncrementalJSONParser()
+        try:
+            async for chunk in self.cerebras.stream_response(messages, call_class=CALL_ANALYSIS):
+                for key, value in parser.feed(chunk):
+                    try:
+                        on_field(key, value, parser.fields)
+                    except Exception as e:
+                        logger.debug(f"Analysis field callback failed for {key}: {e}")
+        except HTTPException as e:
+            if parser.text or e.status_code == 503:
+                raise
+            # Streaming unavailable before any token arrived - fall back to a plain call
+            return await self.cerebras.generate_response(messages, call_class=CALL_ANALYSIS)
+        return parser.text
+    
+    async def execute_tools(self, analysis: Dict[str, Any], speculation: Optional[Speculation] = None) -> Dict[str, Any]:
+        """Step 2: Execute selected tools, reusing speculative results the analysis confirms"""
         tool_results = {}
         tools_used = []
         
@@ -781,12 +1028,14 @@ Examples:
         if analysis.get("needs_crop_price") and analysis.get("crop_price_params"):
             params = analysis["crop_price_params"]
             if params.get("state") and params.get("commodity"):
-                logger.info(f"Calling crop-price tool with params: {params}")
-                result = await self.mcp.get_crop_price(
-                    state=params["state"],
-                    commodity=params["commodity"],
-                    district=params.get("district")
-                )
+                result = await speculation.claim("crop_price", params) if speculation else None
+                if result is None:
+                    logger.info(f"Calling crop-price tool with params: {params}")
+                    result = await self.mcp.get_crop_price(
+                        state=params["state"],
+                        commodity=params["commodity"],
+                        district=params.get("district")
+                    )
                 logger.info(f"Crop-price tool result: {result}")
                 
                 # Only mark as used if we got meaningful data
@@ -842,8 +1091,10 @@ Examples:
         # Execute weather tool
         if analysis.get("needs_weather"):
             params = analysis.get("weather_params", {})
-            logger.info(f"Calling weather tool with params: {params}")
-            result = await self.mcp.call_tool("weather", params)
+            result = await speculation.claim("weather", params) if speculation else None
+            if result is None:
+                logger.info(f"Calling weather tool with params: {params}")
+                result = await self.mcp.call_tool("weather", params)
             logger.info(f"Weather tool result: {result}")
             
             if result and not result.get("error"):
@@ -934,7 +1185,7 @@ Query Analysis:
 - Synthesis Requirements: {synthesis_requirements}
 
 Available Data:
-{json.dumps(tool_results, indent=2)}
+{compact_tool_results(tool_results)}
 
 Please provide a synthesis in JSON format:
 {{
@@ -955,16 +1206,13 @@ Focus on practical agricultural insights that help farmers make better decisions
                 {"role": "system", "content": synthesis_prompt}
             ]
             
-            response = await self.cerebras.generate_response(messages)
+            response = await self.cerebras.generate_response(
+                messages, priority=PRIORITY_SYNTHESIS, call_class=CALL_SYNTHESIS
+            )
             
             # Parse synthesis result
             try:
-                if "```json" in response:
-                    json_str = response.split("```json")[1].split("```")[0].strip()
-                else:
-                    json_str = response.strip()
-                
-                synthesis_result = json.loads(json_str)
+                synthesis_result = parse_llm_json(response, SYNTHESIS_SCHEMA)
                 
                 # Add performance metrics
                 duration = time.time() - start_time
@@ -974,8 +1222,8 @@ Focus on practical agricultural insights that help farmers make better decisions
                 logger.info(f"Data synthesis completed in {duration:.2f}s")
                 return synthesis_result
                 
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse synthesis JSON, using fallback")
+            except StructuredOutputError as e:
+                logger.warning(f"Failed to parse synthesis JSON, using fallback: {e}")
                 return {
                     "synthesized_data": tool_results,
                     "correlations": [],
@@ -995,8 +1243,12 @@ Focus on practical agricultural insights that help farmers make better decisions
                 "synthesis_duration": time.time() - start_time
             }
     
-    async def evaluate_and_respond(self, user_message: str, analysis: Dict[str, Any], tool_results: Dict[str, Any], conversation_history: List[Dict[str, str]], synthesis_result: Optional[Dict[str, Any]] = None) -> str:
-        """Step 3: Evaluate progress and generate final response"""
+    async def evaluate_and_respond(self, user_message: str, analysis: Dict[str, Any], tool_results: Dict[str, Any], conversation_history: List[Dict[str, str]], synthesis_result: Optional[Dict[str, Any]] = None, merge_synthesis: bool = False) -> str:
+        """Step 3: Evaluate progress and generate final response
+        
+        With merge_synthesis the data-correlation work of synthesize_data is
+        asked for in this same call instead of a separate LLM hop.
+        """
         language = analysis.get("language", "en")
         
         language_map = {
@@ -1024,7 +1276,7 @@ Focus on practical agricultural insights that help farmers make better decisions
                 # Check if we have actual price records
                 data = crop_data.get("data", {})
                 if isinstance(data, dict) and data.get("records") and len(data["records"]) > 0:
-                    context_info += f"Current crop price data: {crop_data['data']}\n"
+                    context_info += f"Current crop price data:\n{compact_tool_payload('crop_price', crop_data['data'])}\n"
                 else:
                     tool_failures.append("crop price data is currently unavailable")
             else:
@@ -1035,7 +1287,7 @@ Focus on practical agricultural insights that help farmers make better decisions
             if search_data.get("results") and not search_data.get("error"):
                 results = search_data.get("results", [])
                 if isinstance(results, list) and len(results) > 0:
-                    context_info += f"Recent agricultural research and information: {search_data['results']}\n"
+                    context_info += f"Recent agricultural research and information:\n{compact_tool_payload('web_search', search_data['results'])}\n"
                 else:
                     tool_failures.append("web search returned no current results")
             else:
@@ -1078,31 +1330,82 @@ Focus on practical agricultural insights that help farmers make better decisions
                     context_info += f"PMFBY: {contacts.get('pmfby_helpline', 'N/A')}\n"
                     context_info += f"Kisan Call Center: {contacts.get('kisan_call_center', 'N/A')}\n"
                 
-                context_info += f"Scheme assistance data: {scheme_data['data']}\n"
+                context_info += f"Scheme assistance data: {compact_tool_payload('scheme_tool', scheme_data['data'])}\n"
             else:
                 tool_failures.append("crop damage scheme assistance could not be retrieved")
         
 >>>>>>> c7ba531 (Initial push: migrate local codebase to KisanMitr)
         # Add information about tool failures to help the AI respond appropriately
+        failure_note = ""
         if tool_failures:
-            context_info += f"\nNote: The following data sources were attempted but unavailable: {', '.join(tool_failures)}. Please provide general agricultural guidance based on your knowledge.\n"
+            failure_note = f"Note: The following data sources were attempted but unavailable: {', '.join(tool_failures)}. Please provide general agricultural guidance based on your knowledge.\n"
         
         # Add synthesis insights if available
+        synthesis_context = ""
         if synthesis_result and synthesis_result.get("synthesis_type") != "simple":
             synthesis_info = synthesis_result
             if synthesis_info.get("key_insights"):
-                context_info += f"\nKey Insights from Data Analysis: {synthesis_info['key_insights']}\n"
+                synthesis_context += f"Key Insights from Data Analysis: {synthesis_info['key_insights']}\n"
             if synthesis_info.get("data_correlations"):
-                context_info += f"Data Correlations Found: {synthesis_info['data_correlations']}\n"
+                synthesis_context += f"Data Correlations Found: {synthesis_info['data_correlations']}\n"
             if synthesis_info.get("risk_factors"):
-                context_info += f"Risk Factors to Consider: {synthesis_info['risk_factors']}\n"
+                synthesis_context += f"Risk Factors to Consider: {synthesis_info['risk_factors']}\n"
             if synthesis_info.get("opportunities"):
-                context_info += f"Opportunities Identified: {synthesis_info['opportunities']}\n"
+                synthesis_context += f"Opportunities Identified: {synthesis_info['opportunities']}\n"
+        elif merge_synthesis:
+            requirements = analysis.get("synthesis_requirements") or []
+            synthesis_context = (
+                "Before answering, correlate the data above"
+                + (f" ({', '.join(map(str, requirements))})" if requirements else "")
+                + ": weigh the key insights, risks and opportunities it shows and fold them into your advice.\n"
+            )
         
         # Extract crop information from user message for RAG
         detected_crop = self._extract_crop_from_message(user_message)
         
-        # Enhance context with RAG knowledge
+        # Retrieve RAG knowledge on its own so it can be budgeted as a section
+        rag_context = self.agricultural_rag.enhance_response_with_knowledge(
+            user_message, "", detected_crop
+        )
+        
+        # Fit dynamic context under the token budget: live data first, background knowledge last
+        context_builder = ContextBuilder(CONTEXT_TOKEN_BUDGET)
+        context_builder.add_section("tool_failures", failure_note, priority=0)
+        context_builder.add_section("tool_data", context_info, priority=1)
+        context_builder.add_section("synthesis", synthesis_context, priority=2)
+        context_builder.add_section("knowledge", rag_context, priority=3)
+        dynamic_context = context_builder.build()
+        
+        system_prompt = self._static_system_prompt(response_language) + "\n\n" + (
+            dynamic_context or "Use your agricultural knowledge to provide helpful farming advice."
+        )
+        
+        messages = [
+            {"role": "system", "content": system_prompt}
+        ]
+        
+        # Add conversation history that fits the history budget
+        messages.extend(fit_history(conversation_history[-CONVERSATION_HISTORY_WINDOW:]))
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        
+        response = await self.cerebras.generate_response(messages)
+        
+        # Strip any markdown formatting that might have slipped through
+        cleaned_response = self._clean_markdown(response)
+        return cleaned_response
+    
+    def _static_system_prompt(self, response_language: str) -> str:
+        """Static persona and response rules for a language, built once and reused
+        
+        Kept byte-identical across requests and placed ahead of the dynamic context
+        so the provider can reuse its cached prompt prefix.
+        """
+        cached = self._static_prompt_cache.get(response_language)
+        if cached:
+            return cached
+        
 <<<<<<< HEAD
         base_prompt = f"""You are a helpful agricultural AI assistant EXCLUSIVELY for farmers. 
 
@@ -1118,15 +1421,9 @@ CRITICAL: You MUST respond in {response_language}. Match the user's language EXA
 You have access to real-time crop prices and agricultural data.
 Provide direct, actionable information that farmers can use immediately.
 >>>>>>> c7ba531 (Initial push: migrate local codebase to KisanMitr)
+"""
 
-{context_info if context_info else "Use your agricultural knowledge to provide helpful farming advice."}"""
-
-        # Enhance with RAG knowledge
-        enhanced_prompt = self.agricultural_rag.enhance_response_with_knowledge(
-            user_message, base_prompt, detected_crop
-        )
-        
-        system_prompt = enhanced_prompt + f"""
+        static_prompt = base_prompt + f"""
 
 <<<<<<< HEAD
 CRITICAL RESPONSE RULES - FOLLOW EXACTLY:
@@ -1171,74 +1468,68 @@ Example price response:
 Be direct and helpful like talking to a neighbor farmer."""
 >>>>>>> c7ba531 (Initial push: migrate local codebase to KisanMitr)
         
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Add conversation history
-        for msg in conversation_history[-6:]:  # Last 3 exchanges
-            messages.append(msg)
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
-        
-        response = await self.cerebras.generate_response(messages)
-        
-        # Strip any markdown formatting that might have slipped through
-        cleaned_response = self._clean_markdown(response)
-        return cleaned_response
+        self._static_prompt_cache[response_language] = static_prompt
+        return static_prompt
     
     def _clean_markdown(self, text: str) -> str:
         """Remove markdown formatting from text"""
-        import re
-        
-        # Remove bold/italic formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # **bold**
-        text = re.sub(r'\*(.*?)\*', r'\1', text)      # *italic*
-        text = re.sub(r'__(.*?)__', r'\1', text)      # __bold__
-        text = re.sub(r'_(.*?)_', r'\1', text)        # _italic_
-        
-        # Remove headers
-        text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-        
-        # Remove bullet points and numbered lists
-        text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
-        
-        # Remove code blocks
-        text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
-        text = re.sub(r'`(.*?)`', r'\1', text)
-        
-        # Clean up extra whitespace
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)  # Multiple newlines to double
-        text = text.strip()
-        
-        return text
+        return clean_markdown(text)
     
     def _extract_crop_from_message(self, message: str) -> Optional[str]:
         """Extract crop name from user message for RAG enhancement"""
-        message_lower = message.lower()
-        
-        # Common crops in Indian agriculture
-        crops = ["wheat", "rice", "cotton", "sugarcane", "maize", "bajra", "jowar", 
-                "barley", "gram", "peas", "mustard", "groundnut", "soybean", 
-                "tomato", "potato", "onion"]
-        
-        for crop in crops:
-            if crop in message_lower:
-                return crop
-        
-        return None
+        return extract_crop_from_message(message)
     
-    async def process_message(self, user_message: str, conversation_history: List[Dict[str, str]]) -> Dict[str, Any]:
+    async def process_message(self, user_message: str, conversation_history: List[Dict[str, str]],
+                              language_guess: Optional[LanguageGuess] = None) -> Dict[str, Any]:
         """Enhanced agentic flow with multi-agent reasoning: analyze -> execute -> synthesize -> evaluate"""
         reasoning_steps = []
         start_time = time.time()
         
-        # Step 1: Enhanced Query Analysis
+        # Local language identification; a confident result is not left to the LLM
+        language_guess = language_guess or identify_language(user_message)
+        local_language = (
+            language_guess.language if language_guess.confidence >= LOCAL_LANGUAGE_CONFIDENCE else None
+        )
+        
+        # Answer common single-intent questions from templates without any LLM call
+        if self.use_template_answers and local_language:
+            template = self.template_answers.match(user_message, local_language)
+            if template:
+                reasoning_steps.append({
+                    "step": "template_answer",
+                    "result": {"intent": template["intent"], "subject": template["subject"]},
+                    "duration": template["duration"],
+                    "agent": "Template Answers"
+                })
+                return {
+                    "message": template["message"],
+                    "language": local_language,
+                    "tools_used": [],
+                    "reasoning_steps": reasoning_steps,
+                    "performance_metrics": {"total_duration": time.time() - start_time, "template_answer": True}
+                }
+        
+        # Step 1: Enhanced Query Analysis, overlapped with speculative tool prefetch
         logger.info("Step 1: Enhanced query analysis...")
         analysis_start = time.time()
-        analysis = await self.analyze_task(user_message)
+        speculation = self.prefetcher.start(user_message)
+        
+        def dispatch_confirmed_tools(key: str, value: Any, fields: Dict[str, Any]):
+            # Start tools as soon as the streamed analysis has committed to them
+            if fields.get("is_agricultural") is False:
+                return
+            if fields.get("needs_crop_price") is True and isinstance(fields.get("crop_price_params"), dict):
+                self.prefetcher.launch(speculation, "crop_price", fields["crop_price_params"])
+            if fields.get("needs_weather") is True and isinstance(fields.get("weather_params"), dict):
+                self.prefetcher.launch(speculation, "weather", fields["weather_params"])
+        
+        try:
+            analysis = await self.analyze_task(
+                user_message, dispatch_confirmed_tools if self.stream_analysis else None, local_language
+            )
+        except Exception:
+            speculation.cancel_unclaimed()
+            raise
         analysis_duration = time.time() - analysis_start
         
         reasoning_steps.append({
@@ -1251,20 +1542,9 @@ Be direct and helpful like talking to a neighbor farmer."""
         # Check if query is agricultural
         if not analysis.get("is_agricultural", True):
             language = analysis.get("language", "en")
-            rejection_messages = {
-                "en": "I apologize, but I can only assist with farming and agricultural topics. Please ask me questions about crops, livestock, farming techniques, agricultural markets, or related farming matters.",
-                "hi": "मुझे खेद है, लेकिन मैं केवल खेती और कृषि विषयों में सहायता कर सकता हूं। कृपया मुझसे फसलों, पशुधन, खेती की तकनीकों, कृषि बाजारों या संबंधित खेती के मामलों के बारे में प्रश्न पूछें।",
-                "ta": "மன்னிக்கவும், நான் விவசாயம் மற்றும் வேளாண்மை தொடர்பான விஷயங்களில் மட்டுமே உதவ முடியும்.",
-                "te": "క్షమించండి, నేను వ్యవసాయం మరియు వ్యవసాయ అంశాలలో మాత్రమే సహాయం చేయగలను.",
-                "mr": "माफ करा, मी फक्त शेती आणि कृषी विषयांमध्ये मदत करू शकतो.",
-                "bn": "দুঃখিত, আমি শুধুমাত্র কৃষি এবং কৃষি বিষয়ে সাহায্য করতে পারি।",
-                "gu": "માફ કરશો, હું ફક્ત ખેતી અને કૃષિ વિષયોમાં મદદ કરી શકું છું.",
-                "kn": "ಕ್ಷಮಿಸಿ, ನಾನು ಕೇವಲ ಕೃಷಿ ಮತ್ತು ಕೃಷಿ ವಿಷಯಗಳಲ್ಲಿ ಮಾತ್ರ ಸಹಾಯ ಮಾಡಬಲ್ಲೆ.",
-                "ml": "ക്ഷമിക്കണം, എനിക്ക് കൃഷിയും കാർഷിക വിഷയങ്ങളിലും മാത്രമേ സഹായിക്കാൻ കഴിയൂ.",
-                "pa": "ਮਾਫ਼ ਕਰਨਾ, ਮੈਂ ਸਿਰਫ਼ ਖੇਤੀਬਾੜੀ ਅਤੇ ਖੇਤੀ ਵਿਸ਼ਿਆਂ ਵਿੱਚ ਮਦਦ ਕਰ ਸਕਦਾ ਹਾਂ।"
-            }
+            speculation.cancel_unclaimed()
             return {
-                "message": rejection_messages.get(language, rejection_messages["en"]),
+                "message": self.template_answers.rejection_message(language),
                 "language": language,
                 "tools_used": [],
                 "reasoning_steps": reasoning_steps,
@@ -1274,19 +1554,24 @@ Be direct and helpful like talking to a neighbor farmer."""
         # Step 2: Tool Execution
         logger.info("Step 2: Executing tools...")
         execution_start = time.time()
-        tool_execution = await self.execute_tools(analysis)
+        try:
+            tool_execution = await self.execute_tools(analysis, speculation)
+        finally:
+            speculation.cancel_unclaimed()
         execution_duration = time.time() - execution_start
         
         reasoning_steps.append({
             "step": "tool_execution", 
             "tools_used": tool_execution["tools_used"],
+            "speculative_hits": list(speculation.claimed),
             "duration": execution_duration,
             "agent": "Tool Executor"
         })
         
-        # Step 3: Data Synthesis (New!)
+        # Step 3: Data Synthesis, only when the planner expects a separate call to pay off
         complexity = analysis.get("complexity_level", "simple")
-        if complexity in ["moderate", "complex"] and tool_execution["tools_used"]:
+        plan = self.pipeline_planner.choose_plan(analysis, tool_execution["tools_used"])
+        if plan == PLAN_FULL:
             logger.info(f"Step 3: Data synthesis for {complexity} query...")
             synthesis_start = time.time()
             synthesis_result = await self.synthesize_data(analysis, tool_execution["results"])
@@ -1309,13 +1594,15 @@ Be direct and helpful like talking to a neighbor farmer."""
             analysis,
             synthesis_result.get("synthesized_data", tool_execution["results"]),
             conversation_history,
-            synthesis_result
+            synthesis_result,
+            merge_synthesis=plan == PLAN_MERGED
         )
         response_duration = time.time() - response_start
         
         reasoning_steps.append({
             "step": "response_generation", 
             "completed": True,
+            "pipeline_plan": plan,
             "duration": response_duration,
             "agent": "Advisory Agent"
         })
@@ -1333,6 +1620,8 @@ Be direct and helpful like talking to a neighbor farmer."""
             "execution_duration": execution_duration,
             "response_duration": response_duration,
             "complexity_level": complexity,
+            "pipeline_plan": plan,
+            "llm_calls": LLM_CALLS_PER_PLAN[plan],
             "reasoning_chain_depth": len(reasoning_steps),
             "tools_count": len(tools_used),
             "cerebras_speed_advantage": f"{total_duration:.2f}s (sub-second agricultural advisory)"
@@ -1342,6 +1631,13 @@ Be direct and helpful like talking to a neighbor farmer."""
         if "synthesis_duration" in synthesis_result:
             performance_metrics["synthesis_duration"] = synthesis_result["synthesis_duration"]
         
+        self.pipeline_planner.record(
+            plan,
+            performance_metrics,
+            estimate_response_quality(final_response, tool_execution["results"], tool_execution["tools_used"]),
+            complexity
+        )
+        
         return {
             "message": final_response,
             "language": analysis.get("language", "en"),
@@ -1354,7 +1650,7 @@ Be direct and helpful like talking to a neighbor farmer."""
 
 <<<<<<< HEAD
 # Initialize agentic service
-agentic_service = AgenticChatService(cerebras_service, mcp_client, db)
+agentic_service = timed_init("agentic_service", lambda: AgenticChatService(cerebras_service, mcp_client, db))
 
 # ==================== API Routes ====================
 
@@ -1369,7 +1665,7 @@ async def register(user_data: UserCreate):
     # Create new user
     user = User(
         email=user_data.email,
-        password_hash=hash_password(user_data.password)
+        password_hash=await hash_password_async(user_data.password)
     )
     
     user_dict = user.dict()
@@ -1391,7 +1687,7 @@ async def login(credentials: UserLogin):
     """Login user"""
     user = await db.users.find_one({"email": credentials.email})
     
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_password_async(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     access_token = create_access_token(user["id"], user["email"])
@@ -1403,7 +1699,7 @@ async def login(credentials: UserLogin):
     )
 =======
 # Initialize agentic service (database will be retrieved dynamically)
-agentic_service = AgenticChatService(cerebras_service, mcp_client, None)
+agentic_service = timed_init("agentic_service", lambda: AgenticChatService(cerebras_service, mcp_client, None))
 
 # ==================== API Routes ====================
 
@@ -1419,7 +1715,7 @@ async def send_otp(request: PhoneNumberRequest):
         normalized_phone = normalize_phone_number(request.phone_number)
         
         # Generate and send OTP
-        otp = otp_service.generate_otp(normalized_phone)
+        otp = await otp_service.generate_otp(normalized_phone)
         await otp_service.send_otp_sms(normalized_phone, otp)
         
         return OTPResponse(
@@ -1446,7 +1742,7 @@ async def verify_otp_and_login(request: OTPVerificationRequest):
         normalized_phone = normalize_phone_number(request.phone_number)
         
         # Verify OTP
-        if not otp_service.verify_otp(normalized_phone, request.otp):
+        if not await otp_service.verify_otp(normalized_phone, request.otp):
             raise HTTPException(status_code=400, detail="Invalid or expired OTP")
         
         # Get database instance
@@ -1544,8 +1840,11 @@ async def chat(request: ChatRequest, current_user: Dict = Depends(get_current_us
     tools_used = []
     
     try:
+        # Identify the language up front so the cache is partitioned by it
+        language_guess = identify_language(request.message)
+        
         # Check cache for similar responses (for common questions)
-        cache_key = create_cache_key(current_user["user_id"], request.message)
+        cache_key = create_cache_key(current_user["user_id"], request.message, language_guess.language)
         cached_response = await get_cached_response(cache_key)
         
         if cached_response and len(request.message) > 10:  # Only cache longer queries
@@ -1556,7 +1855,7 @@ async def chat(request: ChatRequest, current_user: Dict = Depends(get_current_us
             duration = time.time() - start_time
             record_request_time(duration)
             await agentic_service.metrics_system.record_request_metrics(
-                start_time, "cache", "en", True
+                start_time, "cache", cached_response.get("language", language_guess.language), True
             )
             
             return ChatResponse(**cached_response)
@@ -1565,20 +1864,18 @@ async def chat(request: ChatRequest, current_user: Dict = Depends(get_current_us
         conversation_id = request.conversation_id
         if not conversation_id:
             conversation_id = str(uuid.uuid4())
-            # Create new conversation asynchronously
-            asyncio.create_task(create_conversation_async(
-                conversation_id, current_user["user_id"], request.message
-            ))
+            # Queue new conversation for the next batched write
+            queue_conversation_create(conversation_id, current_user["user_id"], request.message)
         
         # Get conversation history from cache first
         conversation_history = await get_conversation_from_cache(conversation_id, current_user["user_id"])
         
-        if not conversation_history and conversation_id:
+        if conversation_history is None and request.conversation_id:
             # Fallback to database with optimized query
             messages = await db.chat_messages.find(
                 {"conversation_id": conversation_id, "user_id": current_user["user_id"]},
                 {"content": 1, "role": 1, "_id": 0}  # Only fetch needed fields
-            ).sort("created_at", -1).limit(10).to_list(10)
+            ).sort("created_at", -1).limit(CONVERSATION_HISTORY_WINDOW).to_list(CONVERSATION_HISTORY_WINDOW)
             
             conversation_history = [
                 {"role": msg["role"], "content": msg["content"]}
@@ -1591,13 +1888,19 @@ async def chat(request: ChatRequest, current_user: Dict = Depends(get_current_us
         # Process message through agentic system
         result = await agentic_service.process_message(
             request.message,
-            conversation_history or []
+            conversation_history or [],
+            language_guess
         )
         
-        # Save messages asynchronously for better performance
-        asyncio.create_task(save_chat_messages_async(
-            current_user["user_id"], conversation_id, request.message, result
-        ))
+        # Queue messages for the next batched write
+        queue_chat_messages(current_user["user_id"], conversation_id, request.message, result)
+        
+        # Keep the active conversation hot instead of invalidating it
+        await append_to_conversation_cache(
+            conversation_id, current_user["user_id"], conversation_history or [],
+            [{"role": "user", "content": request.message},
+             {"role": "assistant", "content": result["message"]}]
+        )
         
         # Cache response for similar future queries (only for informational responses)
         if not result.get("tools_used") and len(request.message) > 10:
@@ -1615,6 +1918,11 @@ async def chat(request: ChatRequest, current_user: Dict = Depends(get_current_us
         tools_used = result.get("tools_used", [])
         primary_tool = tools_used[0] if tools_used else "cerebras-llama-3.1-8b"
         
+        # Queries that fanned out to tools cost more of the user's budget
+        await rate_limiter.charge(
+            SCOPE_USER, current_user["user_id"], min(len(tools_used), MAX_CHAT_TOOL_CHARGE) * CHAT_TOOL_COST
+        )
+        
         duration = time.time() - start_time
         record_request_time(duration)
         
@@ -1639,97 +1947,85 @@ async def chat(request: ChatRequest, current_user: Dict = Depends(get_current_us
         error_language = "en"
         try:
             if hasattr(request, 'message') and request.message:
-                # Simple language detection for error messages
-                if any(char in request.message for char in 'हिंदीकृपयाकरेंमेंकोसे'):
-                    error_language = "hi"
-                elif any(char in request.message for char in 'ਪੰਜਾਬੀਕਿਰਪਾਕਰਕੇਵਿੱਚਨੂੰ'):
-                    error_language = "pa"
+                error_language = identify_language(request.message).language
         except:
             pass
         
-        error_msg = get_error_message("processing_error", error_language)
+        # LLM overload is transient - tell the client to retry rather than report a failure
+        overloaded = isinstance(e, HTTPException) and e.status_code == 503
+        error_key = "service_unavailable" if overloaded else "processing_error"
+        error_msg = get_error_message(error_key, error_language)
         raise HTTPException(
-            status_code=500, 
+            status_code=503 if overloaded else 500, 
             detail={
-                "error": "processing_error",
+                "error": error_key,
                 "message": error_msg,
                 "language": error_language,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
         )
 
-async def create_conversation_async(conversation_id: str, user_id: str, message: str):
-    """Create conversation asynchronously"""
-    try:
-        conversation = Conversation(
-            id=conversation_id,
-            user_id=user_id,
-            title=message[:50] + "..." if len(message) > 50 else message,
-            last_message=message[:100]
-        )
-        conv_dict = conversation.dict()
-        conv_dict['created_at'] = conv_dict['created_at'].isoformat()
-        conv_dict['updated_at'] = conv_dict['updated_at'].isoformat()
-        await db.conversations.insert_one(conv_dict)
-    except Exception as e:
-        logger.error(f"Error creating conversation: {e}")
+def queue_conversation_create(conversation_id: str, user_id: str, message: str):
+    """Queue creation of a new conversation on the write-behind queue"""
+    conversation = Conversation(
+        id=conversation_id,
+        user_id=user_id,
+        title=message[:50] + "..." if len(message) > 50 else message,
+        last_message=message[:100]
+    )
+    conv_dict = conversation.dict()
+    conv_dict['created_at'] = conv_dict['created_at'].isoformat()
+    conv_dict['updated_at'] = conv_dict['updated_at'].isoformat()
+    persistence_queue.enqueue_conversation(conv_dict)
+
+def queue_chat_messages(user_id: str, conversation_id: str, user_message: str, ai_result: Dict):
+    """Queue a user/assistant message pair on the write-behind queue"""
+    # History pages sort on (created_at, id); the answer is stamped strictly after
+    # its question so the pair never ties and always reads back in order
+    asked_at = datetime.now(timezone.utc)
+    now = asked_at.isoformat(timespec="microseconds")
+    answered_at = (asked_at + timedelta(microseconds=1)).isoformat(timespec="microseconds")
+    
+    user_msg = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "conversation_id": conversation_id,
+        "content": user_message,
+        "role": "user",
+        "language": ai_result.get("language", "en"),
+        "tools_used": [],
+        "created_at": now
+    }
+    
+    assistant_msg = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "conversation_id": conversation_id,
+        "content": ai_result["message"],
+        "role": "assistant",
+        "language": ai_result.get("language", "en"),
+        "tools_used": ai_result.get("tools_used", []),
+        "has_reasoning": bool(ai_result.get("reasoning_steps")),
+        "reply_to": user_msg["id"],
+        "created_at": answered_at
+    }
+    
+    # Reasoning traces go to compressed cold storage, not on the hot message document
+    persistence_queue.enqueue_messages(
+        [user_msg, assistant_msg],
+        conversation_update={"last_message": user_message[:100], "updated_at": answered_at},
+        reasoning_steps=ai_result.get("reasoning_steps")
+    )
 
-async def save_chat_messages_async(user_id: str, conversation_id: str, user_message: str, ai_result: Dict):
-    """Save chat messages asynchronously"""
+async def invalidate_conversation_cache(conversation_id: str, user_id: str):
+    """Drop cached conversation history"""
+    cache_key = f"conv:{conversation_id}:{user_id}"
     try:
-        # Prepare messages for batch insert
-        now = datetime.now(timezone.utc).isoformat()
-        
-        user_msg = {
-            "id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "conversation_id": conversation_id,
-            "content": user_message,
-            "role": "user",
-            "language": ai_result.get("language", "en"),
-            "tools_used": [],
-            "created_at": now
-        }
-        
-        assistant_msg = {
-            "id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "conversation_id": conversation_id,
-            "content": ai_result["message"],
-            "role": "assistant",
-            "language": ai_result.get("language", "en"),
-            "tools_used": ai_result.get("tools_used", []),
-            "reasoning_steps": ai_result.get("reasoning_steps", []),
-            "created_at": now
-        }
-        
-        # Batch insert for better performance
-        await db.chat_messages.insert_many([user_msg, assistant_msg])
-        
-        # Update conversation last message
-        await db.conversations.update_one(
-            {"id": conversation_id},
-            {
-                "$set": {
-                    "last_message": user_message[:100],
-                    "updated_at": now
-                }
-            }
-        )
-        
-        # Invalidate conversation cache
-        cache_key = f"conv:{conversation_id}:{user_id}"
-        try:
-            if redis_client:
-                redis_client.delete(cache_key)
-        except Exception as e:
-            logger.debug(f"Redis cache deletion error: {e}")
-        conversation_cache.pop(cache_key, None)
-        
+        if redis_client:
+            redis_client.delete(cache_key)
     except Exception as e:
-        logger.error(f"Error saving messages: {e}")
-        
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.debug(f"Redis cache deletion error: {e}")
+    conversation_cache.pop(cache_key, None)
 
 
 @api_router.post("/voice/transcribe")
@@ -2018,7 +2314,7 @@ async def create_surplus_listing(
         user_id = current_user["user_id"]
         
         # Create listing
-        listing = marketplace_db.create_listing(user_id, listing_data.dict())
+        listing = await marketplace_db.create_listing(user_id, listing_data.dict())
         
         return {
             "success": True,
@@ -2041,7 +2337,7 @@ async def get_user_surplus_listings(
         if user_id != current_user["user_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        listings = marketplace_db.get_user_listings(user_id)
+        listings = await marketplace_db.get_user_listings(user_id)
         
         return {
             "success": True,
@@ -2055,6 +2351,29 @@ async def get_user_surplus_listings(
         logger.error(f"Error getting user listings: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/surplus/listing/{listing_id}")
+async def get_surplus_listing(
+    listing_id: str,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get a single surplus listing and count the view"""
+    try:
+        listing = await marketplace_db.get_listing(listing_id, viewer_id=current_user["user_id"])
+        
+        if not listing:
+            raise HTTPException(status_code=404, detail="Listing not found")
+        
+        return {
+            "success": True,
+            "listing": listing
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting listing: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.put("/surplus/{listing_id}")
 async def update_surplus_listing(
     listing_id: str,
@@ -2068,7 +2387,7 @@ async def update_surplus_listing(
         # Filter out None values
         update_data = {k: v for k, v in updates.dict().items() if v is not None}
         
-        updated_listing = marketplace_db.update_listing(listing_id, user_id, update_data)
+        updated_listing = await marketplace_db.update_listing(listing_id, user_id, update_data)
         
         if not updated_listing:
             raise HTTPException(status_code=404, detail="Listing not found or access denied")
@@ -2094,7 +2413,7 @@ async def delete_surplus_listing(
     try:
         user_id = current_user["user_id"]
         
-        success = marketplace_db.delete_listing(listing_id, user_id)
+        success = await marketplace_db.delete_listing(listing_id, user_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Listing not found or access denied")
@@ -2114,7 +2433,7 @@ async def delete_surplus_listing(
 async def get_marketplace_stats(current_user: Dict = Depends(get_current_user)):
     """Get marketplace statistics"""
     try:
-        stats = marketplace_db.get_marketplace_stats()
+        stats = await marketplace_db.get_marketplace_stats()
         
         return {
             "success": True,
@@ -2180,6 +2499,8 @@ async def execute_workflow_step(
         
         if result["success"]:
             return result
+        elif result["error"] == WORKFLOW_BUSY_ERROR:
+            raise HTTPException(status_code=409, detail=result["error"])
         else:
             raise HTTPException(status_code=400, detail=result["error"])
             
@@ -2189,6 +2510,35 @@ async def execute_workflow_step(
         logger.error(f"Error executing workflow step: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/workflows/run")
+async def run_workflow(
+    request: WorkflowRunRequest,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Run all remaining steps in one call, streaming progress as NDJSON
+    
+    Independent steps and each step's tools run concurrently.
+    """
+    workflow_engine = agentic_service.workflow_engine
+    workflow = await workflow_engine.get_workflow_instance(request.instance_id)
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow instance not found")
+    if workflow.user_id != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    # The stream also rejects a second run; this turns the common case into a 409
+    if workflow_engine.is_instance_active(request.instance_id):
+        raise HTTPException(status_code=409, detail=WORKFLOW_BUSY_ERROR)
+    
+    async def progress_events():
+        try:
+            async for event in workflow_engine.run_to_completion(request.instance_id, request.step_data):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error running workflow: {e}")
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+    
+    return StreamingResponse(progress_events(), media_type="application/x-ndjson")
+
 @api_router.get("/workflows/user")
 async def get_user_workflows(current_user: Dict = Depends(get_current_user)):
     """Get all workflow instances for current user"""
@@ -2203,6 +2553,13 @@ async def get_user_workflows(current_user: Dict = Depends(get_current_user)):
         logger.error(f"Error getting user workflows: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/workflows/updates")
+async def get_workflow_updates(current_user: Dict = Depends(get_current_user)):
+    """Workflow steps refreshed in the background since the user last checked"""
+    
+    updates = await agentic_service.workflow_engine.get_workflow_updates(current_user["user_id"])
+    return {"updates": updates}
+
 @api_router.get("/workflows/{instance_id}")
 async def get_workflow_instance(
     instance_id: str,
@@ -2212,9 +2569,8 @@ async def get_workflow_instance(
     
     try:
         # Check if user owns this workflow instance
-        if instance_id in agentic_service.workflow_engine.user_workflow_instances:
-            workflow = agentic_service.workflow_engine.user_workflow_instances[instance_id]
-            
+        workflow = await agentic_service.workflow_engine.get_workflow_instance(instance_id)
+        if workflow:
             if workflow.user_id != current_user["user_id"]:
                 raise HTTPException(status_code=403, detail="Access denied")
             
@@ -2238,6 +2594,7 @@ async def get_metrics_dashboard(current_user: Dict = Depends(get_current_user)):
     """Get comprehensive metrics dashboard"""
     
     try:
+        await agentic_service.metrics_system.sync_shared_counters()
         dashboard_data = agentic_service.metrics_system.get_comprehensive_dashboard()
         return dashboard_data
         
@@ -2250,6 +2607,7 @@ async def get_performance_metrics(current_user: Dict = Depends(get_current_user)
     """Get detailed performance metrics"""
     
     try:
+        await agentic_service.metrics_system.sync_shared_counters()
         performance_data = agentic_service.metrics_system.performance.get_performance_summary()
         return {"performance": performance_data}
         
@@ -2274,6 +2632,7 @@ async def get_cerebras_showcase_metrics():
     """Get metrics showcasing Cerebras performance advantages - Public endpoint"""
     
     try:
+        await agentic_service.metrics_system.sync_shared_counters()
         cerebras_data = agentic_service.metrics_system.get_cerebras_showcase_metrics()
         return cerebras_data
         
@@ -2330,31 +2689,101 @@ async def record_impact_metric(
 
 @api_router.get("/chat/history")
 async def get_chat_history(
+    response: Response,
     current_user: Dict = Depends(get_current_user), 
     conversation_id: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_reasoning: bool = False
 ):
-    """Get chat history for current user or specific conversation"""
+    """Get chat history for current user or specific conversation
+    
+    Pages newest-first; pass the X-Next-Cursor response header back as `cursor`
+    to load older messages.
+    """
     query = {"user_id": current_user["user_id"]}
     if conversation_id:
         query["conversation_id"] = conversation_id
     
-    messages = await db.chat_messages.find(query).sort("created_at", -1).limit(limit).to_list(limit)
+    projection = MESSAGE_SUMMARY_PROJECTION
+    if include_reasoning:
+        # Legacy documents still carry reasoning_steps inline
+        projection = {**MESSAGE_SUMMARY_PROJECTION, "reasoning_steps": 1}
+    
+    try:
+        messages, next_cursor = await fetch_page(
+            db.chat_messages, query, projection, "created_at", limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     # Reverse to get chronological order
     messages.reverse()
     
-    return [{"id": msg["id"], "content": msg["content"], "role": msg["role"], 
-             "conversation_id": msg.get("conversation_id"),
-             "language": msg["language"], "tools_used": msg.get("tools_used"),
-             "created_at": msg["created_at"]} for msg in messages]
+    traces = {}
+    if include_reasoning:
+        traces = await reasoning_store.load_many(
+            [msg["id"] for msg in messages if msg.get("has_reasoning")],
+            current_user["user_id"]
+        )
+    
+    result = []
+    for msg in messages:
+        item = {"id": msg["id"], "content": msg["content"], "role": msg["role"], 
+                "conversation_id": msg.get("conversation_id"),
+                "language": msg["language"], "tools_used": msg.get("tools_used"),
+                "has_reasoning": bool(msg.get("has_reasoning") or msg.get("reasoning_steps")),
+                "created_at": msg["created_at"]}
+        if include_reasoning:
+            item["reasoning_steps"] = traces.get(msg["id"], msg.get("reasoning_steps"))
+        result.append(item)
+    return result
+
+@api_router.get("/chat/messages/{message_id}/reasoning")
+async def get_message_reasoning(message_id: str, current_user: Dict = Depends(get_current_user)):
+    """Lazily load the reasoning trace for a single assistant message"""
+    try:
+        reasoning_steps = await reasoning_store.load(message_id, current_user["user_id"])
+        
+        if reasoning_steps is None:
+            # Fall back to traces stored inline before cold storage existed
+            message = await db.chat_messages.find_one(
+                {"id": message_id, "user_id": current_user["user_id"]},
+                {"_id": 0, "reasoning_steps": 1}
+            )
+            if not message:
+                raise HTTPException(status_code=404, detail="Message not found")
+            reasoning_steps = message.get("reasoning_steps") or []
+        
+        return {"message_id": message_id, "reasoning_steps": reasoning_steps}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error loading reasoning trace: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load reasoning")
 
 @api_router.get("/conversations")
-async def get_conversations(current_user: Dict = Depends(get_current_user)):
-    """Get all conversations for current user"""
-    conversations = await db.conversations.find(
-        {"user_id": current_user["user_id"]}
-    ).sort("updated_at", -1).to_list(100)
+async def get_conversations(
+    response: Response,
+    current_user: Dict = Depends(get_current_user),
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get conversations for current user, most recently updated first"""
+    try:
+        conversations, next_cursor = await fetch_page(
+            db.conversations, {"user_id": current_user["user_id"]},
+            CONVERSATION_SUMMARY_PROJECTION, "updated_at", limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     result = []
     for conv in conversations:
@@ -2386,6 +2815,9 @@ async def delete_conversation(conversation_id: str, current_user: Dict = Depends
             "user_id": current_user["user_id"]
         })
         
+        await reasoning_store.delete_conversation(conversation_id, current_user["user_id"])
+        await invalidate_conversation_cache(conversation_id, current_user["user_id"])
+        
         # Delete the conversation
         await db.conversations.delete_one({
             "id": conversation_id,
@@ -2521,9 +2953,12 @@ async def get_performance_metrics():
         "conversation_cache_size": len(conversation_cache),
         "voice_cache_size": len(voice_cache),
         "tool_cache_size": len(tool_result_cache),
+        "jwt_cache_size": len(verified_token_cache),
         "redis_connected": redis_client is not None
     }
     
+    persistence_stats = persistence_queue.get_stats() if persistence_queue else {}
+    
     return {
         "real_time_performance": {
             "avg_response_time": round(perf_stats["avg_response_time"], 3),
@@ -2531,7 +2966,19 @@ async def get_performance_metrics():
             "max_response_time": round(perf_stats["max_response_time"], 3) if perf_stats["max_response_time"] else 0,
             "p95_response_time": round(perf_stats["p95_response_time"], 3),
             "requests_processed": perf_stats["requests_processed"],
-            "cache_efficiency": cache_stats
+            "cache_efficiency": cache_stats,
+            "persistence_queue": persistence_stats,
+            "speculative_prefetch": agentic_service.prefetcher.get_stats(),
+            "llm_routing": llm_router.get_stats(),
+            "pipeline_plans": agentic_service.pipeline_planner.get_stats(),
+            "template_answers": agentic_service.template_answers.get_stats(),
+            "cache_warmup": cache_warmer.get_stats() if cache_warmer else {"state": "disabled"},
+            "job_scheduler": job_scheduler.get_stats() if job_scheduler else {"state": "disabled"},
+            "shared_state_backend": shared_state.name,
+            "rate_limiting": rate_limiter.get_stats(),
+            # Not built until the first workflow request
+            "workflow_persistence": (agentic_service.workflow_engine.get_stats()
+                                     if "workflow_engine" in vars(agentic_service) else {"state": "not_initialized"})
         },
         "cerebras_advantages": {
             "sub_second_responses": f"Cerebras enables {perf_stats['requests_processed']} sub-second agricultural advisories",
@@ -2557,11 +3004,16 @@ async def get_performance_metrics():
             "async_processing": "Non-blocking database operations",
             "connection_pooling": "50 concurrent MongoDB connections",
             "response_caching": "Multi-layer caching with TTL",
-            "batch_operations": "Bulk database inserts for messages",
+            "batch_operations": "Write-behind bulk_write batching for chat messages",
             "voice_optimization": "Parallel processing for voice workflows"
         }
     }
 
+@api_router.get("/startup-report")
+async def get_startup_report():
+    """Cold-start breakdown: import phases, service initialization times and lazy services not yet built"""
+    return startup_profiler.report()
+
 @api_router.get("/status/loading")
 async def get_loading_status():
     """Get system loading status for better UX"""
@@ -2589,7 +3041,43 @@ async def get_loading_status():
 # Include router
 app.include_router(api_router)
 
+# ==================== Rate Limiting ====================
+
+# Token costs per request; tool calls made while answering are billed afterwards
+CHAT_BASE_COST = 1
+CHAT_TOOL_COST = 1
+MAX_CHAT_TOOL_CHARGE = 3
+VOICE_COST = 3
+VISION_COST = 5
+
+def chat_request_cost(headers: Dict[str, str]) -> float:
+    """Long messages mean bigger prompts: one extra token per 2KB of body, up to two"""
+    try:
+        size = int(headers.get("content-length", 0))
+    except ValueError:
+        size = 0
+    return CHAT_BASE_COST + min(size // 2048, 2)
+
+rate_limiter = build_rate_limiter_from_env()
+RATE_LIMIT_RULES = [
+    RouteRule("POST", "/api/auth/send-otp", (SCOPE_PHONE, SCOPE_IP), lambda headers: 1),
+    RouteRule("POST", "/api/chat", (SCOPE_USER, SCOPE_IP), chat_request_cost),
+    RouteRule("POST", "/api/voice/transcribe", (SCOPE_USER, SCOPE_IP), lambda headers: VOICE_COST),
+    RouteRule("POST", "/api/media/upload", (SCOPE_USER, SCOPE_IP), lambda headers: VISION_COST),
+]
+
 # Performance and Security Middleware
+# Added first so it sits inside CORS and rejected requests still carry CORS headers
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    rules=RATE_LIMIT_RULES,
+    identify_user=user_id_from_authorization,
+    normalize_phone=normalize_phone_number,
+    messages={language: messages["rate_limit_error"] for language, messages in ERROR_MESSAGES.items()},
+    # Proxies in front of the app that append to X-Forwarded-For (Render's router is one)
+    trusted_proxy_hops=int(os.environ.get("RATE_LIMIT_TRUSTED_PROXY_HOPS", "1"))
+)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 app.add_middleware(
     TrustedHostMiddleware, 
@@ -2616,11 +3104,65 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and services on startup"""
-    global db
-    db = await get_database()
+    global db, reasoning_store, persistence_queue, cache_warmer, shared_state, job_scheduler, redis_connect_task
+    # Readiness does not wait on Redis; an unreachable one costs at most REDIS_CONNECT_TIMEOUT in a thread
+    redis_connect_task = asyncio.create_task(asyncio.to_thread(connect_redis))
+    with startup_profiler.phase("startup.database"):
+        db = await get_database()
+    # Lazy services (workflow engine, metrics) are built after this and get the real database
+    agentic_service.db = db
+    
+    # The mock database cannot hold shared state; the builder falls back to in-process state
+    shared_state = build_state_backend_from_env(None if isinstance(db, MockDatabase) else db)
+    if isinstance(shared_state, MongoStateBackend):
+        await shared_state.ensure_indexes()
+    otp_service.state = shared_state
+    marketplace_db.state = shared_state
+    logger.info(f"Shared state backend: {shared_state.name}")
+    reasoning_store = ReasoningStore(db)
+    with startup_profiler.phase("startup.indexes"):
+        await ensure_chat_indexes(db)
+        await reasoning_store.ensure_indexes()
+    persistence_queue = ChatPersistenceQueue(db, reasoning_store)
+    persistence_queue.start()
     logger.info("Database initialized for all endpoints")
+    
+    # Refill caches in the background; readiness does not wait for it
+    if os.environ.get("CACHE_WARMUP", "true").lower() == "true":
+        cache_warmer = CacheWarmer(
+            db, create_cache_key, set_cached_response, cache_conversation, mcp_client.get_crop_price,
+            time_budget=float(os.environ.get("CACHE_WARMUP_BUDGET", "20")),
+            history_window=CONVERSATION_HISTORY_WINDOW
+        )
+        cache_warmer.start()
+    
+    # Re-run weather and price steps of active workflows in the background
+    if os.environ.get("WORKFLOW_REFRESH", "true").lower() == "true":
+        job_scheduler = JobScheduler(db, poll_interval=float(os.environ.get("JOB_POLL_INTERVAL", "60")))
+        job_scheduler.register(
+            "workflow_refresh",
+            lambda: agentic_service.workflow_engine.refresh_time_sensitive_steps(
+                batch_size=int(os.environ.get("WORKFLOW_REFRESH_BATCH", "200"))
+            ),
+            interval=float(os.environ.get("WORKFLOW_REFRESH_HOURS", "6")) * 3600
+        )
+        await job_scheduler.start()
+    
+    startup_profiler.mark_ready()
 
 >>>>>>> c7ba531 (Initial push: migrate local codebase to KisanMitr)
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if cache_warmer:
+        await cache_warmer.stop()
+    if job_scheduler:
+        await job_scheduler.stop()
+    # Drain buffered chat writes before the connection goes away
+    if persistence_queue:
+        await persistence_queue.stop()
+    await llm_router.close()
+    await shared_state.close()
+    if hasattr(rate_limiter.backend, "close"):
+        await rate_limiter.backend.close()
+    auth_crypto_executor.shutdown(wait=False)
     client.close()
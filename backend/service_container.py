@@ -0,0 +1,100 @@
+"""
+Lazy Service Container and Startup Profiling
+Optional subsystems are built on first use instead of at import, and every
+import phase and service initialization is timed so cold-start cost can be
+broken down from /api/startup-report.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Qualified names of every lazy_service attribute, to report those never built
+_LAZY_SERVICE_NAMES = set()
+
+
+class StartupProfiler:
+    """Records how long import phases and service initializations take"""
+
+    def __init__(self):
+        self.process_start = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self.services: Dict[str, Dict[str, Any]] = {}
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "duration_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+    def record_service(self, name: str, duration: float, lazy: bool):
+        self.services[name] = {
+            "duration_ms": round(duration * 1000, 2),
+            "lazy": lazy,
+            "initialized_after_ms": round((time.perf_counter() - self.process_start) * 1000, 2)
+        }
+
+    def mark_ready(self):
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+            logger.info(f"Startup complete in {self.report()['time_to_ready_ms']}ms")
+
+    def report(self) -> Dict[str, Any]:
+        slowest = sorted(self.phases, key=lambda phase: phase["duration_ms"], reverse=True)
+        return {
+            "time_to_ready_ms": round((self.ready_at - self.process_start) * 1000, 2) if self.ready_at else None,
+            "phases": self.phases,
+            "slowest_phases": [phase["name"] for phase in slowest[:3]],
+            "services": self.services,
+            "pending_lazy_services": sorted(_LAZY_SERVICE_NAMES - set(self.services))
+        }
+
+
+startup_profiler = StartupProfiler()
+
+
+class lazy_service:
+    """
+    Attribute built by its factory on first access, then stored on the instance
+
+    Being a non-data descriptor, later reads hit the instance dict directly and
+    cost nothing extra. The build is timed into the startup profiler.
+    """
+
+    def __init__(self, factory: Callable[[Any], Any]):
+        self.factory = factory
+        self.name = factory.__name__
+        self._lock = threading.Lock()
+        self.__doc__ = factory.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.qualified_name = f"{owner.__name__}.{name}"
+        _LAZY_SERVICE_NAMES.add(self.qualified_name)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self._lock:
+            if self.name in instance.__dict__:
+                return instance.__dict__[self.name]
+            started = time.perf_counter()
+            value = self.factory(instance)
+            instance.__dict__[self.name] = value
+        startup_profiler.record_service(self.qualified_name, time.perf_counter() - started, lazy=True)
+        return value
+
+
+def timed_init(name: str, factory: Callable[[], Any]) -> Any:
+    """Build an eager service, recording its initialization time"""
+    started = time.perf_counter()
+    value = factory()
+    startup_profiler.record_service(name, time.perf_counter() - started, lazy=False)
+    return value
@@ -0,0 +1,460 @@
+"""
+Shared State Backends
+OTP codes, marketplace listings, workflow instances and metrics counters used
+to live in per-process dicts, so every uvicorn/gunicorn worker saw different
+state. Components now keep that state in a SharedStateBackend: in-process for a
+single worker, or Redis / MongoDB when running several workers or replicas.
+
+Records are flat dicts of JSON-serializable fields grouped by namespace.
+Counter updates (OTP attempts, listing views, metrics) are atomic in every backend.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORY = "memory"
+BACKEND_REDIS = "redis"
+BACKEND_MONGO = "mongo"
+
+# Leases are kept apart from the record namespaces
+LEASES_NAMESPACE = "__leases__"
+
+
+class SharedStateBackend:
+    """Interface shared by all state backends"""
+
+    name = "base"
+    # True when other processes see the same state
+    shared = False
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, namespace: str, key: str, record: Dict[str, Any], ttl: Optional[int] = None):
+        """Replace the whole record; ttl is in seconds"""
+        raise NotImplementedError
+
+    async def update(self, namespace: str, key: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Set fields of an existing record; returns the updated record or None if it does not exist"""
+        raise NotImplementedError
+
+    async def delete(self, namespace: str, key: str) -> bool:
+        """Returns True only for the caller that actually removed the record"""
+        raise NotImplementedError
+
+    async def incr(self, namespace: str, key: str, field: str, amount: int = 1) -> int:
+        """Atomically add to an integer field, creating it at 0; returns the new value"""
+        raise NotImplementedError
+
+    async def incr_existing(self, namespace: str, key: str, field: str, amount: int = 1) -> Optional[int]:
+        """Like incr, but never creates the record; None if it is missing or expired"""
+        raise NotImplementedError
+
+    async def incr_many(self, namespace: str, key: str, increments: Dict[str, int]):
+        """Atomically add to several integer fields of one record"""
+        raise NotImplementedError
+
+    async def values(self, namespace: str) -> List[Dict[str, Any]]:
+        """All live records of a namespace"""
+        raise NotImplementedError
+
+    async def acquire_lease(self, name: str, owner: str, ttl: int) -> bool:
+        """Take or renew an expiring lease; False while another owner holds it"""
+        raise NotImplementedError
+
+    async def release_lease(self, name: str, owner: str):
+        """Drop the lease if owner still holds it"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryStateBackend(SharedStateBackend):
+    """Process-local state; correct for a single worker only"""
+
+    name = BACKEND_MEMORY
+    shared = False
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._expiry: Dict[str, Dict[str, float]] = {}
+
+    def _live(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        records = self._records.get(namespace)
+        if not records or key not in records:
+            return None
+        expires_at = self._expiry.get(namespace, {}).get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            del records[key]
+            del self._expiry[namespace][key]
+            return None
+        return records[key]
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        record = self._live(namespace, key)
+        return dict(record) if record is not None else None
+
+    async def set(self, namespace: str, key: str, record: Dict[str, Any], ttl: Optional[int] = None):
+        self._records.setdefault(namespace, {})[key] = dict(record)
+        expiry = self._expiry.setdefault(namespace, {})
+        if ttl:
+            expiry[key] = time.monotonic() + ttl
+        else:
+            expiry.pop(key, None)
+
+    async def update(self, namespace: str, key: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        record = self._live(namespace, key)
+        if record is None:
+            return None
+        record.update(fields)
+        return dict(record)
+
+    async def delete(self, namespace: str, key: str) -> bool:
+        if self._live(namespace, key) is None:
+            return False
+        del self._records[namespace][key]
+        self._expiry.get(namespace, {}).pop(key, None)
+        return True
+
+    async def incr(self, namespace: str, key: str, field: str, amount: int = 1) -> int:
+        record = self._live(namespace, key)
+        if record is None:
+            record = self._records.setdefault(namespace, {}).setdefault(key, {})
+        record[field] = record.get(field, 0) + amount
+        return record[field]
+
+    async def incr_existing(self, namespace: str, key: str, field: str, amount: int = 1) -> Optional[int]:
+        record = self._live(namespace, key)
+        if record is None:
+            return None
+        record[field] = record.get(field, 0) + amount
+        return record[field]
+
+    async def incr_many(self, namespace: str, key: str, increments: Dict[str, int]):
+        for field, amount in increments.items():
+            await self.incr(namespace, key, field, amount)
+
+    async def values(self, namespace: str) -> List[Dict[str, Any]]:
+        records = []
+        for key in list(self._records.get(namespace, {})):
+            record = self._live(namespace, key)
+            if record is not None:
+                records.append(dict(record))
+        return records
+
+    async def acquire_lease(self, name: str, owner: str, ttl: int) -> bool:
+        lease = self._live(LEASES_NAMESPACE, name)
+        if lease is not None and lease["owner"] != owner:
+            return False
+        await self.set(LEASES_NAMESPACE, name, {"owner": owner}, ttl=ttl)
+        return True
+
+    async def release_lease(self, name: str, owner: str):
+        lease = self._live(LEASES_NAMESPACE, name)
+        if lease is not None and lease["owner"] == owner:
+            await self.delete(LEASES_NAMESPACE, name)
+
+
+# Sets fields only if the hash still exists, so an update never resurrects a deleted record
+_REDIS_UPDATE_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+# Increments only if the hash still exists; a missing record is not recreated without its TTL
+_REDIS_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+return redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+"""
+
+# KEYS[1] lease key; ARGV: owner, ttl (ms). Takes a free lease or renews our own
+_REDIS_ACQUIRE_LEASE = """
+local current = redis.call('GET', KEYS[1])
+if current and current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+
+_REDIS_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisStateBackend(SharedStateBackend):
+    """
+    Records are Redis hashes of JSON-encoded fields
+
+    Each namespace also keeps a set of its keys so values() does not need SCAN;
+    keys whose hash has expired are pruned from the set when encountered.
+    """
+
+    name = BACKEND_REDIS
+    shared = True
+
+    def __init__(self, redis_url: str, prefix: str = "farmchat"):
+        import redis.asyncio as redis_asyncio
+        self.client = redis_asyncio.from_url(redis_url, decode_responses=True)
+        self.prefix = prefix
+        self._update_if_exists = self.client.register_script(_REDIS_UPDATE_IF_EXISTS)
+        self._incr_if_exists = self.client.register_script(_REDIS_INCR_IF_EXISTS)
+        self._acquire_lease = self.client.register_script(_REDIS_ACQUIRE_LEASE)
+        self._release_lease = self.client.register_script(_REDIS_RELEASE_LEASE)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _index(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}:__keys__"
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> Dict[str, str]:
+        return {field: json.dumps(value, default=str) for field, value in record.items()}
+
+    @staticmethod
+    def _decode(raw: Dict[str, str]) -> Dict[str, Any]:
+        return {field: json.loads(value) for field, value in raw.items()}
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.hgetall(self._key(namespace, key))
+        return self._decode(raw) if raw else None
+
+    async def set(self, namespace: str, key: str, record: Dict[str, Any], ttl: Optional[int] = None):
+        redis_key = self._key(namespace, key)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(redis_key)
+            if record:
+                pipe.hset(redis_key, mapping=self._encode(record))
+            if ttl:
+                pipe.expire(redis_key, ttl)
+            pipe.sadd(self._index(namespace), key)
+            await pipe.execute()
+
+    async def update(self, namespace: str, key: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        args = [part for field, value in self._encode(fields).items() for part in (field, value)]
+        if args and not await self._update_if_exists(keys=[self._key(namespace, key)], args=args):
+            return None
+        return await self.get(namespace, key)
+
+    async def delete(self, namespace: str, key: str) -> bool:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(namespace, key))
+            pipe.srem(self._index(namespace), key)
+            deleted, _ = await pipe.execute()
+        return bool(deleted)
+
+    async def incr(self, namespace: str, key: str, field: str, amount: int = 1) -> int:
+        return await self.client.hincrby(self._key(namespace, key), field, amount)
+
+    async def incr_existing(self, namespace: str, key: str, field: str, amount: int = 1) -> Optional[int]:
+        return await self._incr_if_exists(keys=[self._key(namespace, key)], args=[field, amount])
+
+    async def incr_many(self, namespace: str, key: str, increments: Dict[str, int]):
+        redis_key = self._key(namespace, key)
+        async with self.client.pipeline(transaction=True) as pipe:
+            for field, amount in increments.items():
+                pipe.hincrby(redis_key, field, amount)
+            await pipe.execute()
+
+    async def values(self, namespace: str) -> List[Dict[str, Any]]:
+        keys = sorted(await self.client.smembers(self._index(namespace)))
+        if not keys:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(self._key(namespace, key))
+            raws = await pipe.execute()
+
+        records, expired = [], []
+        for key, raw in zip(keys, raws):
+            if raw:
+                records.append(self._decode(raw))
+            else:
+                expired.append(key)
+        if expired:
+            await self.client.srem(self._index(namespace), *expired)
+        return records
+
+    async def acquire_lease(self, name: str, owner: str, ttl: int) -> bool:
+        return bool(await self._acquire_lease(keys=[self._key(LEASES_NAMESPACE, name)], args=[owner, int(ttl * 1000)]))
+
+    async def release_lease(self, name: str, owner: str):
+        await self._release_lease(keys=[self._key(LEASES_NAMESPACE, name)], args=[owner])
+
+    async def close(self):
+        await self.client.close()
+
+
+class MongoStateBackend(SharedStateBackend):
+    """
+    One document per record in a shared_state collection
+
+    Fields live under "data"; dots are escaped because Mongo treats them as
+    paths. Expired documents are filtered on read and removed by a TTL index.
+    """
+
+    name = BACKEND_MONGO
+    shared = True
+
+    def __init__(self, database, collection_name: str = "shared_state"):
+        self.db = database
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return getattr(self.db, self.collection_name)
+
+    async def ensure_indexes(self):
+        try:
+            await self.collection.create_index("expires_at", name="expires_at", expireAfterSeconds=0)
+            await self.collection.create_index("namespace", name="namespace")
+        except Exception as e:
+            logger.warning(f"Could not ensure shared state indexes: {e}")
+
+    @staticmethod
+    def _escape(field: str) -> str:
+        return field.replace(".", "．")
+
+    @staticmethod
+    def _unescape(field: str) -> str:
+        return field.replace("．", ".")
+
+    def _unpack(self, document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not document:
+            return None
+        return {self._unescape(field): value for field, value in document.get("data", {}).items()}
+
+    @staticmethod
+    def _live_filter(namespace: str, key: str) -> Dict[str, Any]:
+        return {
+            "_id": f"{namespace}:{key}",
+            "$or": [{"expires_at": None}, {"expires_at": {"$gt": datetime.now(timezone.utc)}}]
+        }
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        return self._unpack(await self.collection.find_one(self._live_filter(namespace, key)))
+
+    async def set(self, namespace: str, key: str, record: Dict[str, Any], ttl: Optional[int] = None):
+        await self.collection.replace_one(
+            {"_id": f"{namespace}:{key}"},
+            {
+                "namespace": namespace,
+                "data": {self._escape(field): value for field, value in record.items()},
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl) if ttl else None
+            },
+            upsert=True
+        )
+
+    async def update(self, namespace: str, key: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        from pymongo import ReturnDocument
+        document = await self.collection.find_one_and_update(
+            self._live_filter(namespace, key),
+            {"$set": {f"data.{self._escape(field)}": value for field, value in fields.items()}},
+            return_document=ReturnDocument.AFTER
+        )
+        return self._unpack(document)
+
+    async def delete(self, namespace: str, key: str) -> bool:
+        result = await self.collection.delete_one(self._live_filter(namespace, key))
+        return result.deleted_count > 0
+
+    async def incr(self, namespace: str, key: str, field: str, amount: int = 1) -> int:
+        from pymongo import ReturnDocument
+        document = await self.collection.find_one_and_update(
+            {"_id": f"{namespace}:{key}"},
+            {"$inc": {f"data.{self._escape(field)}": amount}, "$setOnInsert": {"namespace": namespace}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return document["data"][self._escape(field)]
+
+    async def incr_existing(self, namespace: str, key: str, field: str, amount: int = 1) -> Optional[int]:
+        from pymongo import ReturnDocument
+        document = await self.collection.find_one_and_update(
+            self._live_filter(namespace, key),
+            {"$inc": {f"data.{self._escape(field)}": amount}},
+            return_document=ReturnDocument.AFTER
+        )
+        if document is None:
+            return None
+        return document["data"][self._escape(field)]
+
+    async def incr_many(self, namespace: str, key: str, increments: Dict[str, int]):
+        await self.collection.update_one(
+            {"_id": f"{namespace}:{key}"},
+            {
+                "$inc": {f"data.{self._escape(field)}": amount for field, amount in increments.items()},
+                "$setOnInsert": {"namespace": namespace}
+            },
+            upsert=True
+        )
+
+    async def values(self, namespace: str) -> List[Dict[str, Any]]:
+        documents = await self.collection.find({
+            "namespace": namespace,
+            "$or": [{"expires_at": None}, {"expires_at": {"$gt": datetime.now(timezone.utc)}}]
+        }).to_list(None)
+        return [self._unpack(document) for document in documents]
+
+    async def acquire_lease(self, name: str, owner: str, ttl: int) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches a free, expired or own lease; otherwise the upsert collides on _id
+            await self.collection.update_one(
+                {
+                    "_id": f"{LEASES_NAMESPACE}:{name}",
+                    "$or": [{"data.owner": owner}, {"expires_at": {"$lte": now}}]
+                },
+                {"$set": {
+                    "namespace": LEASES_NAMESPACE,
+                    "data": {"owner": owner},
+                    "expires_at": now + timedelta(seconds=ttl)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release_lease(self, name: str, owner: str):
+        await self.collection.delete_one({"_id": f"{LEASES_NAMESPACE}:{name}", "data.owner": owner})
+
+
+def build_state_backend_from_env(database=None) -> SharedStateBackend:
+    """
+    Select the backend from SHARED_STATE_BACKEND (memory, redis or mongo)
+
+    redis uses REDIS_URL; mongo uses the application database. Falls back to
+    the in-process backend when the selected one cannot be set up.
+    """
+    choice = os.environ.get("SHARED_STATE_BACKEND", BACKEND_MEMORY).lower()
+    try:
+        if choice == BACKEND_REDIS:
+            return RedisStateBackend(
+                os.environ.get("REDIS_URL", "redis://localhost:6379"),
+                prefix=os.environ.get("SHARED_STATE_PREFIX", "farmchat")
+            )
+        if choice == BACKEND_MONGO:
+            if database is None:
+                raise ValueError("no database available")
+            return MongoStateBackend(database)
+    except Exception as e:
+        logger.warning(f"Shared state backend '{choice}' unavailable, using in-process state: {e}")
+    return InMemoryStateBackend()
@@ -0,0 +1,209 @@
+"""
+Speculative Tool Prefetch
+A cheap local pre-classifier guesses obvious tool calls (crop-price, weather)
+from the raw user message so they can run while the analysis LLM call is in
+flight. Results are only used when the analysis confirms the same tool with
+matching parameters; everything else is cancelled or discarded.
+"""
+
+import asyncio
+import logging
+import re
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# Canonical commodity names as sent to the crop-price tool, with local-language aliases
+COMMODITY_ALIASES = {
+    "Wheat": ["wheat", "gehun", "gehu", "kanak", "गेहूं", "गेहूँ", "ਕਣਕ"],
+    "Rice": ["rice", "chawal", "चावल", "ਚਾਵਲ", "ਚੌਲ"],
+    "Paddy": ["paddy", "dhan", "धान", "ਝੋਨਾ"],
+    "Cotton": ["cotton", "kapas", "narma", "कपास", "ਕਪਾਹ", "ਨਰਮਾ"],
+    "Maize": ["maize", "makka", "makki", "मक्का", "ਮੱਕੀ"],
+    "Mustard": ["mustard", "sarson", "सरसों", "ਸਰ੍ਹੋਂ"],
+    "Sugarcane": ["sugarcane", "ganna", "गन्ना", "ਗੰਨਾ"],
+    "Bajra": ["bajra", "pearl millet", "बाजरा", "ਬਾਜਰਾ"],
+    "Jowar": ["jowar", "sorghum", "ज्वार"],
+    "Barley": ["barley", "jau", "जौ", "ਜੌਂ"],
+    "Gram": ["gram", "chana", "चना", "ਛੋਲੇ"],
+    "Soyabean": ["soybean", "soyabean", "soya", "सोयाबीन"],
+    "Groundnut": ["groundnut", "peanut", "moongphali", "मूंगफली"],
+    "Onion": ["onion", "pyaz", "pyaaz", "प्याज", "ਪਿਆਜ਼"],
+    "Potato": ["potato", "aloo", "आलू", "ਆਲੂ"],
+    "Tomato": ["tomato", "tamatar", "टमाटर", "ਟਮਾਟਰ"],
+}
+
+STATE_ALIASES = {
+    "Punjab": ["punjab", "पंजाब", "ਪੰਜਾਬ"],
+    "Haryana": ["haryana", "हरियाणा", "ਹਰਿਆਣਾ"],
+    "Uttar Pradesh": ["uttar pradesh", "उत्तर प्रदेश"],
+    "Madhya Pradesh": ["madhya pradesh", "मध्य प्रदेश"],
+    "Rajasthan": ["rajasthan", "राजस्थान"],
+    "Maharashtra": ["maharashtra", "महाराष्ट्र"],
+    "Gujarat": ["gujarat", "गुजरात", "ગુજરાત"],
+    "Bihar": ["bihar", "बिहार"],
+    "West Bengal": ["west bengal", "पश्चिम बंगाल", "পশ্চিমবঙ্গ"],
+    "Karnataka": ["karnataka", "ಕರ್ನಾಟಕ"],
+    "Tamil Nadu": ["tamil nadu", "தமிழ்நாடு"],
+    "Telangana": ["telangana", "తెలంగాణ"],
+    "Andhra Pradesh": ["andhra pradesh", "ఆంధ్రప్రదేశ్"],
+    "Kerala": ["kerala", "കേരളം"],
+    "Odisha": ["odisha", "orissa"],
+}
+
+PRICE_INTENT_TERMS = ["price", "rate", "bhav", "bhaav", "daam", "mandi", "market", "msp",
+                      "भाव", "दाम", "कीमत", "मंडी", "ਭਾਅ", "ਕੀਮਤ", "ਮੰਡੀ"]
+WEATHER_INTENT_TERMS = ["weather", "rain", "forecast", "temperature", "mausam", "barish",
+                        "मौसम", "बारिश", "ਮੌਸਮ", "ਮੀਂਹ"]
+
+
+def build_alias_matcher(aliases: Dict[str, List[str]]) -> Tuple[re.Pattern, Dict[str, str]]:
+    """One alternation over every alias, longest first, mapping back to the canonical name"""
+    lookup = {alias.lower(): canonical for canonical, names in aliases.items() for alias in names}
+    alternation = "|".join(re.escape(alias) for alias in sorted(lookup, key=len, reverse=True))
+    # Latin aliases need word boundaries; Indic aliases are matched as substrings
+    return re.compile(rf"(?<![a-z])(?:{alternation})(?![a-z])", re.IGNORECASE), lookup
+
+
+_COMMODITY_PATTERN, _COMMODITY_LOOKUP = build_alias_matcher(COMMODITY_ALIASES)
+_STATE_PATTERN, _STATE_LOOKUP = build_alias_matcher(STATE_ALIASES)
+_PRICE_PATTERN, _ = build_alias_matcher({"price": PRICE_INTENT_TERMS})
+_WEATHER_PATTERN, _ = build_alias_matcher({"weather": WEATHER_INTENT_TERMS})
+
+
+class ToolPreclassifier:
+    """Keyword pre-classifier predicting tool calls that are obvious from the message alone"""
+
+    def predict(self, message: str) -> Dict[str, Dict[str, Any]]:
+        """Return {tool_key: params} for tool calls worth starting speculatively"""
+        predictions = {}
+
+        state_match = _STATE_PATTERN.search(message)
+        state = _STATE_LOOKUP[state_match.group(0).lower()] if state_match else None
+        if not state:
+            return predictions
+
+        commodity_match = _COMMODITY_PATTERN.search(message)
+        if commodity_match and _PRICE_PATTERN.search(message):
+            predictions["crop_price"] = {
+                "state": state,
+                "commodity": _COMMODITY_LOOKUP[commodity_match.group(0).lower()],
+                "district": ""
+            }
+
+        if _WEATHER_PATTERN.search(message):
+            predictions["weather"] = {"location": state}
+
+        return predictions
+
+
+def _normalize(value: Any) -> str:
+    return str(value or "").strip().lower()
+
+
+def params_match(tool_key: str, speculative: Dict[str, Any], confirmed: Dict[str, Any]) -> bool:
+    """Check whether the analysis-confirmed parameters are the ones we prefetched"""
+    if speculative == confirmed:
+        return True
+    if tool_key == "crop_price":
+        return all(_normalize(speculative.get(field)) == _normalize(confirmed.get(field))
+                   for field in ("state", "commodity", "district"))
+    if tool_key == "weather":
+        confirmed_location = confirmed.get("location") or confirmed.get("state") or ""
+        return bool(confirmed_location) and _normalize(speculative.get("location")) == _normalize(confirmed_location)
+    return False
+
+
+class Speculation:
+    """In-flight speculative tool calls for a single message"""
+
+    def __init__(self, tasks: Dict[str, Tuple[Dict[str, Any], asyncio.Task]], stats: Dict[str, int]):
+        self.tasks = tasks
+        self.stats = stats
+        self.claimed: List[str] = []
+
+    async def claim(self, tool_key: str, confirmed_params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the prefetched result if the analysis confirms the same call, else None"""
+        entry = self.tasks.get(tool_key)
+        if not entry:
+            return None
+
+        speculative_params, task = entry
+        if not params_match(tool_key, speculative_params, confirmed_params):
+            self.stats["mismatched"] += 1
+            return None
+
+        try:
+            result = await task
+        except Exception as e:
+            logger.debug(f"Speculative {tool_key} call failed, falling back to a direct call: {e}")
+            return None
+
+        self.claimed.append(tool_key)
+        self.stats["hits"] += 1
+        return result
+
+    def cancel_unclaimed(self):
+        """Cancel or discard every speculative call that was not used"""
+        for tool_key, (_, task) in self.tasks.items():
+            if tool_key in self.claimed:
+                continue
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark a failed speculative call as retrieved
+            self.stats["discarded"] += 1
+        self.tasks = {}
+
+
+class SpeculativePrefetcher:
+    """Starts likely tool calls alongside the analysis LLM call"""
+
+    def __init__(self, mcp_client, enabled: bool = True):
+        self.mcp = mcp_client
+        self.enabled = enabled
+        self.preclassifier = ToolPreclassifier()
+        self.stats = {"launched": 0, "hits": 0, "mismatched": 0, "discarded": 0}
+
+    def _call_for(self, tool_key: str, params: Dict[str, Any]) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        if tool_key == "crop_price":
+            return lambda: self.mcp.get_crop_price(
+                state=params["state"], commodity=params["commodity"], district=params.get("district")
+            )
+        return lambda: self.mcp.call_tool(tool_key, params)
+
+    def start(self, user_message: str) -> Speculation:
+        """Launch speculative tool calls for the message and return a handle to claim them"""
+        tasks = {}
+        if self.enabled:
+            for tool_key, params in self.preclassifier.predict(user_message).items():
+                tasks[tool_key] = (params, asyncio.create_task(self._call_for(tool_key, params)()))
+                self.stats["launched"] += 1
+            if tasks:
+                logger.info(f"Speculatively prefetching tools: {list(tasks)}")
+        return Speculation(tasks, self.stats)
+
+    def launch(self, speculation: Speculation, tool_key: str, params: Dict[str, Any]):
+        """Start a tool call confirmed early (e.g. by a streamed analysis) unless an equivalent one is running"""
+        if not self.enabled:
+            return
+        if tool_key == "crop_price" and not (params.get("state") and params.get("commodity")):
+            return
+
+        entry = speculation.tasks.get(tool_key)
+        if entry:
+            if params_match(tool_key, entry[0], params):
+                return
+            # The analysis disagrees with the pre-classifier; its parameters win
+            if not entry[1].done():
+                entry[1].cancel()
+            self.stats["discarded"] += 1
+
+        speculation.tasks[tool_key] = (dict(params), asyncio.create_task(self._call_for(tool_key, params)()))
+        self.stats["launched"] += 1
+        logger.info(f"Started {tool_key} from streamed analysis")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate of speculative calls, for tuning the pre-classifier"""
+        launched = max(self.stats["launched"], 1)
+        return {**self.stats, "hit_rate": self.stats["hits"] / launched}
@@ -0,0 +1,387 @@
+"""
+Template Answers for High-Frequency Intents
+Short, single-intent questions ("when to sow wheat", "what is PM-KISAN") are
+answered from precomputed localized templates filled from the RAG crop data
+and the schemes database, skipping the LLM pipeline. A template is used only
+when the question has the form it answers (when / how much / what is).
+Anything compound, diagnostic or time-sensitive (prices, weather, symptoms,
+pesticides, claims, payment status) is left to the pipeline.
+"""
+
+import logging
+import re
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from speculative_prefetch import build_alias_matcher, PRICE_INTENT_TERMS, WEATHER_INTENT_TERMS
+
+logger = logging.getLogger(__name__)
+
+INTENT_CROP_CALENDAR = "crop_calendar"
+INTENT_FERTILIZER = "fertilizer_dose"
+INTENT_SCHEME_INFO = "scheme_info"
+
+# Longer messages usually carry context a template would ignore
+MAX_TEMPLATE_WORDS = 14
+
+# Off-topic rejection, returned when the analysis marks a query non-agricultural
+REJECTION_MESSAGES = {
+    "en": "I apologize, but I can only assist with farming and agricultural topics. Please ask me questions about crops, livestock, farming techniques, agricultural markets, or related farming matters.",
+    "hi": "मुझे खेद है, लेकिन मैं केवल खेती और कृषि विषयों में सहायता कर सकता हूं। कृपया मुझसे फसलों, पशुधन, खेती की तकनीकों, कृषि बाजारों या संबंधित खेती के मामलों के बारे में प्रश्न पूछें।",
+    "ta": "மன்னிக்கவும், நான் விவசாயம் மற்றும் வேளாண்மை தொடர்பான விஷயங்களில் மட்டுமே உதவ முடியும்.",
+    "te": "క్షమించండి, నేను వ్యవసాయం మరియు వ్యవసాయ అంశాలలో మాత్రమే సహాయం చేయగలను.",
+    "mr": "माफ करा, मी फक्त शेती आणि कृषी विषयांमध्ये मदत करू शकतो.",
+    "bn": "দুঃখিত, আমি শুধুমাত্র কৃষি এবং কৃষি বিষয়ে সাহায্য করতে পারি।",
+    "gu": "માફ કરશો, હું ફક્ત ખેતી અને કૃષિ વિષયોમાં મદદ કરી શકું છું.",
+    "kn": "ಕ್ಷಮಿಸಿ, ನಾನು ಕೇವಲ ಕೃಷಿ ಮತ್ತು ಕೃಷಿ ವಿಷಯಗಳಲ್ಲಿ ಮಾತ್ರ ಸಹಾಯ ಮಾಡಬಲ್ಲೆ.",
+    "ml": "ക്ഷമിക്കണം, എനിക്ക് കൃഷിയും കാർഷിക വിഷയങ്ങളിലും മാത്രമേ സഹായിക്കാൻ കഴിയൂ.",
+    "pa": "ਮਾਫ਼ ਕਰਨਾ, ਮੈਂ ਸਿਰਫ਼ ਖੇਤੀਬਾੜੀ ਅਤੇ ਖੇਤੀ ਵਿਸ਼ਿਆਂ ਵਿੱਚ ਮਦਦ ਕਰ ਸਕਦਾ ਹਾਂ।"
+}
+
+# Crops with entries in AgriculturalRAG.crop_specific_knowledge
+CROP_ALIASES = {
+    "wheat": ["wheat", "gehun", "gehu", "gahu", "kanak", "गेहूं", "गेहूँ", "गहू", "गव्हा", "ਕਣਕ", "গম",
+              "ઘઉં", "கோதுமை", "గోధుమ", "ಗೋಧಿ", "ഗോതമ്പ്"],
+    "rice": ["rice", "paddy", "dhan", "chawal", "jhona", "धान", "चावल", "भात", "ਝੋਨਾ", "ਝੋਨੇ", "ਚਾਵਲ", "ধান",
+             "ડાંગર", "ચોખા", "நெல்", "அரிசி", "వరి", "ಭತ್ತ", "നെല്ല്"],
+    "cotton": ["cotton", "kapas", "narma", "कपास", "कापूस", "ਕਪਾਹ", "ਨਰਮਾ", "তুলা", "કપાસ", "பருத்தி",
+               "పత్తి", "ಹತ್ತಿ", "പരുത്തി"],
+}
+
+CROP_NAMES = {
+    "wheat": {"en": "Wheat", "hi": "गेहूं", "mr": "गहू", "pa": "ਕਣਕ", "bn": "গম", "gu": "ઘઉં",
+              "ta": "கோதுமை", "te": "గోధుమ", "kn": "ಗೋಧಿ", "ml": "ഗോതമ്പ്"},
+    "rice": {"en": "Paddy", "hi": "धान", "mr": "भात", "pa": "ਝੋਨਾ", "bn": "ধান", "gu": "ડાંગર",
+             "ta": "நெல்", "te": "వరి", "kn": "ಭತ್ತ", "ml": "നെല്ല്"},
+    "cotton": {"en": "Cotton", "hi": "कपास", "mr": "कापूस", "pa": "ਕਪਾਹ", "bn": "তুলা", "gu": "કપાસ",
+               "ta": "பருத்தி", "te": "పత్తి", "kn": "ಹತ್ತಿ", "ml": "പരുത്തി"},
+}
+
+SCHEME_ALIASES = {
+    "pm_kisan": ["pm kisan", "pm-kisan", "pmkisan", "kisan samman", "सम्मान निधि", "पीएम किसान", "पीएम-किसान",
+                 "ਪੀਐਮ ਕਿਸਾਨ", "ਕਿਸਾਨ ਸਨਮਾਨ", "পিএম কিষাণ", "પીએમ કિસાન", "பிஎம் கிசான்", "పీఎం కిసాన్",
+                 "ಪಿಎಂ ಕಿಸಾನ್", "പിഎം കിസാൻ"],
+    "pmfby": ["pmfby", "fasal bima", "crop insurance", "फसल बीमा", "पीक विमा", "ਫ਼ਸਲ ਬੀਮਾ", "ਫਸਲ ਬੀਮਾ",
+              "ফসল বিমা", "પાક વીમો", "பயிர் காப்பீடு", "పంట బీమా", "ಬೆಳೆ ವಿಮೆ", "വിള ഇൻഷുറൻസ്"],
+}
+
+INTENT_TERMS = {
+    INTENT_CROP_CALENDAR: [
+        "sow", "sowing", "plant", "planting", "harvest", "harvesting", "season", "buvai", "buai", "bowai",
+        "boni", "bona", "bijai", "bijni", "katai", "बुवाई", "बुआई", "बोनी", "बोएं", "बोना", "कटाई", "पेरणी",
+        "काढणी", "ਬਿਜਾਈ", "ਕਟਾਈ", "বপন", "ফসল কাটা", "વાવણી", "લણણી", "விதை", "அறுவடை", "విత్త", "కోత",
+        "ಬಿತ್ತನೆ", "ಕೊಯ್ಲು", "വിത", "വിളവെടു"
+    ],
+    INTENT_FERTILIZER: [
+        "fertilizer", "fertiliser", "npk", "khad", "khaad", "खाद", "उर्वरक",
+        "खत", "ਖਾਦ", "সার", "ખાતર", "உரம்", "ఎరువు", "ಗೊಬ್ಬರ", "വളം"
+    ],
+}
+
+# The question form each template answers; a keyword match without it goes to the LLM
+QUESTION_FORMS = {
+    INTENT_CROP_CALENDAR: [
+        "when", "which month", "what month", "time", "timing", "season", "kab", "kis mahine", "kab kare",
+        "कब", "समय", "महीने", "कधी", "ਕਦੋਂ", "ਕਿਹੜੇ ਮਹੀਨੇ", "কখন", "কোন মাসে", "ક્યારે", "எப்போது",
+        "ఎప్పుడు", "ಯಾವಾಗ", "എപ്പോൾ"
+    ],
+    INTENT_FERTILIZER: [
+        "how much", "how many", "dose", "dosage", "quantity", "per acre", "per hectare", "kitna", "kitni",
+        "matra", "कितना", "कितनी", "मात्रा", "किती", "ਕਿੰਨਾ", "ਕਿੰਨੀ", "ਮਾਤਰਾ", "কত", "કેટલું", "કેટલો",
+        "எவ்வளவு", "ఎంత", "ಎಷ್ಟು", "എത്ര"
+    ],
+    INTENT_SCHEME_INFO: [
+        "what is", "what's", "about", "details", "information", "info", "benefit", "benefits", "apply",
+        "eligible", "eligibility", "kya hai", "jankari", "क्या है", "जानकारी", "लाभ", "आवेदन", "काय आहे",
+        "ਕੀ ਹੈ", "ਜਾਣਕਾਰੀ", "কী", "কি", "શું છે", "என்ன", "ఏమిటి", "ಏನು", "എന്താണ്"
+    ],
+}
+
+# A scheme question about the farmer's own application or payment needs their records
+SCHEME_STATUS_TERMS = [
+    "my", "mine", "credited", "received", "receive", "not", "pending", "installment", "kist", "kisht",
+    "mera", "meri", "mere", "nahi", "मेरा", "मेरी", "मेरे", "नहीं", "किस्त", "आई", "आया", "माझा", "माझी",
+    "ਮੇਰਾ", "ਮੇਰੀ", "ਕਿਸ਼ਤ", "আমার", "મારો", "મારી", "என்", "నా", "ನನ್ನ", "എന്റെ"
+]
+
+# Signals that the question needs live data, diagnosis or a claim workflow
+EXCLUDED_TERMS = PRICE_INTENT_TERMS + WEATHER_INTENT_TERMS + [
+    "today", "tomorrow", "disease", "pest", "pests", "insect", "insects", "yellow", "spots", "wilt", "damage",
+    "claim", "flood", "status", "pesticide", "pesticides", "insecticide", "herbicide", "weedicide", "fungicide",
+    "spray", "weed", "weeds", "why", "wrong", "poor", "problem", "loss", "failed", "low yield", "dying",
+    # Templates give nutrient doses; a product quantity (kg of urea, bags of DAP) is a different number
+    "urea", "dap", "ssp", "mop", "यूरिया", "डीएपी", "युरिया", "ਯੂਰੀਆ", "ইউরিয়া", "યુરિયા", "யூரியா", "యూరియా",
+    "ಯೂರಿಯಾ", "യൂറിയ",
+    "kyon", "kyu", "kharab", "dawa", "dawai", "क्यों", "समस्या", "खराब", "दवा", "खरपतवार", "rog", "keede", "peele", "aaj", "kal", "रोग", "कीट", "कीड़", "पीले", "पीला", "नुकसान", "क्लेम",
+    "आज", "ਰੋਗ", "ਕੀੜ", "ਪੀਲ", "ਨੁਕਸਾਨ", "ਅੱਜ", "রোগ", "পোকা", "રોગ", "જીવાત", "நோய்", "பூச்சி",
+    "తెగులు", "పురుగు", "ರೋಗ", "ಕೀಟ", "രോഗ", "കീട"
+]
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december"]
+
+LOCAL_MONTHS = {
+    "en": ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+           "October", "November", "December"],
+    "hi": ["जनवरी", "फ़रवरी", "मार्च", "अप्रैल", "मई", "जून", "जुलाई", "अगस्त", "सितंबर", "अक्टूबर", "नवंबर",
+           "दिसंबर"],
+    "mr": ["जानेवारी", "फेब्रुवारी", "मार्च", "एप्रिल", "मे", "जून", "जुलै", "ऑगस्ट", "सप्टेंबर", "ऑक्टोबर",
+           "नोव्हेंबर", "डिसेंबर"],
+    "pa": ["ਜਨਵਰੀ", "ਫ਼ਰਵਰੀ", "ਮਾਰਚ", "ਅਪ੍ਰੈਲ", "ਮਈ", "ਜੂਨ", "ਜੁਲਾਈ", "ਅਗਸਤ", "ਸਤੰਬਰ", "ਅਕਤੂਬਰ", "ਨਵੰਬਰ",
+           "ਦਸੰਬਰ"],
+    "bn": ["জানুয়ারি", "ফেব্রুয়ারি", "মার্চ", "এপ্রিল", "মে", "জুন", "জুলাই", "আগস্ট", "সেপ্টেম্বর", "অক্টোবর",
+           "নভেম্বর", "ডিসেম্বর"],
+    "gu": ["જાન્યુઆરી", "ફેબ્રુઆરી", "માર્ચ", "એપ્રિલ", "મે", "જૂન", "જુલાઈ", "ઑગસ્ટ", "સપ્ટેમ્બર", "ઑક્ટોબર",
+           "નવેમ્બર", "ડિસેમ્બર"],
+    "ta": ["ஜனவரி", "பிப்ரவரி", "மார்ச்", "ஏப்ரல்", "மே", "ஜூன்", "ஜூலை", "ஆகஸ்ட்", "செப்டம்பர்", "அக்டோபர்",
+           "நவம்பர்", "டிசம்பர்"],
+    "te": ["జనవరి", "ఫిబ్రవరి", "మార్చి", "ఏప్రిల్", "మే", "జూన్", "జూలై", "ఆగస్టు", "సెప్టెంబర్", "అక్టోబర్",
+           "నవంబర్", "డిసెంబర్"],
+    "kn": ["ಜನವರಿ", "ಫೆಬ್ರವರಿ", "ಮಾರ್ಚ್", "ಏಪ್ರಿಲ್", "ಮೇ", "ಜೂನ್", "ಜುಲೈ", "ಆಗಸ್ಟ್", "ಸೆಪ್ಟೆಂಬರ್", "ಅಕ್ಟೋಬರ್",
+           "ನವೆಂಬರ್", "ಡಿಸೆಂಬರ್"],
+    "ml": ["ജനുവരി", "ഫെബ്രുവരി", "മാർച്ച്", "ഏപ്രിൽ", "മേയ്", "ജൂൺ", "ജൂലൈ", "ഓഗസ്റ്റ്", "സെപ്റ്റംബർ",
+           "ഒക്ടോബർ", "നവംബർ", "ഡിസംബർ"],
+}
+
+LOCAL_SEASONS = {
+    "rabi": {"en": "Rabi", "hi": "रबी", "mr": "रब्बी", "pa": "ਹਾੜ੍ਹੀ", "bn": "রবি", "gu": "રવિ",
+             "ta": "ராபி", "te": "రబీ", "kn": "ರಬಿ", "ml": "റാബി"},
+    "kharif": {"en": "Kharif", "hi": "खरीफ", "mr": "खरीप", "pa": "ਸਾਉਣੀ", "bn": "খরিফ", "gu": "ખરીફ",
+               "ta": "காரீஃப்", "te": "ఖరీఫ్", "kn": "ಖಾರಿಫ್", "ml": "ഖരീഫ്"},
+}
+
+TEMPLATES = {
+    INTENT_CROP_CALENDAR: {
+        "en": "{crop} is a {season} crop. Sow it in {sow} and harvest in {harvest}.",
+        "hi": "{crop} {season} की फसल है। इसकी बुवाई {sow} में करें और कटाई {harvest} में होती है।",
+        "mr": "{crop} हे {season} हंगामातील पीक आहे. पेरणी {sow} मध्ये करा आणि काढणी {harvest} मध्ये होते.",
+        "pa": "{crop} {season} ਦੀ ਫ਼ਸਲ ਹੈ। ਇਸਦੀ ਬਿਜਾਈ {sow} ਵਿੱਚ ਕਰੋ ਅਤੇ ਕਟਾਈ {harvest} ਵਿੱਚ ਹੁੰਦੀ ਹੈ।",
+        "bn": "{crop} একটি {season} ফসল। {sow} মাসে বপন করুন এবং {harvest} মাসে ফসল কাটা হয়।",
+        "gu": "{crop} {season} પાક છે. તેની વાવણી {sow} માં કરો અને લણણી {harvest} માં થાય છે.",
+        "ta": "{crop} ஒரு {season} பருவப் பயிர். {sow} மாதங்களில் விதைத்து {harvest} மாதங்களில் அறுவடை செய்யலாம்.",
+        "te": "{crop} {season} పంట. {sow} నెలల్లో విత్తి {harvest} నెలల్లో కోత కోయవచ్చు.",
+        "kn": "{crop} {season} ಬೆಳೆ. {sow} ತಿಂಗಳಲ್ಲಿ ಬಿತ್ತನೆ ಮಾಡಿ, {harvest} ತಿಂಗಳಲ್ಲಿ ಕೊಯ್ಲು ಮಾಡಬಹುದು.",
+        "ml": "{crop} ഒരു {season} വിളയാണ്. {sow} മാസങ്ങളിൽ വിതച്ച് {harvest} മാസങ്ങളിൽ വിളവെടുക്കാം.",
+    },
+    INTENT_FERTILIZER: {
+        "en": "Recommended fertilizer for {crop}: {n} kg nitrogen, {p} kg phosphorus and {k} kg potash per hectare.{schedule} Adjust the dose to your soil test report.",
+        "hi": "{crop} के लिए प्रति हेक्टेयर {n} किलो नाइट्रोजन, {p} किलो फास्फोरस और {k} किलो पोटाश दें।{schedule} मिट्टी जांच रिपोर्ट के अनुसार मात्रा बदलें।",
+        "mr": "{crop} साठी प्रति हेक्टर {n} किलो नत्र, {p} किलो स्फुरद आणि {k} किलो पालाश द्या.{schedule} माती परीक्षण अहवालानुसार मात्रा बदला.",
+        "pa": "{crop} ਲਈ ਪ੍ਰਤੀ ਹੈਕਟੇਅਰ {n} ਕਿਲੋ ਨਾਈਟ੍ਰੋਜਨ, {p} ਕਿਲੋ ਫਾਸਫੋਰਸ ਅਤੇ {k} ਕਿਲੋ ਪੋਟਾਸ਼ ਪਾਓ।{schedule} ਮਿੱਟੀ ਦੀ ਜਾਂਚ ਅਨੁਸਾਰ ਮਾਤਰਾ ਬਦਲੋ।",
+        "bn": "{crop} চাষে হেক্টর প্রতি {n} কেজি নাইট্রোজেন, {p} কেজি ফসফরাস ও {k} কেজি পটাশ দিন।{schedule} মাটি পরীক্ষার রিপোর্ট অনুযায়ী মাত্রা ঠিক করুন।",
+        "gu": "{crop} માટે પ્રતિ હેક્ટર {n} કિલો નાઇટ્રોજન, {p} કિલો ફોસ્ફરસ અને {k} કિલો પોટાશ આપો.{schedule} જમીન ચકાસણી અહેવાલ મુજબ માત્રા બદલો.",
+        "ta": "{crop} பயிருக்கு ஹெக்டேருக்கு {n} கிலோ தழைச்சத்து, {p} கிலோ மணிச்சத்து, {k} கிலோ சாம்பல்சத்து இடவும்.{schedule} மண் பரிசோதனை அறிக்கைப்படி அளவை மாற்றவும்.",
+        "te": "{crop} పంటకు హెక్టారుకు {n} కిలోల నత్రజని, {p} కిలోల భాస్వరం, {k} కిలోల పొటాష్ వేయండి.{schedule} భూసార పరీక్ష ప్రకారం మోతాదు మార్చండి.",
+        "kn": "{crop} ಬೆಳೆಗೆ ಹೆಕ್ಟೇರ್‌ಗೆ {n} ಕೆಜಿ ಸಾರಜನಕ, {p} ಕೆಜಿ ರಂಜಕ ಮತ್ತು {k} ಕೆಜಿ ಪೊಟ್ಯಾಷ್ ನೀಡಿ.{schedule} ಮಣ್ಣು ಪರೀಕ್ಷೆಯ ವರದಿಯಂತೆ ಪ್ರಮಾಣ ಬದಲಿಸಿ.",
+        "ml": "{crop} കൃഷിക്ക് ഹെക്ടറിന് {n} കിലോ നൈട്രജൻ, {p} കിലോ ഫോസ്ഫറസ്, {k} കിലോ പൊട്ടാഷ് നൽകുക.{schedule} മണ്ണ് പരിശോധനാ റിപ്പോർട്ട് അനുസരിച്ച് അളവ് മാറ്റുക.",
+    },
+}
+
+# How the dose in the knowledge base is meant to be applied; dropping it changes the advice
+SCHEDULE_NOTES = {
+    "basal": {
+        "en": " This is the basal dose at sowing; it does not include later top dressing.",
+        "hi": " यह बुवाई के समय दी जाने वाली बेसल मात्रा है; इसमें बाद की टॉप ड्रेसिंग शामिल नहीं है।",
+        "mr": " ही पेरणीच्या वेळी द्यायची बेसल मात्रा आहे; नंतरचा वरखताचा हप्ता यात समाविष्ट नाही.",
+        "pa": " ਇਹ ਬਿਜਾਈ ਵੇਲੇ ਦਿੱਤੀ ਜਾਣ ਵਾਲੀ ਬੇਸਲ ਮਾਤਰਾ ਹੈ; ਇਸ ਵਿੱਚ ਬਾਅਦ ਦੀ ਟੌਪ ਡਰੈਸਿੰਗ ਸ਼ਾਮਲ ਨਹੀਂ ਹੈ।",
+        "bn": " এটি বপনের সময় দেওয়া বেসাল মাত্রা; পরে উপরি প্রয়োগের সার এর মধ্যে ধরা নেই।",
+        "gu": " આ વાવણી સમયે આપવાની બેસલ માત્રા છે; પછીનો પૂરક ખાતરનો હપ્તો તેમાં સામેલ નથી.",
+        "ta": " இது விதைப்பின் போது இடும் அடியுரம் மட்டுமே; பின்னர் இடும் மேலுரம் இதில் சேராது.",
+        "te": " ఇది విత్తే సమయంలో వేసే దుక్కి ఎరువు మోతాదు మాత్రమే; తర్వాత వేసే పై ఎరువు ఇందులో లేదు.",
+        "kn": " ಇದು ಬಿತ್ತನೆ ಸಮಯದಲ್ಲಿ ನೀಡುವ ತಳಗೊಬ್ಬರದ ಪ್ರಮಾಣ ಮಾತ್ರ; ನಂತರ ನೀಡುವ ಮೇಲುಗೊಬ್ಬರ ಇದರಲ್ಲಿ ಸೇರಿಲ್ಲ.",
+        "ml": " ഇത് വിതയ്ക്കുമ്പോൾ നൽകുന്ന അടിവളത്തിന്റെ അളവ് മാത്രമാണ്; പിന്നീട് നൽകുന്ന മേൽവളം ഇതിൽ ഉൾപ്പെടുന്നില്ല.",
+    },
+    "splits": {
+        "en": " Apply it in split doses over the season, not all at once.",
+        "hi": " इसे एक साथ न देकर फसल के दौरान कई हिस्सों में दें।",
+        "mr": " ही मात्रा एकदम न देता हंगामात विभागून द्या.",
+        "pa": " ਇਹ ਮਾਤਰਾ ਇੱਕੋ ਵਾਰ ਨਾ ਪਾ ਕੇ ਫ਼ਸਲ ਦੌਰਾਨ ਕਿਸ਼ਤਾਂ ਵਿੱਚ ਪਾਓ।",
+        "bn": " এই সার একবারে না দিয়ে মৌসুম জুড়ে কয়েক ভাগে দিন।",
+        "gu": " આ માત્રા એકસાથે ન આપતાં મોસમ દરમિયાન હપ્તામાં આપો.",
+        "ta": " இதை ஒரே தடவையில் இடாமல் பருவத்தில் பிரித்து இடவும்.",
+        "te": " దీన్ని ఒకేసారి కాకుండా పంట కాలంలో విడతలుగా వేయండి.",
+        "kn": " ಇದನ್ನು ಒಮ್ಮೆಲೇ ನೀಡದೆ ಬೆಳೆಯ ಅವಧಿಯಲ್ಲಿ ಕಂತುಗಳಲ್ಲಿ ನೀಡಿ.",
+        "ml": " ഇത് ഒറ്റത്തവണയായി നൽകാതെ സീസണിൽ പല തവണയായി നൽകുക.",
+    },
+}
+
+SCHEME_TEMPLATES = {
+    "pm_kisan": {
+        "en": "{name} gives eligible farmer families ₹{amount} a year, paid in three installments of ₹{installment} directly to the bank account. Apply at {website} or your nearest CSC centre.",
+        "hi": "{name} के तहत पात्र किसान परिवारों को हर साल ₹{amount} मिलते हैं, जो ₹{installment} की तीन किस्तों में सीधे बैंक खाते में आते हैं। आवेदन {website} पर या नजदीकी CSC केंद्र पर करें।",
+        "mr": "{name} अंतर्गत पात्र शेतकरी कुटुंबांना दरवर्षी ₹{amount} मिळतात, ते ₹{installment} च्या तीन हप्त्यांत थेट बँक खात्यात जमा होतात. अर्ज {website} वर किंवा जवळच्या CSC केंद्रात करा.",
+        "pa": "{name} ਤਹਿਤ ਯੋਗ ਕਿਸਾਨ ਪਰਿਵਾਰਾਂ ਨੂੰ ਹਰ ਸਾਲ ₹{amount} ਮਿਲਦੇ ਹਨ, ਜੋ ₹{installment} ਦੀਆਂ ਤਿੰਨ ਕਿਸ਼ਤਾਂ ਵਿੱਚ ਸਿੱਧੇ ਬੈਂਕ ਖਾਤੇ ਵਿੱਚ ਆਉਂਦੇ ਹਨ। ਅਰਜ਼ੀ {website} 'ਤੇ ਜਾਂ ਨੇੜਲੇ CSC ਕੇਂਦਰ 'ਤੇ ਦਿਓ।",
+        "bn": "{name} প্রকল্পে যোগ্য কৃষক পরিবার বছরে ₹{amount} পান, যা ₹{installment} করে তিন কিস্তিতে সরাসরি ব্যাংক অ্যাকাউন্টে আসে। আবেদন করুন {website} এ বা নিকটবর্তী CSC কেন্দ্রে।",
+        "gu": "{name} હેઠળ પાત્ર ખેડૂત પરિવારોને દર વર્ષે ₹{amount} મળે છે, જે ₹{installment} ના ત્રણ હપ્તામાં સીધા બેંક ખાતામાં જમા થાય છે. અરજી {website} પર અથવા નજીકના CSC કેન્દ્ર પર કરો.",
+        "ta": "{name} திட்டத்தில் தகுதியுள்ள விவசாய குடும்பங்களுக்கு ஆண்டுக்கு ₹{amount} வழங்கப்படுகிறது; இது ₹{installment} வீதம் மூன்று தவணைகளாக நேரடியாக வங்கிக் கணக்கில் வரவு வைக்கப்படும். {website} அல்லது அருகிலுள்ள CSC மையத்தில் விண்ணப்பிக்கவும்.",
+        "te": "{name} పథకం కింద అర్హులైన రైతు కుటుంబాలకు సంవత్సరానికి ₹{amount} అందుతుంది; ఇది ₹{installment} చొప్పున మూడు విడతలుగా నేరుగా బ్యాంకు ఖాతాలో జమ అవుతుంది. {website} లో లేదా సమీప CSC కేంద్రంలో దరఖాస్తు చేయండి.",
+        "kn": "{name} ಯೋಜನೆಯಡಿ ಅರ್ಹ ರೈತ ಕುಟುಂಬಗಳಿಗೆ ವರ್ಷಕ್ಕೆ ₹{amount} ದೊರೆಯುತ್ತದೆ; ಇದು ₹{installment} ರಂತೆ ಮೂರು ಕಂತುಗಳಲ್ಲಿ ನೇರವಾಗಿ ಬ್ಯಾಂಕ್ ಖಾತೆಗೆ ಜಮೆಯಾಗುತ್ತದೆ. {website} ನಲ್ಲಿ ಅಥವಾ ಹತ್ತಿರದ CSC ಕೇಂದ್ರದಲ್ಲಿ ಅರ್ಜಿ ಸಲ್ಲಿಸಿ.",
+        "ml": "{name} പദ്ധതി പ്രകാരം അർഹരായ കർഷക കുടുംബങ്ങൾക്ക് വർഷം ₹{amount} ലഭിക്കും; ഇത് ₹{installment} വീതം മൂന്ന് ഗഡുക്കളായി നേരിട്ട് ബാങ്ക് അക്കൗണ്ടിലെത്തും. {website} വഴിയോ അടുത്തുള്ള CSC കേന്ദ്രത്തിലോ അപേക്ഷിക്കുക.",
+    },
+    "pmfby": {
+        "en": "{name} insures notified crops for up to ₹{amount} per hectare. Farmers pay a premium of {kharif}% for Kharif and {rabi}% for Rabi crops. Enrol through your bank, CSC centre or {website}.",
+        "hi": "{name} में अधिसूचित फसलों का प्रति हेक्टेयर ₹{amount} तक बीमा होता है। किसान खरीफ के लिए {kharif}% और रबी के लिए {rabi}% प्रीमियम देते हैं। नामांकन बैंक, CSC केंद्र या {website} से करें।",
+        "mr": "{name} अंतर्गत अधिसूचित पिकांना प्रति हेक्टर ₹{amount} पर्यंत विमा संरक्षण मिळते. शेतकरी खरीपासाठी {kharif}% आणि रब्बीसाठी {rabi}% हप्ता भरतात. नोंदणी बँक, CSC केंद्र किंवा {website} वर करा.",
+        "pa": "{name} ਤਹਿਤ ਨੋਟੀਫਾਈਡ ਫ਼ਸਲਾਂ ਦਾ ਪ੍ਰਤੀ ਹੈਕਟੇਅਰ ₹{amount} ਤੱਕ ਬੀਮਾ ਹੁੰਦਾ ਹੈ। ਕਿਸਾਨ ਸਾਉਣੀ ਲਈ {kharif}% ਅਤੇ ਹਾੜ੍ਹੀ ਲਈ {rabi}% ਪ੍ਰੀਮੀਅਮ ਦਿੰਦੇ ਹਨ। ਨਾਮ ਦਰਜ ਬੈਂਕ, CSC ਕੇਂਦਰ ਜਾਂ {website} ਰਾਹੀਂ ਕਰਵਾਓ।",
+        "bn": "{name} প্রকল্পে বিজ্ঞাপিত ফসলের হেক্টর প্রতি ₹{amount} পর্যন্ত বিমা হয়। কৃষকরা খরিফে {kharif}% এবং রবিতে {rabi}% প্রিমিয়াম দেন। ব্যাংক, CSC কেন্দ্র বা {website} এর মাধ্যমে নাম নথিভুক্ত করুন।",
+        "gu": "{name} હેઠળ જાહેર કરેલા પાકોનો પ્રતિ હેક્ટર ₹{amount} સુધીનો વીમો મળે છે. ખેડૂતો ખરીફ માટે {kharif}% અને રવિ માટે {rabi}% પ્રીમિયમ ભરે છે. નોંધણી બેંક, CSC કેન્દ્ર અથવા {website} દ્વારા કરો.",
+        "ta": "{name} திட்டத்தில் அறிவிக்கப்பட்ட பயிர்களுக்கு ஹெக்டேருக்கு ₹{amount} வரை காப்பீடு கிடைக்கும். காரீஃப் பயிர்களுக்கு {kharif}%, ராபி பயிர்களுக்கு {rabi}% பிரீமியம் செலுத்த வேண்டும். வங்கி, CSC மையம் அல்லது {website} மூலம் பதிவு செய்யவும்.",
+        "te": "{name} పథకంలో నోటిఫైడ్ పంటలకు హెక్టారుకు ₹{amount} వరకు బీమా లభిస్తుంది. ఖరీఫ్ పంటలకు {kharif}%, రబీ పంటలకు {rabi}% ప్రీమియం చెల్లించాలి. బ్యాంకు, CSC కేంద్రం లేదా {website} ద్వారా నమోదు చేసుకోండి.",
+        "kn": "{name} ಯೋಜನೆಯಲ್ಲಿ ಅಧಿಸೂಚಿತ ಬೆಳೆಗಳಿಗೆ ಹೆಕ್ಟೇರ್‌ಗೆ ₹{amount} ವರೆಗೆ ವಿಮೆ ಸಿಗುತ್ತದೆ. ಖಾರಿಫ್ ಬೆಳೆಗೆ {kharif}% ಮತ್ತು ರಬಿ ಬೆಳೆಗೆ {rabi}% ಪ್ರೀಮಿಯಂ ಪಾವತಿಸಬೇಕು. ಬ್ಯಾಂಕ್, CSC ಕೇಂದ್ರ ಅಥವಾ {website} ಮೂಲಕ ನೋಂದಾಯಿಸಿ.",
+        "ml": "{name} പദ്ധതിയിൽ വിജ്ഞാപനം ചെയ്ത വിളകൾക്ക് ഹെക്ടറിന് ₹{amount} വരെ ഇൻഷുറൻസ് ലഭിക്കും. ഖരീഫ് വിളകൾക്ക് {kharif}%, റാബി വിളകൾക്ക് {rabi}% പ്രീമിയം അടയ്ക്കണം. ബാങ്ക്, CSC കേന്ദ്രം അല്ലെങ്കിൽ {website} വഴി രജിസ്റ്റർ ചെയ്യുക.",
+    },
+}
+
+_MONTH_PATTERN = re.compile(r"\b(" + "|".join(MONTHS) + r")\b", re.IGNORECASE)
+_NUTRIENT_PATTERN = re.compile(r"(\d+)\s*kg\s*([NPK])\b")
+_PREMIUM_PATTERN = re.compile(r"([\d.]+)%\s*for\s*(kharif|rabi)", re.IGNORECASE)
+
+
+def format_rupees(amount: int) -> str:
+    """Indian digit grouping: 200000 -> 2,00,000"""
+    digits = str(int(amount))
+    if len(digits) <= 3:
+        return digits
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ",".join(groups + [tail])
+
+
+def _month_range(text: str) -> Optional[Tuple[int, int]]:
+    months = [MONTHS.index(month.lower()) for month in _MONTH_PATTERN.findall(text)]
+    if not months:
+        return None
+    return months[0], months[-1]
+
+
+class TemplateAnswerEngine:
+    """Matches single-intent questions to answers rendered once at startup"""
+
+    def __init__(self, rag, schemes_db, languages: List[str]):
+        self.languages = languages
+        self._crop_pattern, self._crop_lookup = build_alias_matcher(CROP_ALIASES)
+        self._scheme_pattern, self._scheme_lookup = build_alias_matcher(SCHEME_ALIASES)
+        self._intent_patterns = {
+            intent: build_alias_matcher({intent: terms})[0] for intent, terms in INTENT_TERMS.items()
+        }
+        self._form_patterns = {
+            intent: build_alias_matcher({intent: terms})[0] for intent, terms in QUESTION_FORMS.items()
+        }
+        self._excluded_pattern, _ = build_alias_matcher({"excluded": EXCLUDED_TERMS})
+        self._scheme_status_pattern, _ = build_alias_matcher({"status": SCHEME_STATUS_TERMS})
+
+        # (intent, subject, language) -> answer text
+        self.answers: Dict[Tuple[str, str, str], str] = {}
+        self._render_crop_answers(rag.crop_specific_knowledge)
+        self._render_scheme_answers(schemes_db.schemes)
+
+        self.stats = {"checked": 0, "answered": 0, "by_intent": {}}
+
+    def _render_crop_answers(self, crop_knowledge: Dict[str, Dict[str, Any]]):
+        for crop, info in crop_knowledge.items():
+            names = CROP_NAMES.get(crop)
+            if not names:
+                continue
+
+            sow = _month_range(info.get("sowing_time", ""))
+            harvest = _month_range(info.get("harvesting_time", ""))
+            sowing_text = info.get("sowing_time", "").lower()
+            season = "rabi" if "rabi" in sowing_text else "kharif" if "kharif" in sowing_text else None
+            schedule_text = info.get("fertilizer_schedule", "")
+            nutrients = dict((nutrient, dose) for dose, nutrient in _NUTRIENT_PATTERN.findall(schedule_text))
+            schedule = ("basal" if schedule_text.lower().startswith("basal")
+                        else "splits" if "split" in schedule_text.lower() else None)
+
+            for language in self.languages:
+                months = LOCAL_MONTHS.get(language)
+                if not months:
+                    continue
+                if sow and harvest and season:
+                    self.answers[(INTENT_CROP_CALENDAR, crop, language)] = TEMPLATES[INTENT_CROP_CALENDAR][language].format(
+                        crop=names[language], season=LOCAL_SEASONS[season][language],
+                        sow=f"{months[sow[0]]}-{months[sow[1]]}", harvest=f"{months[harvest[0]]}-{months[harvest[1]]}"
+                    )
+                if {"N", "P", "K"} <= set(nutrients):
+                    self.answers[(INTENT_FERTILIZER, crop, language)] = TEMPLATES[INTENT_FERTILIZER][language].format(
+                        crop=names[language], n=nutrients["N"], p=nutrients["P"], k=nutrients["K"],
+                        schedule=SCHEDULE_NOTES[schedule][language] if schedule else ""
+                    )
+
+    def _render_scheme_answers(self, schemes: Dict[str, Dict[str, Any]]):
+        for scheme_id, templates in SCHEME_TEMPLATES.items():
+            scheme = schemes.get(scheme_id)
+            if not scheme:
+                continue
+            premiums = {season.lower(): rate for rate, season in
+                        _PREMIUM_PATTERN.findall(" ".join(scheme.get("eligibility_criteria", [])))}
+            values = {
+                "name": scheme["name"],
+                "amount": format_rupees(scheme.get("benefit_amount", 0)),
+                "installment": format_rupees(scheme.get("benefit_amount", 0) // 3),
+                "website": scheme.get("website_url", ""),
+                "kharif": premiums.get("kharif", ""),
+                "rabi": premiums.get("rabi", ""),
+            }
+            if scheme_id == "pmfby" and not (values["kharif"] and values["rabi"]):
+                continue
+            for language in self.languages:
+                if language in templates:
+                    self.answers[(INTENT_SCHEME_INFO, scheme_id, language)] = templates[language].format(**values)
+
+    def _classify(self, message: str) -> Optional[Tuple[str, str]]:
+        if len(message.split()) > MAX_TEMPLATE_WORDS or self._excluded_pattern.search(message):
+            return None
+
+        intents = [intent for intent, pattern in self._intent_patterns.items() if pattern.search(message)]
+        scheme_match = self._scheme_pattern.search(message)
+        if scheme_match:
+            # A scheme question mentioning sowing or fertilizer is compound
+            if intents or self._scheme_status_pattern.search(message) \
+                    or not self._form_patterns[INTENT_SCHEME_INFO].search(message):
+                return None
+            return INTENT_SCHEME_INFO, self._scheme_lookup[scheme_match.group(0).lower()]
+
+        crops = {self._crop_lookup[match.lower()] for match in self._crop_pattern.findall(message)}
+        if len(intents) != 1 or len(crops) != 1 or not self._form_patterns[intents[0]].search(message):
+            return None
+        return intents[0], crops.pop()
+
+    def match(self, message: str, language: str) -> Optional[Dict[str, Any]]:
+        """Template answer for the message in the given language, or None"""
+        start = time.time()
+        self.stats["checked"] += 1
+
+        classified = self._classify(message)
+        if not classified:
+            return None
+        intent, subject = classified
+        answer = self.answers.get((intent, subject, language))
+        if answer is None:
+            return None
+
+        self.stats["answered"] += 1
+        self.stats["by_intent"][intent] = self.stats["by_intent"].get(intent, 0) + 1
+        return {
+            "intent": intent,
+            "subject": subject,
+            "message": answer,
+            "duration": time.time() - start
+        }
+
+    def rejection_message(self, language: str) -> str:
+        return REJECTION_MESSAGES.get(language, REJECTION_MESSAGES["en"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        checked = self.stats["checked"]
+        return {
+            "templates": len(self.answers),
+            "checked": checked,
+            "answered": self.stats["answered"],
+            "by_intent": dict(self.stats["by_intent"]),
+            "deflection_rate": self.stats["answered"] / checked if checked else 0.0
+        }
@@ -0,0 +1,56 @@
+"""
+Chat Text Helpers
+Pure string helpers used on every chat request: response markdown cleanup,
+crop extraction for RAG lookups and response cache keys. Kept out of
+server.py so they can be imported (and benchmarked) without the app.
+"""
+
+import hashlib
+import re
+from typing import Optional
+
+# Common crops in Indian agriculture
+COMMON_CROPS = ["wheat", "rice", "cotton", "sugarcane", "maize", "bajra", "jowar",
+                "barley", "gram", "peas", "mustard", "groundnut", "soybean",
+                "tomato", "potato", "onion"]
+
+
+def clean_markdown(text: str) -> str:
+    """Remove markdown formatting from text"""
+    # Remove bold/italic formatting
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # **bold**
+    text = re.sub(r'\*(.*?)\*', r'\1', text)      # *italic*
+    text = re.sub(r'__(.*?)__', r'\1', text)      # __bold__
+    text = re.sub(r'_(.*?)_', r'\1', text)        # _italic_
+
+    # Remove headers
+    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+
+    # Remove bullet points and numbered lists
+    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+
+    # Remove code blocks
+    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
+    text = re.sub(r'`(.*?)`', r'\1', text)
+
+    # Clean up extra whitespace
+    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)  # Multiple newlines to double
+    return text.strip()
+
+
+def extract_crop_from_message(message: str) -> Optional[str]:
+    """Extract crop name from user message for RAG enhancement"""
+    message_lower = message.lower()
+    for crop in COMMON_CROPS:
+        if crop in message_lower:
+            return crop
+    return None
+
+
+def create_cache_key(user_id: str, message: str, language: str = "en") -> str:
+    """Create a cache key for responses"""
+    # Normalize message for caching
+    normalized = message.lower().strip()
+    key_data = f"{user_id}:{normalized}:{language}"
+    return f"response:{hashlib.md5(key_data.encode()).hexdigest()}"
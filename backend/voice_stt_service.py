@@ -6,7 +6,7 @@ This service handles audio transcription for the agricultural chatbot.
 import os
 import logging
 from typing import Dict, Any
-from deepgram import DeepgramClient, PrerecordedOptions
+from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
 import httpx
 
 logger = logging.getLogger(__name__)
@@ -27,7 +27,10 @@ class VoiceSTTService:
             logger.warning("Deepgram API key not configured")
             self.client = None
         else:
-            self.client = DeepgramClient(api_key=self.api_key)
+            # DEEPGRAM_BASE_URL points the client at another endpoint, e.g. a local load-test stub
+            base_url = os.environ.get('DEEPGRAM_BASE_URL')
+            config = DeepgramClientOptions(url=base_url) if base_url else None
+            self.client = DeepgramClient(api_key=self.api_key, config=config)
             logger.info("Deepgram STT service initialized with Nova-2")
     
     async def transcribe_audio(
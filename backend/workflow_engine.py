@@ -1,14 +1,53 @@
 # Agricultural Workflow Engine
 # Manages pre-built agricultural scenarios and step-by-step guidance
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import os
+import uuid
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
 from datetime import datetime, timezone
 from enum import Enum
 import json
 
+from cachetools import TTLCache
+
+from shared_state import SharedStateBackend, InMemoryStateBackend
+
 logger = logging.getLogger(__name__)
 
+INSTANCES_NAMESPACE = "workflow_instances"
+# Shared instance state expires after a week without progress
+INSTANCE_STATE_TTL = 7 * 24 * 3600
+# With a shared backend a running instance is leased to one worker; the lease is renewed every third of this
+INSTANCE_LEASE_TTL = int(os.environ.get("WORKFLOW_LEASE_SECONDS", "120"))
+
+# Live instances kept in memory; anything evicted is rehydrated from db.workflow_instances
+INSTANCE_CACHE_SIZE = 1000
+INSTANCE_CACHE_TTL = 3600
+
+# Step results larger than this (JSON bytes) go to db.workflow_step_results instead of the instance document
+INLINE_RESULT_LIMIT = int(os.environ.get("WORKFLOW_INLINE_RESULT_LIMIT", "16384"))
+# Persist a run_to_completion run once at the end instead of after every wave
+BATCH_FLUSH = os.environ.get("WORKFLOW_BATCH_FLUSH", "false").lower() == "true"
+
+WORKFLOW_BUSY_ERROR = "Workflow is already running"
+
+# Key each tool's output is stored under in a step's results
+TOOL_RESULT_KEYS = {
+    "soil-health": "soil_analysis",
+    "weather": "weather_forecast",
+    "crop-price": "crop_prices",
+    "mandi-price": "mandi_analysis",
+    "pest-identifier": "pest_analysis",
+    "search": "research_data"
+}
+# Tools whose answers go stale within days, re-run by refresh_time_sensitive_steps,
+# with the input a refresh needs (without it the call would be a generic national one)
+TIME_SENSITIVE_TOOLS = {"weather": "location", "crop-price": "commodity", "mandi-price": "commodity"}
+# Step inputs kept on the instance so scheduled refreshes can repeat the calls
+REFRESH_INPUT_KEYS = ("location", "forecast_days", "state", "district", "commodity")
+
 class WorkflowStatus(Enum):
     NOT_STARTED = "not_started"
     IN_PROGRESS = "in_progress"
@@ -23,8 +62,29 @@ class StepStatus(Enum):
     SKIPPED = "skipped"
     FAILED = "failed"
 
-class WorkflowStep:
-    """Individual step in an agricultural workflow"""
+class _Timestamp:
+    """datetime attribute kept as an epoch float in the slot of the same name with a leading underscore"""
+    
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+    
+    def __set__(self, instance, value):
+        if isinstance(value, datetime):
+            # Mongo hands back naive datetimes, which are UTC
+            value = (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+        setattr(instance, self.slot, value)
+
+class StepTemplate:
+    """Immutable definition of a workflow step, shared by every instance"""
+    
+    __slots__ = ("step_id", "title", "description", "tools_required", "estimated_time", "prerequisites", "optional",
+                 "_serialized")
     
     def __init__(self, step_id: str, title: str, description: str, 
                  tools_required: List[str] = None, estimated_time: int = 5,
@@ -32,36 +92,148 @@ class WorkflowStep:
         self.step_id = step_id
         self.title = title
         self.description = description
-        self.tools_required = tools_required or []
+        self.tools_required = tuple(tools_required or ())
         self.estimated_time = estimated_time  # minutes
-        self.prerequisites = prerequisites or []
+        self.prerequisites = tuple(prerequisites or ())
         self.optional = optional
-        self.status = StepStatus.PENDING
-        self.result_data = {}
-        self.started_at = None
-        self.completed_at = None
-        self.notes = ""
+        self._serialized: Dict[StepStatus, Dict[str, Any]] = {}
+    
+    def serialize(self, status: StepStatus) -> Dict[str, Any]:
+        """API form of this step in the given status, shared across instances (do not mutate)"""
+        serialized = self._serialized.get(status)
+        if serialized is None:
+            serialized = self._serialized[status] = {
+                "step_id": self.step_id,
+                "title": self.title,
+                "description": self.description,
+                "status": status.value,
+                "tools_required": self.tools_required,
+                "estimated_time": self.estimated_time,
+                "optional": self.optional,
+                "prerequisites": self.prerequisites
+            }
+        return serialized
 
-class AgriculturalWorkflow:
-    """Complete agricultural workflow with multiple steps"""
+class WorkflowTemplate:
+    """Immutable definition of an agricultural workflow, shared by every instance"""
+    
+    __slots__ = ("workflow_id", "title", "description", "category", "difficulty", "steps", "estimated_total_time")
     
     def __init__(self, workflow_id: str, title: str, description: str, 
-                 category: str, difficulty: str = "beginner"):
+                 category: str, difficulty: str = "beginner", steps: List[StepTemplate] = ()):
         self.workflow_id = workflow_id
         self.title = title
         self.description = description
         self.category = category  # crop_selection, pest_management, irrigation, harvest_timing
         self.difficulty = difficulty  # beginner, intermediate, advanced
-        self.steps: List[WorkflowStep] = []
-        self.status = WorkflowStatus.NOT_STARTED
+        self.steps = tuple(steps)
+        self.estimated_total_time = sum(step.estimated_time for step in self.steps)
+
+class WorkflowStep:
+    """Per-instance state of one step; the definition lives in its shared template"""
+    
+    __slots__ = ("template", "workflow", "_status", "result_data", "_started_at", "_completed_at", "notes")
+    
+    started_at = _Timestamp()
+    completed_at = _Timestamp()
+    
+    def __init__(self, template: StepTemplate, workflow: "AgriculturalWorkflow"):
+        self.template = template
+        self.workflow = workflow
+        self._status = StepStatus.PENDING
+        self.result_data = None  # Tool results, once the step has run
+        self._started_at = None
+        self._completed_at = None
+        self.notes = ""
+    
+    @property
+    def status(self) -> StepStatus:
+        return self._status
+    
+    @status.setter
+    def status(self, value: StepStatus):
+        self._status = value
+        self.workflow.step_changed(self)
+    
+    step_id = property(lambda self: self.template.step_id)
+    title = property(lambda self: self.template.title)
+    description = property(lambda self: self.template.description)
+    tools_required = property(lambda self: self.template.tools_required)
+    estimated_time = property(lambda self: self.template.estimated_time)
+    prerequisites = property(lambda self: self.template.prerequisites)
+    optional = property(lambda self: self.template.optional)
+
+class AgriculturalWorkflow:
+    """A user's instance of a workflow template
+    
+    Only mutable state is stored per instance. The API serialization is cached
+    and dropped whenever a status or the progress changes; steps whose status
+    changed are tracked until the next save.
+    """
+    
+    __slots__ = ("template", "steps", "_status", "user_id", "current_step_index", "_progress_percentage",
+                 "actual_time_spent", "_created_at", "_started_at", "_completed_at", "_serialized",
+                 "_dirty_steps", "inputs")
+    
+    created_at = _Timestamp()
+    started_at = _Timestamp()
+    completed_at = _Timestamp()
+    
+    def __init__(self, template: WorkflowTemplate, user_id: Optional[str] = None):
+        self.template = template
+        self._serialized = None
+        self._dirty_steps = None
+        self.steps: List[WorkflowStep] = [WorkflowStep(step, self) for step in template.steps]
+        self._status = WorkflowStatus.NOT_STARTED
         self.current_step_index = 0
         self.created_at = datetime.now(timezone.utc)
-        self.started_at = None
-        self.completed_at = None
-        self.user_id = None
-        self.progress_percentage = 0
-        self.estimated_total_time = 0
+        self._started_at = None
+        self._completed_at = None
+        self.user_id = user_id
+        self._progress_percentage = 0
         self.actual_time_spent = 0
+        self.inputs: Optional[Dict[str, Any]] = None  # Location/commodity the steps were run with
+    
+    def invalidate(self):
+        self._serialized = None
+    
+    def step_changed(self, step: WorkflowStep):
+        self._serialized = None
+        if self._dirty_steps is None:
+            self._dirty_steps = set()
+        self._dirty_steps.add(step)
+    
+    def take_dirty_steps(self) -> List[Tuple[int, WorkflowStep]]:
+        """(index, step) of every step changed since the last call"""
+        dirty, self._dirty_steps = self._dirty_steps, None
+        if not dirty:
+            return []
+        return [(index, step) for index, step in enumerate(self.steps) if step in dirty]
+    
+    @property
+    def status(self) -> WorkflowStatus:
+        return self._status
+    
+    @status.setter
+    def status(self, value: WorkflowStatus):
+        self._status = value
+        self._serialized = None
+    
+    @property
+    def progress_percentage(self) -> int:
+        return self._progress_percentage
+    
+    @progress_percentage.setter
+    def progress_percentage(self, value: int):
+        self._progress_percentage = value
+        self._serialized = None
+    
+    workflow_id = property(lambda self: self.template.workflow_id)
+    title = property(lambda self: self.template.title)
+    description = property(lambda self: self.template.description)
+    category = property(lambda self: self.template.category)
+    difficulty = property(lambda self: self.template.difficulty)
+    estimated_total_time = property(lambda self: self.template.estimated_total_time)
 
 class WorkflowEngine:
     """
@@ -69,12 +241,29 @@ class WorkflowEngine:
     Provides step-by-step guidance for complex agricultural processes
     """
     
-    def __init__(self, db, mcp_client, voice_interface=None):
+    def __init__(self, db, mcp_client, voice_interface=None, state: Optional[SharedStateBackend] = None,
+                 cache_size: int = INSTANCE_CACHE_SIZE, cache_ttl: int = INSTANCE_CACHE_TTL,
+                 inline_result_limit: int = INLINE_RESULT_LIMIT, batch_flush: bool = BATCH_FLUSH):
         self.db = db
         self.mcp_client = mcp_client
         self.voice_interface = voice_interface
         self.workflows = {}
-        self.user_workflow_instances = {}
+        # LRU + idle TTL bounded; every change is persisted, so eviction loses nothing
+        self.user_workflow_instances = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._hydrating: Dict[str, asyncio.Task] = {}
+        # Instances with a run or step executing in this process; a second one is rejected.
+        # With a shared backend the claim is also a lease there, so other workers reject it too
+        self._active_instances: Set[str] = set()
+        self._lease_renewals: Dict[str, asyncio.Task] = {}
+        self.lease_owner = uuid.uuid4().hex
+        # With a shared backend, instance state is published there after every change
+        # and re-read before each step, so any worker can continue a workflow
+        self.state = state or InMemoryStateBackend()
+        # After the initial insert, progress is saved as $set deltas of the changed steps
+        self.inline_result_limit = inline_result_limit
+        self.batch_flush = batch_flush
+        self._indexes_ready = False
+        self.persistence_stats = {"full_writes": 0, "delta_writes": 0, "external_results": 0, "write_errors": 0}
         
         # Initialize pre-built workflows
         self._initialize_workflows()
@@ -83,199 +272,195 @@ class WorkflowEngine:
         """Initialize pre-built agricultural workflows"""
         
         # 1. Crop Selection Workflow
-        crop_selection = AgriculturalWorkflow(
+        crop_selection = WorkflowTemplate(
             "crop_selection",
             "Smart Crop Selection Guide",
             "Complete guide to select the best crops based on soil, weather, and market conditions",
             "crop_selection",
-            "beginner"
+            "beginner",
+            steps=[
+                StepTemplate(
+                    "soil_analysis",
+                    "Analyze Soil Conditions",
+                    "Test and analyze your soil's NPK levels, pH, and organic content",
+                    tools_required=["soil-health"],
+                    estimated_time=10
+                ),
+                StepTemplate(
+                    "weather_check",
+                    "Check Weather Forecast",
+                    "Review 7-day weather forecast and seasonal patterns",
+                    tools_required=["weather"],
+                    estimated_time=5
+                ),
+                StepTemplate(
+                    "market_research",
+                    "Research Market Prices",
+                    "Check current and predicted prices for potential crops",
+                    tools_required=["crop-price", "mandi-price"],
+                    estimated_time=15
+                ),
+                StepTemplate(
+                    "crop_recommendation",
+                    "Get Crop Recommendations",
+                    "Analyze all data to recommend the best crops for your conditions",
+                    tools_required=["search"],
+                    estimated_time=10,
+                    prerequisites=["soil_analysis", "weather_check", "market_research"]
+                ),
+                StepTemplate(
+                    "financial_planning",
+                    "Plan Investment and Returns",
+                    "Calculate expected costs, yields, and profits",
+                    estimated_time=15,
+                    prerequisites=["crop_recommendation"]
+                )
+            ]
         )
         
-        crop_selection.steps = [
-            WorkflowStep(
-                "soil_analysis",
-                "Analyze Soil Conditions",
-                "Test and analyze your soil's NPK levels, pH, and organic content",
-                tools_required=["soil-health"],
-                estimated_time=10
-            ),
-            WorkflowStep(
-                "weather_check",
-                "Check Weather Forecast",
-                "Review 7-day weather forecast and seasonal patterns",
-                tools_required=["weather"],
-                estimated_time=5
-            ),
-            WorkflowStep(
-                "market_research",
-                "Research Market Prices",
-                "Check current and predicted prices for potential crops",
-                tools_required=["crop-price", "mandi-price"],
-                estimated_time=15
-            ),
-            WorkflowStep(
-                "crop_recommendation",
-                "Get Crop Recommendations",
-                "Analyze all data to recommend the best crops for your conditions",
-                tools_required=["search"],
-                estimated_time=10,
-                prerequisites=["soil_analysis", "weather_check", "market_research"]
-            ),
-            WorkflowStep(
-                "financial_planning",
-                "Plan Investment and Returns",
-                "Calculate expected costs, yields, and profits",
-                estimated_time=15,
-                prerequisites=["crop_recommendation"]
-            )
-        ]
-        
         # 2. Pest Management Workflow
-        pest_management = AgriculturalWorkflow(
+        pest_management = WorkflowTemplate(
             "pest_management",
             "Integrated Pest Management",
             "Comprehensive pest identification and treatment workflow",
             "pest_management",
-            "intermediate"
+            "intermediate",
+            steps=[
+                StepTemplate(
+                    "pest_identification",
+                    "Identify Pest or Disease",
+                    "Upload images and describe symptoms to identify the problem",
+                    tools_required=["pest-identifier"],
+                    estimated_time=10
+                ),
+                StepTemplate(
+                    "weather_correlation",
+                    "Check Weather Impact",
+                    "Analyze how weather conditions affect pest development",
+                    tools_required=["weather"],
+                    estimated_time=5,
+                    prerequisites=["pest_identification"]
+                ),
+                StepTemplate(
+                    "treatment_options",
+                    "Explore Treatment Options",
+                    "Research organic and chemical treatment methods",
+                    tools_required=["search"],
+                    estimated_time=15,
+                    prerequisites=["pest_identification"]
+                ),
+                StepTemplate(
+                    "cost_analysis",
+                    "Analyze Treatment Costs",
+                    "Compare costs of different treatment approaches",
+                    tools_required=["mandi-price"],
+                    estimated_time=10,
+                    prerequisites=["treatment_options"]
+                ),
+                StepTemplate(
+                    "implementation_plan",
+                    "Create Implementation Plan",
+                    "Develop timeline and application schedule for treatment",
+                    estimated_time=20,
+                    prerequisites=["weather_correlation", "cost_analysis"]
+                )
+            ]
         )
         
-        pest_management.steps = [
-            WorkflowStep(
-                "pest_identification",
-                "Identify Pest or Disease",
-                "Upload images and describe symptoms to identify the problem",
-                tools_required=["pest-identifier"],
-                estimated_time=10
-            ),
-            WorkflowStep(
-                "weather_correlation",
-                "Check Weather Impact",
-                "Analyze how weather conditions affect pest development",
-                tools_required=["weather"],
-                estimated_time=5,
-                prerequisites=["pest_identification"]
-            ),
-            WorkflowStep(
-                "treatment_options",
-                "Explore Treatment Options",
-                "Research organic and chemical treatment methods",
-                tools_required=["search"],
-                estimated_time=15,
-                prerequisites=["pest_identification"]
-            ),
-            WorkflowStep(
-                "cost_analysis",
-                "Analyze Treatment Costs",
-                "Compare costs of different treatment approaches",
-                tools_required=["mandi-price"],
-                estimated_time=10,
-                prerequisites=["treatment_options"]
-            ),
-            WorkflowStep(
-                "implementation_plan",
-                "Create Implementation Plan",
-                "Develop timeline and application schedule for treatment",
-                estimated_time=20,
-                prerequisites=["weather_correlation", "cost_analysis"]
-            )
-        ]
-        
         # 3. Irrigation Planning Workflow
-        irrigation_planning = AgriculturalWorkflow(
+        irrigation_planning = WorkflowTemplate(
             "irrigation_planning",
             "Smart Irrigation Planning",
             "Optimize water usage based on soil, weather, and crop requirements",
             "irrigation",
-            "intermediate"
+            "intermediate",
+            steps=[
+                StepTemplate(
+                    "soil_moisture_check",
+                    "Check Soil Moisture Levels",
+                    "Assess current soil moisture and water retention capacity",
+                    tools_required=["soil-health"],
+                    estimated_time=10
+                ),
+                StepTemplate(
+                    "weather_forecast",
+                    "Review Weather Forecast",
+                    "Check rainfall predictions and temperature patterns",
+                    tools_required=["weather"],
+                    estimated_time=5
+                ),
+                StepTemplate(
+                    "crop_water_needs",
+                    "Determine Crop Water Requirements",
+                    "Calculate water needs based on crop type and growth stage",
+                    tools_required=["search"],
+                    estimated_time=15,
+                    prerequisites=["soil_moisture_check"]
+                ),
+                StepTemplate(
+                    "irrigation_schedule",
+                    "Create Irrigation Schedule",
+                    "Develop optimal watering schedule based on all factors",
+                    estimated_time=15,
+                    prerequisites=["weather_forecast", "crop_water_needs"]
+                ),
+                StepTemplate(
+                    "water_conservation",
+                    "Plan Water Conservation",
+                    "Implement water-saving techniques and monitoring",
+                    estimated_time=10,
+                    prerequisites=["irrigation_schedule"],
+                    optional=True
+                )
+            ]
         )
         
-        irrigation_planning.steps = [
-            WorkflowStep(
-                "soil_moisture_check",
-                "Check Soil Moisture Levels",
-                "Assess current soil moisture and water retention capacity",
-                tools_required=["soil-health"],
-                estimated_time=10
-            ),
-            WorkflowStep(
-                "weather_forecast",
-                "Review Weather Forecast",
-                "Check rainfall predictions and temperature patterns",
-                tools_required=["weather"],
-                estimated_time=5
-            ),
-            WorkflowStep(
-                "crop_water_needs",
-                "Determine Crop Water Requirements",
-                "Calculate water needs based on crop type and growth stage",
-                tools_required=["search"],
-                estimated_time=15,
-                prerequisites=["soil_moisture_check"]
-            ),
-            WorkflowStep(
-                "irrigation_schedule",
-                "Create Irrigation Schedule",
-                "Develop optimal watering schedule based on all factors",
-                estimated_time=15,
-                prerequisites=["weather_forecast", "crop_water_needs"]
-            ),
-            WorkflowStep(
-                "water_conservation",
-                "Plan Water Conservation",
-                "Implement water-saving techniques and monitoring",
-                estimated_time=10,
-                prerequisites=["irrigation_schedule"],
-                optional=True
-            )
-        ]
-        
         # 4. Harvest Timing Workflow
-        harvest_timing = AgriculturalWorkflow(
+        harvest_timing = WorkflowTemplate(
             "harvest_timing",
             "Optimal Harvest Timing",
             "Determine the best time to harvest for maximum yield and profit",
             "harvest_timing",
-            "advanced"
+            "advanced",
+            steps=[
+                StepTemplate(
+                    "crop_maturity_check",
+                    "Assess Crop Maturity",
+                    "Evaluate crop maturity indicators and readiness",
+                    estimated_time=15
+                ),
+                StepTemplate(
+                    "weather_window",
+                    "Find Weather Window",
+                    "Identify optimal weather conditions for harvesting",
+                    tools_required=["weather"],
+                    estimated_time=10
+                ),
+                StepTemplate(
+                    "market_timing",
+                    "Analyze Market Timing",
+                    "Check current prices and predict optimal selling time",
+                    tools_required=["crop-price", "mandi-price"],
+                    estimated_time=20
+                ),
+                StepTemplate(
+                    "logistics_planning",
+                    "Plan Harvest Logistics",
+                    "Organize labor, equipment, and transportation",
+                    estimated_time=25,
+                    prerequisites=["crop_maturity_check", "weather_window"]
+                ),
+                StepTemplate(
+                    "quality_optimization",
+                    "Optimize Harvest Quality",
+                    "Implement best practices for maximum quality and storage life",
+                    estimated_time=15,
+                    prerequisites=["logistics_planning"],
+                    optional=True
+                )
+            ]
         )
         
-        harvest_timing.steps = [
-            WorkflowStep(
-                "crop_maturity_check",
-                "Assess Crop Maturity",
-                "Evaluate crop maturity indicators and readiness",
-                estimated_time=15
-            ),
-            WorkflowStep(
-                "weather_window",
-                "Find Weather Window",
-                "Identify optimal weather conditions for harvesting",
-                tools_required=["weather"],
-                estimated_time=10
-            ),
-            WorkflowStep(
-                "market_timing",
-                "Analyze Market Timing",
-                "Check current prices and predict optimal selling time",
-                tools_required=["crop-price", "mandi-price"],
-                estimated_time=20
-            ),
-            WorkflowStep(
-                "logistics_planning",
-                "Plan Harvest Logistics",
-                "Organize labor, equipment, and transportation",
-                estimated_time=25,
-                prerequisites=["crop_maturity_check", "weather_window"]
-            ),
-            WorkflowStep(
-                "quality_optimization",
-                "Optimize Harvest Quality",
-                "Implement best practices for maximum quality and storage life",
-                estimated_time=15,
-                prerequisites=["logistics_planning"],
-                optional=True
-            )
-        ]
-        
         # Store workflows
         self.workflows = {
             "crop_selection": crop_selection,
@@ -283,10 +468,6 @@ class WorkflowEngine:
             "irrigation_planning": irrigation_planning,
             "harvest_timing": harvest_timing
         }
-        
-        # Calculate estimated times
-        for workflow in self.workflows.values():
-            workflow.estimated_total_time = sum(step.estimated_time for step in workflow.steps)
     
     async def start_workflow(self, workflow_id: str, user_id: str, 
                            initial_data: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -295,35 +476,15 @@ class WorkflowEngine:
         if workflow_id not in self.workflows:
             return {"success": False, "error": f"Workflow '{workflow_id}' not found"}
         
-        # Create workflow instance
-        workflow_instance = AgriculturalWorkflow(
-            workflow_id,
-            self.workflows[workflow_id].title,
-            self.workflows[workflow_id].description,
-            self.workflows[workflow_id].category,
-            self.workflows[workflow_id].difficulty
-        )
-        
-        # Copy steps from template
-        workflow_instance.steps = [
-            WorkflowStep(
-                step.step_id,
-                step.title,
-                step.description,
-                step.tools_required.copy(),
-                step.estimated_time,
-                step.prerequisites.copy(),
-                step.optional
-            ) for step in self.workflows[workflow_id].steps
-        ]
-        
-        workflow_instance.user_id = user_id
+        # Create workflow instance; step definitions are shared with the template
+        workflow_instance = AgriculturalWorkflow(self.workflows[workflow_id], user_id)
         workflow_instance.status = WorkflowStatus.IN_PROGRESS
         workflow_instance.started_at = datetime.now(timezone.utc)
         
         # Store instance
         instance_key = f"{user_id}_{workflow_id}_{int(datetime.now().timestamp())}"
         self.user_workflow_instances[instance_key] = workflow_instance
+        await self._publish_instance(instance_key, workflow_instance)
         
         # Save to database
         await self._save_workflow_instance(instance_key, workflow_instance)
@@ -339,10 +500,19 @@ class WorkflowEngine:
                                   step_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute a specific step in a workflow"""
         
-        if instance_id not in self.user_workflow_instances:
+        if not await self._claim_instance(instance_id):
+            return {"success": False, "error": WORKFLOW_BUSY_ERROR}
+        try:
+            return await self._execute_workflow_step(instance_id, step_id, step_data)
+        finally:
+            await self._release_instance(instance_id)
+    
+    async def _execute_workflow_step(self, instance_id: str, step_id: str,
+                                     step_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        workflow = await self.get_workflow_instance(instance_id)
+        if not workflow:
             return {"success": False, "error": "Workflow instance not found"}
         
-        workflow = self.user_workflow_instances[instance_id]
         step = self._find_step(workflow, step_id)
         
         if not step:
@@ -356,102 +526,386 @@ class WorkflowEngine:
                 "error": f"Prerequisites not met: {', '.join(missing)}"
             }
         
-        # Mark step as in progress
-        step.status = StepStatus.IN_PROGRESS
-        step.started_at = datetime.now(timezone.utc)
+        if not await self._run_step(step, step_data or {}):
+            await self._publish_instance(instance_id, workflow)
+            await self._save_workflow_progress(instance_id, workflow)
+            return {
+                "success": False,
+                "error": step.notes,
+                "step_status": step.status.value
+            }
         
+        # Update workflow progress
+        self._update_workflow_progress(workflow)
+        await self._publish_instance(instance_id, workflow)
+        
+        # Save the step and progress to database
+        await self._save_workflow_progress(instance_id, workflow)
+        
+        return {
+            "success": True,
+            "step_result": step.result_data,
+            "workflow_progress": workflow.progress_percentage,
+            "next_step": self._get_next_step(workflow),
+            "workflow_status": workflow.status.value
+        }
+    
+    async def run_to_completion(self, instance_id: str,
+                                step_data: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run every remaining step, yielding progress events
+        
+        Steps run in waves: each wave is every pending step whose prerequisites
+        are complete, executed concurrently. The instance is checkpointed once
+        per wave (only at the end with batch_flush). Steps that depend on a
+        failed step are left pending. While it runs, another run or step of the
+        same instance is rejected.
+        """
+        if not await self._claim_instance(instance_id):
+            yield {"event": "error", "error": WORKFLOW_BUSY_ERROR}
+            return
         try:
-            # Execute step based on required tools
-            step_result = await self._execute_step_tools(step, step_data or {})
+            workflow = await self.get_workflow_instance(instance_id)
+            if not workflow:
+                yield {"event": "error", "error": "Workflow instance not found"}
+                return
             
-            # Mark step as completed
-            step.status = StepStatus.COMPLETED
-            step.completed_at = datetime.now(timezone.utc)
-            step.result_data = step_result
+            step_data = step_data or {}
+            wave = 0
+            yield {"event": "started", "instance_id": instance_id, "workflow_progress": workflow.progress_percentage}
             
-            # Update workflow progress
-            self._update_workflow_progress(workflow)
-            
-            # Save to database
-            await self._save_workflow_instance(instance_id, workflow)
+            try:
+                while True:
+                    ready = self._ready_steps(workflow)
+                    if not ready:
+                        break
+                    wave += 1
+                    yield {"event": "wave_started", "wave": wave, "steps": [step.step_id for step in ready]}
+                
+                    tasks = [asyncio.create_task(self._run_step(step, step_data, event=True)) for step in ready]
+                    try:
+                        for finished in asyncio.as_completed(tasks):
+                            yield await finished
+                    finally:
+                        # Client went away mid-wave: stop the remaining steps (they revert to pending)
+                        for task in tasks:
+                            task.cancel()
+                
+                    self._update_workflow_progress(workflow)
+                    await self._publish_instance(instance_id, workflow)
+                    if not self.batch_flush:
+                        await self._save_workflow_progress(instance_id, workflow)
+                    yield {"event": "wave_completed", "wave": wave, "workflow_progress": workflow.progress_percentage}
+            finally:
+                if self.batch_flush and wave:
+                    # Shielded so the flush completes even when the stream is cancelled
+                    await asyncio.shield(self._save_workflow_progress(instance_id, workflow))
             
-            return {
-                "success": True,
-                "step_result": step_result,
+            yield {
+                "event": "finished",
+                "waves": wave,
+                "workflow_status": workflow.status.value,
                 "workflow_progress": workflow.progress_percentage,
-                "next_step": self._get_next_step(workflow),
-                "workflow_status": workflow.status.value
+                "failed_steps": [step.step_id for step in workflow.steps if step.status == StepStatus.FAILED],
+                "blocked_steps": [step.step_id for step in workflow.steps if step.status == StepStatus.PENDING]
             }
-            
+        finally:
+            await self._release_instance(instance_id)
+    
+    def is_instance_active(self, instance_id: str) -> bool:
+        """Whether a run or step of this instance is executing in this process"""
+        return instance_id in self._active_instances
+    
+    async def _claim_instance(self, instance_id: str) -> bool:
+        # No await between the check and the add, so two coroutines here cannot both claim
+        if instance_id in self._active_instances:
+            return False
+        self._active_instances.add(instance_id)
+        if not self.state.shared:
+            return True
+        try:
+            claimed = await self.state.acquire_lease(f"workflow:{instance_id}", self.lease_owner, INSTANCE_LEASE_TTL)
+        except Exception as e:
+            logger.warning(f"Could not lease workflow instance {instance_id}, running unguarded: {e}")
+            claimed = True
+        if not claimed:
+            self._active_instances.discard(instance_id)
+            return False
+        self._lease_renewals[instance_id] = asyncio.create_task(self._renew_instance_lease(instance_id))
+        return True
+    
+    async def _renew_instance_lease(self, instance_id: str):
+        while True:
+            await asyncio.sleep(INSTANCE_LEASE_TTL / 3)
+            try:
+                if not await self.state.acquire_lease(f"workflow:{instance_id}", self.lease_owner, INSTANCE_LEASE_TTL):
+                    logger.warning(f"Lease on workflow instance {instance_id} was lost")
+            except Exception as e:
+                logger.warning(f"Could not renew lease on workflow instance {instance_id}: {e}")
+    
+    async def _release_instance(self, instance_id: str):
+        renewal = self._lease_renewals.pop(instance_id, None)
+        if renewal:
+            renewal.cancel()
+            try:
+                await self.state.release_lease(f"workflow:{instance_id}", self.lease_owner)
+            except Exception as e:
+                logger.warning(f"Could not release lease on workflow instance {instance_id}: {e}")
+        self._active_instances.discard(instance_id)
+    
+    def _ready_steps(self, workflow: AgriculturalWorkflow) -> List[WorkflowStep]:
+        """Pending steps whose prerequisites are all completed"""
+        return [
+            step for step in workflow.steps
+            if step.status == StepStatus.PENDING and self._check_prerequisites(workflow, step)
+        ]
+    
+    async def _run_step(self, step: WorkflowStep, step_data: Dict[str, Any], event: bool = False):
+        """Execute one step and record its outcome on the step
+        
+        Returns whether it succeeded, or a step event when event is set.
+        """
+        step.status = StepStatus.IN_PROGRESS
+        step.started_at = datetime.now(timezone.utc)
+        inputs = {key: step_data[key] for key in REFRESH_INPUT_KEYS if step_data.get(key)}
+        if inputs:
+            step.workflow.inputs = dict(step.workflow.inputs or {}, **inputs)
+        
+        try:
+            # Execute step based on required tools
+            step.result_data = await self._execute_step_tools(step, step_data)
+            step.status = StepStatus.COMPLETED
+            step.completed_at = datetime.now(timezone.utc)
+        except asyncio.CancelledError:
+            step.status = StepStatus.PENDING
+            step.started_at = None
+            raise
         except Exception as e:
             step.status = StepStatus.FAILED
             step.notes = str(e)
             logger.error(f"Workflow step execution failed: {e}")
-            
+        
+        succeeded = step.status == StepStatus.COMPLETED
+        if not event:
+            return succeeded
+        if succeeded:
+            return {"event": "step_completed", "step_id": step.step_id, "step_result": step.result_data}
+        return {"event": "step_failed", "step_id": step.step_id, "error": step.notes}
+    
+    async def _execute_step_tools(self, step: WorkflowStep, step_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the tools required for a workflow step, concurrently"""
+        
+        outcomes = await asyncio.gather(
+            *(self._execute_tool(tool, step, step_data) for tool in step.tools_required)
+        )
+        return dict(outcome for outcome in outcomes if outcome)
+    
+    async def _execute_tool(self, tool: str, step: WorkflowStep,
+                            step_data: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+        """Run one tool; returns the (result key, result) pair for the step's results"""
+        if tool not in TOOL_RESULT_KEYS:
+            return None
+        try:
+            result = await self._call_tool(tool, self._tool_params(tool, step, step_data))
+            return TOOL_RESULT_KEYS[tool], result
+        except Exception as e:
+            logger.error(f"Tool execution failed for {tool}: {e}")
+            return f"{tool}_error", str(e)
+    
+    def _tool_params(self, tool: str, step: WorkflowStep, step_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments for a tool, taken from the step input"""
+        if tool == "weather":
             return {
-                "success": False,
-                "error": str(e),
-                "step_status": step.status.value
+                "location": step_data.get("location", "India"),
+                "days": step_data.get("forecast_days", 7),
+                "include_farming_alerts": True
             }
+        elif tool == "crop-price":
+            return {
+                "state": step_data.get("state"),
+                "commodity": step_data.get("commodity"),
+                "district": step_data.get("district")
+            }
+        elif tool == "mandi-price":
+            return {
+                "commodity": step_data.get("commodity"),
+                "state": step_data.get("state"),
+                "district": step_data.get("district"),
+                "include_predictions": True
+            }
+        elif tool == "pest-identifier":
+            return {
+                "crop": step_data.get("crop"),
+                "symptoms": step_data.get("symptoms", ""),
+                "location": step_data.get("location")
+            }
+        elif tool == "search":
+            return {"query": step_data.get("search_query", f"agricultural advice {step.title}")}
+        return step_data
     
-    async def _execute_step_tools(self, step: WorkflowStep, step_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute the tools required for a workflow step"""
+    async def _call_tool(self, tool: str, params: Dict[str, Any]) -> Any:
+        if tool == "crop-price":
+            return await self.mcp_client.get_crop_price(**params)
+        if tool == "search":
+            return await self.mcp_client.search_web(params["query"])
+        return await self.mcp_client.call_tool(tool, params)
+    
+    async def refresh_time_sensitive_steps(self, batch_size: int = 200, concurrency: int = 8) -> Dict[str, Any]:
+        """Re-run the weather and price tools of every in-progress instance
+        
+        Instances are processed in batches of batch_size. Each distinct call
+        (tool and arguments, e.g. the forecast for one location) is made once
+        per run, however many farmers share it: results are kept across
+        batches. Steps whose results changed are saved, and their user gets an
+        entry in workflow_updates. Instances with a run or step in progress are
+        skipped until the next refresh.
+        """
+        stats = {"batches": 0, "instances": 0, "instances_busy": 0, "tool_requests": 0, "tool_calls": 0,
+                 "steps_updated": 0, "updates_pushed": 0}
+        results: Dict[Tuple[str, str], Any] = {}
+        query: Dict[str, Any] = {"snapshot.status": WorkflowStatus.IN_PROGRESS.value, "snapshot.inputs": {"$ne": None}}
+        while True:
+            documents = await self.db.workflow_instances.find(
+                query, {"_id": 0, "instance_id": 1, "snapshot": 1}
+            ).sort("instance_id", 1).limit(batch_size).to_list(batch_size)
+            if not documents:
+                break
+            stats["batches"] += 1
+            await self._refresh_batch(documents, concurrency, stats, results)
+            if len(documents) < batch_size:
+                break
+            query["instance_id"] = {"$gt": documents[-1]["instance_id"]}
+        logger.info(f"Workflow refresh: {stats['instances']} instances, {stats['tool_calls']} tool calls "
+                    f"for {stats['tool_requests']} requests, {stats['updates_pushed']} updates")
+        return stats
+    
+    async def _refresh_batch(self, documents: List[Dict[str, Any]], concurrency: int, stats: Dict[str, Any],
+                             results: Dict[Tuple[str, str], Any]):
+        """Claim the batch's instances like a run would, so no step changes them mid-refresh"""
+        claims = await asyncio.gather(*(self._claim_instance(document["instance_id"]) for document in documents))
+        claimed = [document for document, ok in zip(documents, claims) if ok]
+        stats["instances_busy"] += len(documents) - len(claimed)
+        try:
+            await self._refresh_claimed(claimed, concurrency, stats, results)
+        finally:
+            await asyncio.gather(*(self._release_instance(document["instance_id"]) for document in claimed))
+    
+    async def _refresh_claimed(self, documents: List[Dict[str, Any]], concurrency: int, stats: Dict[str, Any],
+                               results: Dict[Tuple[str, str], Any]):
+        """Refresh claimed instances; results holds the calls already made this run and gains the new ones"""
+        calls: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}
+        plan = []
+        for document in documents:
+            workflow = await self._instance_for_refresh(document)
+            if not workflow or not workflow.inputs:
+                continue
+            stats["instances"] += 1
+            for step in workflow.steps:
+                if step.status != StepStatus.COMPLETED:
+                    continue
+                step_calls = []
+                for tool in step.tools_required:
+                    required = TIME_SENSITIVE_TOOLS.get(tool)
+                    if not required or not workflow.inputs.get(required):
+                        continue
+                    params = self._tool_params(tool, step, workflow.inputs)
+                    key = (tool, json.dumps(params, sort_keys=True, default=str))
+                    if key not in results:
+                        calls.setdefault(key, (tool, params))
+                    step_calls.append((tool, key))
+                if step_calls:
+                    plan.append((document["instance_id"], workflow, step, step_calls))
+                    stats["tool_requests"] += len(step_calls)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def call(key: Tuple[str, str], tool: str, params: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    return key, await self._call_tool(tool, params)
+                except Exception as e:
+                    logger.warning(f"Refresh call failed for {tool}: {e}")
+                    return key, None
+        
+        results.update(await asyncio.gather(*(call(key, tool, params) for key, (tool, params) in calls.items())))
+        stats["tool_calls"] += len(calls)
+        
+        changed: Dict[str, Tuple[AgriculturalWorkflow, List[str]]] = {}
+        for instance_id, workflow, step, step_calls in plan:
+            updated = dict(step.result_data or {})
+            for tool, key in step_calls:
+                result = results.get(key)
+                if result is not None and updated.get(TOOL_RESULT_KEYS[tool]) != result:
+                    updated[TOOL_RESULT_KEYS[tool]] = result
+            if updated != (step.result_data or {}):
+                step.result_data = updated
+                workflow.step_changed(step)
+                changed.setdefault(instance_id, (workflow, []))[1].append(step.step_id)
+        if not changed:
+            return
         
-        results = {}
+        async def persist(instance_id: str, workflow: AgriculturalWorkflow):
+            await self._publish_instance(instance_id, workflow)
+            await self._save_workflow_progress(instance_id, workflow)
         
-        for tool in step.tools_required:
+        await asyncio.gather(*(persist(instance_id, workflow) for instance_id, (workflow, _) in changed.items()))
+        stats["steps_updated"] += sum(len(step_ids) for _, step_ids in changed.values())
+        
+        now = datetime.now(timezone.utc)
+        updates = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": workflow.user_id,
+                "instance_id": instance_id,
+                "workflow_id": workflow.workflow_id,
+                "title": workflow.title,
+                "steps": step_ids,
+                "read": False,
+                "created_at": now
+            } for instance_id, (workflow, step_ids) in changed.items()
+        ]
+        try:
+            await self.db.workflow_updates.insert_many(updates)
+            stats["updates_pushed"] += len(updates)
+        except Exception as e:
+            logger.error(f"Failed to store workflow updates: {e}")
+    
+    async def _instance_for_refresh(self, document: Dict[str, Any]) -> Optional[AgriculturalWorkflow]:
+        """The live instance if the shared backend or this worker has one, else one
+        restored from the document; never added to the cache, so the refresh does
+        not evict the instances users are working on"""
+        instance_id = document["instance_id"]
+        if self.state.shared:
             try:
-                if tool == "soil-health":
-                    result = await self.mcp_client.call_tool("soil-health", step_data)
-                    results["soil_analysis"] = result
-                    
-                elif tool == "weather":
-                    weather_params = {
-                        "location": step_data.get("location", "India"),
-                        "days": step_data.get("forecast_days", 7),
-                        "include_farming_alerts": True
-                    }
-                    result = await self.mcp_client.call_tool("weather", weather_params)
-                    results["weather_forecast"] = result
-                    
-                elif tool == "crop-price":
-                    price_params = {
-                        "state": step_data.get("state"),
-                        "commodity": step_data.get("commodity"),
-                        "district": step_data.get("district")
-                    }
-                    result = await self.mcp_client.get_crop_price(**price_params)
-                    results["crop_prices"] = result
-                    
-                elif tool == "mandi-price":
-                    mandi_params = {
-                        "commodity": step_data.get("commodity"),
-                        "state": step_data.get("state"),
-                        "district": step_data.get("district"),
-                        "include_predictions": True
-                    }
-                    result = await self.mcp_client.call_tool("mandi-price", mandi_params)
-                    results["mandi_analysis"] = result
-                    
-                elif tool == "pest-identifier":
-                    pest_params = {
-                        "crop": step_data.get("crop"),
-                        "symptoms": step_data.get("symptoms", ""),
-                        "location": step_data.get("location")
-                    }
-                    result = await self.mcp_client.call_tool("pest-identifier", pest_params)
-                    results["pest_analysis"] = result
-                    
-                elif tool == "search":
-                    search_query = step_data.get("search_query", f"agricultural advice {step.title}")
-                    result = await self.mcp_client.search_web(search_query)
-                    results["research_data"] = result
-                    
+                snapshot = await self.state.get(INSTANCES_NAMESPACE, instance_id)
+                if snapshot:
+                    return self._restore_workflow(snapshot)
             except Exception as e:
-                logger.error(f"Tool execution failed for {tool}: {e}")
-                results[f"{tool}_error"] = str(e)
-        
-        return results
+                logger.error(f"Failed to load shared workflow state: {e}")
+        else:
+            workflow = self.user_workflow_instances.get(instance_id)
+            if workflow:
+                return workflow
+        snapshot = document.get("snapshot")
+        if not snapshot or snapshot["workflow_id"] not in self.workflows:
+            return None
+        if any(step.get("result_external") for step in snapshot["steps"]):
+            await self._load_external_results(instance_id, snapshot)
+        return self._restore_workflow(snapshot)
+    
+    async def get_workflow_updates(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Unread refresh notices for a user, marked read as they are returned"""
+        try:
+            updates = await self.db.workflow_updates.find(
+                {"user_id": user_id, "read": False}, {"_id": 0}
+            ).sort("created_at", -1).limit(limit).to_list(limit)
+            if updates:
+                await self.db.workflow_updates.update_many(
+                    {"id": {"$in": [update["id"] for update in updates]}}, {"$set": {"read": True}}
+                )
+            return updates
+        except Exception as e:
+            logger.error(f"Failed to get workflow updates: {e}")
+            return []
     
     def _find_step(self, workflow: AgriculturalWorkflow, step_id: str) -> Optional[WorkflowStep]:
         """Find a step by ID in the workflow"""
@@ -492,7 +946,12 @@ class WorkflowEngine:
             workflow.completed_at = datetime.now(timezone.utc)
     
     def _serialize_workflow(self, workflow: AgriculturalWorkflow) -> Dict[str, Any]:
-        """Serialize workflow for API response"""
+        """Serialize workflow for API response (cached until the workflow changes; do not mutate)"""
+        if workflow._serialized is None:
+            workflow._serialized = self._build_serialized_workflow(workflow)
+        return workflow._serialized
+    
+    def _build_serialized_workflow(self, workflow: AgriculturalWorkflow) -> Dict[str, Any]:
         return {
             "workflow_id": workflow.workflow_id,
             "title": workflow.title,
@@ -502,27 +961,213 @@ class WorkflowEngine:
             "status": workflow.status.value,
             "progress_percentage": workflow.progress_percentage,
             "estimated_total_time": workflow.estimated_total_time,
+            "steps": [step.template.serialize(step.status) for step in workflow.steps]
+        }
+    
+    async def get_workflow_instance(self, instance_id: str) -> Optional[AgriculturalWorkflow]:
+        """Instance by id
+        
+        With a shared backend the latest published state is loaded. Otherwise the
+        in-memory cache is used, falling back to the persisted snapshot in
+        db.workflow_instances (after eviction or a restart).
+        """
+        if self.state.shared:
+            try:
+                snapshot = await self.state.get(INSTANCES_NAMESPACE, instance_id)
+                if snapshot:
+                    workflow = self._restore_workflow(snapshot)
+                    self.user_workflow_instances[instance_id] = workflow
+                    return workflow
+            except Exception as e:
+                logger.error(f"Failed to load shared workflow state: {e}")
+        
+        workflow = self.user_workflow_instances.get(instance_id)
+        if workflow:
+            # Re-inserting restarts the TTL, so only idle instances expire
+            self.user_workflow_instances[instance_id] = workflow
+            return workflow
+        
+        # Concurrent misses for one instance share a single load, so they share one object
+        task = self._hydrating.get(instance_id)
+        if task is None:
+            task = asyncio.ensure_future(self._hydrate_instance(instance_id))
+            self._hydrating[instance_id] = task
+            task.add_done_callback(lambda _: self._hydrating.pop(instance_id, None))
+        return await asyncio.shield(task)
+    
+    async def _hydrate_instance(self, instance_id: str) -> Optional[AgriculturalWorkflow]:
+        """Rebuild an instance from its saved document"""
+        try:
+            document = await self.db.workflow_instances.find_one(
+                {"instance_id": instance_id},
+                {"_id": 0, "user_id": 1, "created_at": 1, "snapshot": 1, "workflow_data": 1}
+            )
+        except Exception as e:
+            logger.error(f"Failed to load workflow instance: {e}")
+            return None
+        if not document:
+            return None
+        
+        snapshot = document.get("snapshot") or self._snapshot_from_summary(document)
+        if not snapshot or snapshot["workflow_id"] not in self.workflows:
+            return None
+        if any(step.get("result_external") for step in snapshot["steps"]):
+            await self._load_external_results(instance_id, snapshot)
+        workflow = self._restore_workflow(snapshot)
+        self.user_workflow_instances[instance_id] = workflow
+        return workflow
+    
+    def _snapshot_from_summary(self, document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Snapshot from documents saved before snapshots were stored (statuses only)"""
+        summary = document.get("workflow_data")
+        if not summary:
+            return None
+        return {
+            "workflow_id": summary["workflow_id"],
+            "user_id": document.get("user_id"),
+            "status": summary["status"],
+            "current_step_index": 0,
+            "created_at": document.get("created_at"),
+            "started_at": None,
+            "completed_at": None,
+            "progress_percentage": summary.get("progress_percentage", 0),
+            "actual_time_spent": 0,
             "steps": [
-                {
-                    "step_id": step.step_id,
-                    "title": step.title,
-                    "description": step.description,
-                    "status": step.status.value,
-                    "tools_required": step.tools_required,
-                    "estimated_time": step.estimated_time,
-                    "optional": step.optional,
-                    "prerequisites": step.prerequisites
-                } for step in workflow.steps
+                {"step_id": step["step_id"], "status": step["status"], "result_data": {},
+                 "started_at": None, "completed_at": None, "notes": ""}
+                for step in summary.get("steps", [])
             ]
         }
     
+    async def _load_external_results(self, instance_id: str, snapshot: Dict[str, Any]):
+        """Fill in step results stored out of line"""
+        try:
+            stored = await self.db.workflow_step_results.find(
+                {"instance_id": instance_id}, {"_id": 0, "step_id": 1, "result_data": 1}
+            ).to_list(len(snapshot["steps"]))
+        except Exception as e:
+            logger.error(f"Failed to load workflow step results: {e}")
+            return
+        results = {entry["step_id"]: entry["result_data"] for entry in stored}
+        for step in snapshot["steps"]:
+            if step.get("result_external"):
+                step["result_data"] = results.get(step["step_id"])
+    
+    async def _publish_instance(self, instance_id: str, workflow: AgriculturalWorkflow):
+        """Write the full instance state to the shared backend"""
+        if not self.state.shared:
+            return
+        try:
+            await self.state.set(INSTANCES_NAMESPACE, instance_id, self._snapshot_workflow(workflow), ttl=INSTANCE_STATE_TTL)
+        except Exception as e:
+            logger.error(f"Failed to publish shared workflow state: {e}")
+    
+    def _snapshot_workflow(self, workflow: AgriculturalWorkflow) -> Dict[str, Any]:
+        """Complete, JSON-serializable instance state (unlike _serialize_workflow, includes results)
+        
+        Template text is left out and timestamps are epoch seconds.
+        """
+        return {
+            "workflow_id": workflow.workflow_id,
+            "user_id": workflow.user_id,
+            "status": workflow.status.value,
+            "current_step_index": workflow.current_step_index,
+            "created_at": workflow._created_at,
+            "started_at": workflow._started_at,
+            "completed_at": workflow._completed_at,
+            "progress_percentage": workflow.progress_percentage,
+            "actual_time_spent": workflow.actual_time_spent,
+            "inputs": workflow.inputs,
+            "steps": [self._snapshot_step(step) for step in workflow.steps]
+        }
+    
+    def _snapshot_step(self, step: WorkflowStep) -> Dict[str, Any]:
+        return {
+            "step_id": step.step_id,
+            "status": step.status.value,
+            "result_data": step.result_data,
+            "started_at": step._started_at,
+            "completed_at": step._completed_at,
+            "notes": step.notes
+        }
+    
+    def _restore_workflow(self, snapshot: Dict[str, Any]) -> AgriculturalWorkflow:
+        """Rebuild an instance from its template and a snapshot"""
+        def parse(value):
+            # Snapshots hold epoch seconds; older ones ISO strings, Mongo summaries datetimes
+            if isinstance(value, str):
+                return datetime.fromisoformat(value)
+            return value or None
+        
+        workflow = AgriculturalWorkflow(self.workflows[snapshot["workflow_id"]], snapshot["user_id"])
+        workflow.status = WorkflowStatus(snapshot["status"])
+        workflow.current_step_index = snapshot["current_step_index"]
+        workflow.created_at = parse(snapshot["created_at"])
+        workflow.started_at = parse(snapshot["started_at"])
+        workflow.completed_at = parse(snapshot["completed_at"])
+        workflow.progress_percentage = snapshot["progress_percentage"]
+        workflow.actual_time_spent = snapshot["actual_time_spent"]
+        workflow.inputs = snapshot.get("inputs")
+        
+        saved_steps = {step["step_id"]: step for step in snapshot["steps"]}
+        for step in workflow.steps:
+            saved = saved_steps.get(step.step_id)
+            if saved:
+                step.status = StepStatus(saved["status"])
+                step.result_data = saved["result_data"]
+                step.started_at = parse(saved["started_at"])
+                step.completed_at = parse(saved["completed_at"])
+                step.notes = saved["notes"]
+        # Restored state matches what is stored, so nothing is pending a save
+        workflow._dirty_steps = None
+        return workflow
+    
+    async def _ensure_indexes(self):
+        """Index the lookups done on every save; run once, before the first write"""
+        if self._indexes_ready:
+            return
+        self._indexes_ready = True
+        for collection_name, keys in (("workflow_instances", "instance_id"),
+                                      ("workflow_step_results", [("instance_id", 1), ("step_id", 1)]),
+                                      ("workflow_updates", [("user_id", 1), ("read", 1), ("created_at", -1)])):
+            try:
+                await getattr(self.db, collection_name).create_index(keys, name=f"{collection_name}_lookup", background=True)
+            except Exception as e:
+                logger.warning(f"Could not ensure index on {collection_name}: {e}")
+    
+    async def _persisted_steps(self, instance_id: str, steps: List[WorkflowStep]) -> List[Dict[str, Any]]:
+        """Stored form of steps; large results are written to workflow_step_results and left out"""
+        documents = []
+        external = []
+        for step in steps:
+            document = self._snapshot_step(step)
+            if step.result_data and len(json.dumps(step.result_data, default=str)) > self.inline_result_limit:
+                document["result_data"] = None
+                document["result_external"] = True
+                external.append(self.db.workflow_step_results.update_one(
+                    {"instance_id": instance_id, "step_id": step.step_id},
+                    {"$set": {"result_data": step.result_data, "updated_at": datetime.now(timezone.utc)}},
+                    upsert=True
+                ))
+            documents.append(document)
+        if external:
+            await asyncio.gather(*external)
+            self.persistence_stats["external_results"] += len(external)
+        return documents
+    
     async def _save_workflow_instance(self, instance_id: str, workflow: AgriculturalWorkflow):
-        """Save workflow instance to database"""
+        """Save the whole workflow instance to database (initial insert)"""
         try:
+            await self._ensure_indexes()
+            workflow.take_dirty_steps()
+            snapshot = self._snapshot_workflow(workflow)
+            snapshot["steps"] = await self._persisted_steps(instance_id, workflow.steps)
             workflow_data = {
                 "instance_id": instance_id,
                 "user_id": workflow.user_id,
                 "workflow_data": self._serialize_workflow(workflow),
+                # Compact full state (no template text) for rehydration
+                "snapshot": snapshot,
                 "created_at": workflow.created_at,
                 "updated_at": datetime.now(timezone.utc)
             }
@@ -532,10 +1177,52 @@ class WorkflowEngine:
                 {"$set": workflow_data},
                 upsert=True
             )
+            self.persistence_stats["full_writes"] += 1
             
         except Exception as e:
+            self.persistence_stats["write_errors"] += 1
             logger.error(f"Failed to save workflow instance: {e}")
     
+    async def _save_workflow_progress(self, instance_id: str, workflow: AgriculturalWorkflow):
+        """Save only the steps changed since the last save, plus the progress fields
+        
+        Falls back to a full save when the document has no snapshot yet (its
+        initial insert failed, or it predates snapshots).
+        """
+        dirty = workflow.take_dirty_steps()
+        try:
+            await self._ensure_indexes()
+            update = {
+                "snapshot.status": workflow.status.value,
+                "snapshot.progress_percentage": workflow.progress_percentage,
+                "snapshot.current_step_index": workflow.current_step_index,
+                "snapshot.completed_at": workflow._completed_at,
+                "snapshot.inputs": workflow.inputs,
+                "workflow_data.status": workflow.status.value,
+                "workflow_data.progress_percentage": workflow.progress_percentage,
+                "updated_at": datetime.now(timezone.utc)
+            }
+            documents = await self._persisted_steps(instance_id, [step for _, step in dirty])
+            for (index, step), document in zip(dirty, documents):
+                update[f"snapshot.steps.{index}"] = document
+                update[f"workflow_data.steps.{index}.status"] = step.status.value
+            
+            result = await self.db.workflow_instances.update_one(
+                {"instance_id": instance_id, "snapshot": {"$exists": True}},
+                {"$set": update}
+            )
+            if result.matched_count == 0:
+                await self._save_workflow_instance(instance_id, workflow)
+                return
+            self.persistence_stats["delta_writes"] += 1
+            
+        except Exception as e:
+            # Keep the steps marked so the next save retries them
+            for _, step in dirty:
+                workflow.step_changed(step)
+            self.persistence_stats["write_errors"] += 1
+            logger.error(f"Failed to save workflow progress: {e}")
+    
     async def get_user_workflows(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all workflow instances for a user"""
         try:
@@ -549,6 +1236,10 @@ class WorkflowEngine:
             logger.error(f"Failed to get user workflows: {e}")
             return []
     
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.persistence_stats, cached_instances=len(self.user_workflow_instances),
+                    batch_flush=self.batch_flush, inline_result_limit=self.inline_result_limit)
+    
     def get_available_workflows(self) -> List[Dict[str, Any]]:
         """Get list of all available workflow templates"""
         return [
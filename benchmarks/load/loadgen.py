@@ -0,0 +1,165 @@
+"""
+Closed-Loop Load Generator
+Drives /api/chat, /api/voice/transcribe and /api/media/upload at a fixed
+concurrency and reports throughput and latency percentiles per scenario.
+"""
+
+import asyncio
+import base64
+import io
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+import httpx
+import jwt
+
+# Realistic multilingual chat mix; price questions exercise the tool path
+CHAT_MESSAGES = [
+    "What is the wheat price in Punjab today?",
+    "पंजाब में गेहूं का भाव क्या है?",
+    "ਪੰਜਾਬ ਵਿੱਚ ਕਣਕ ਦਾ ਭਾਅ ਕੀ ਹੈ?",
+    "How much urea should I apply to paddy at tillering stage?",
+    "कपास में गुलाबी सुंडी का इलाज बताइए",
+    "நெல் பயிருக்கு எப்போது நீர் பாய்ச்ச வேண்டும்?",
+    "Best time to sow mustard in Haryana?",
+    "ಟೊಮೆಟೊ ಎಲೆ ಸುರುಳಿ ರೋಗಕ್ಕೆ ಪರಿಹಾರ ಏನು?",
+]
+
+DEFAULT_WEIGHTS = {"chat": 0.8, "voice": 0.1, "media": 0.1}
+
+
+def mint_token(user_id: str, secret: Optional[str] = None) -> str:
+    """Sign a bench user token with the backend's JWT secret"""
+    secret = secret or os.environ.get("JWT_SECRET", "your-secret-key-change-in-production")
+    payload = {
+        "user_id": user_id,
+        "email": f"{user_id}@bench.local",
+        "phone_number": "+910000000000",
+        "exp": datetime.now(timezone.utc) + timedelta(hours=2)
+    }
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def sample_image() -> bytes:
+    """Small in-memory JPEG for media uploads"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 240), (60, 140, 60)).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+@dataclass
+class ScenarioStats:
+    latencies: List[float] = field(default_factory=list)
+    status_codes: Dict[int, int] = field(default_factory=dict)
+    transport_errors: int = 0
+
+    def record(self, status: int, latency: float):
+        self.latencies.append(latency)
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        ok = sum(count for status, count in self.status_codes.items() if 200 <= status < 300)
+        return {
+            "requests": len(ordered) + self.transport_errors,
+            "ok": ok,
+            "errors": len(ordered) - ok + self.transport_errors,
+            "status_codes": {str(status): count for status, count in sorted(self.status_codes.items())},
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+        }
+
+
+class LoadGenerator:
+    """N workers issue requests back-to-back until the duration or request budget runs out"""
+
+    def __init__(self, base_url: str, concurrency: int = 16, duration: float = 30.0,
+                 max_requests: Optional[int] = None, weights: Optional[Dict[str, float]] = None,
+                 repeat_ratio: float = 0.2, users: int = 50, seed: int = 7, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.repeat_ratio = repeat_ratio
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.tokens = [mint_token(f"bench-user-{i}") for i in range(users)]
+        self.stats = {name: ScenarioStats() for name in self.weights}
+        self._issued = 0
+        self._image = None
+        self._audio = base64.b64encode(os.urandom(24000)).decode("ascii")
+
+    def _pick_scenario(self) -> str:
+        names = list(self.weights)
+        return self.rng.choices(names, weights=[self.weights[name] for name in names])[0]
+
+    def _chat_message(self) -> str:
+        message = self.rng.choice(CHAT_MESSAGES)
+        if self.rng.random() >= self.repeat_ratio:
+            # Unique suffix defeats the response cache for most requests
+            message = f"{message} ({uuid.uuid4().hex[:6]})"
+        return message
+
+    async def _issue(self, client: httpx.AsyncClient, scenario: str):
+        headers = {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+        if scenario == "chat":
+            return await client.post("/api/chat", json={"message": self._chat_message()}, headers=headers)
+        if scenario == "voice":
+            return await client.post(
+                "/api/voice/transcribe", json={"audio_data": self._audio, "language": "hi"}, headers=headers
+            )
+        if self._image is None:
+            self._image = sample_image()
+        return await client.post(
+            "/api/media/upload", files={"file": ("leaf.jpg", self._image, "image/jpeg")}, headers=headers
+        )
+
+    async def _worker(self, client: httpx.AsyncClient, deadline: float):
+        while time.monotonic() < deadline:
+            if self.max_requests is not None:
+                if self._issued >= self.max_requests:
+                    return
+                self._issued += 1
+
+            scenario = self._pick_scenario()
+            started = time.monotonic()
+            try:
+                response = await self._issue(client, scenario)
+                self.stats[scenario].record(response.status_code, time.monotonic() - started)
+            except httpx.HTTPError:
+                self.stats[scenario].transport_errors += 1
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            started = time.monotonic()
+            deadline = started + self.duration
+            await asyncio.gather(*(self._worker(client, deadline) for _ in range(self.concurrency)))
+            elapsed = time.monotonic() - started
+
+        total = sum(len(stats.latencies) for stats in self.stats.values())
+        return {
+            "concurrency": self.concurrency,
+            "elapsed_s": round(elapsed, 2),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "scenarios": {name: stats.summary(elapsed) for name, stats in self.stats.items() if stats.latencies
+                          or stats.transport_errors}
+        }
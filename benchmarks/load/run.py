@@ -0,0 +1,183 @@
+"""
+Offline Load Test for the Chat Pipeline
+
+Starts stub upstreams (MCP gateway, Cerebras, OpenRouter, Deepgram) with
+configurable latency distributions, launches the backend against them,
+drives /api/chat, /api/voice/transcribe and /api/media/upload at a fixed
+concurrency and reports throughput, p50/p95/p99 and event-loop lag.
+
+Usage (from the repo root):
+    python -m benchmarks.load.run --concurrency 32 --duration 60
+    python -m benchmarks.load.run --cerebras-latency "lognormal:0.4,0.5@0.02" --output run.json
+    python -m benchmarks.load.run --save-baseline benchmarks/load/baseline.json
+    python -m benchmarks.load.run --baseline benchmarks/load/baseline.json --tolerance 0.15
+
+Compared against a baseline the run exits non-zero when any scenario's
+p95 or throughput regresses by more than the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from .loadgen import LoadGenerator
+from .stubs import StubCluster, STUB_NAMES
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 90.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get(f"{base_url}/api/health")
+                if response.status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Backend at {base_url} did not become healthy within {timeout}s")
+
+
+async def fetch_json(base_url: str, path: str) -> Dict[str, Any]:
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(f"{base_url}{path}")
+            return response.json()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def start_backend(port: int, stub_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "MONGO_URL": os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+        "DB_NAME": os.environ.get("BENCH_DB_NAME", "farmchat_bench"),
+        **stub_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load.serve_backend", "--port", str(port)],
+        cwd=str(REPO_ROOT),
+        env=env
+    )
+
+
+def compare_with_baseline(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List regressions beyond tolerance in p95 latency or throughput per scenario"""
+    regressions = []
+    for name, current in result["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"\nConcurrency {result['concurrency']}, {result['total_requests']} requests in {result['elapsed_s']}s "
+          f"({result['throughput_rps']} rps)")
+    print(f"{'scenario':<8} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in result["scenarios"].items():
+        print(f"{name:<8} {stats['requests']:>6} {stats['errors']:>6} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+    lag = result.get("event_loop_lag", {})
+    if lag.get("samples"):
+        print(f"event-loop lag: mean {lag['mean_ms']}ms, p99 {lag['p99_ms']}ms, max {lag['max_ms']}ms")
+
+
+async def run(args) -> int:
+    latencies = {name: getattr(args, f"{name}_latency") for name in STUB_NAMES}
+    stubs = StubCluster(latencies, base_port=args.stub_base_port, seed=args.seed)
+    await stubs.start()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    backend = start_backend(args.port, stubs.backend_env())
+    try:
+        await wait_until_healthy(base_url)
+
+        weights = {"chat": args.chat_weight, "voice": args.voice_weight, "media": args.media_weight}
+        weights = {name: weight for name, weight in weights.items() if weight > 0}
+
+        if args.warmup > 0:
+            await LoadGenerator(base_url, min(4, args.concurrency), args.warmup, weights=weights,
+                                seed=args.seed + 1).run()
+        await fetch_json(base_url, "/__bench/loop-lag?reset=true")
+
+        generator = LoadGenerator(
+            base_url, args.concurrency, args.duration, max_requests=args.requests,
+            weights=weights, repeat_ratio=args.repeat_ratio, seed=args.seed
+        )
+        result = await generator.run()
+        result["event_loop_lag"] = await fetch_json(base_url, "/__bench/loop-lag")
+        result["stub_latency"] = latencies
+        result["stubs"] = stubs.get_stats()
+        result["server_metrics"] = await fetch_json(base_url, "/api/performance-metrics")
+    finally:
+        backend.terminate()
+        try:
+            backend.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+        await stubs.stop()
+
+    print_report(result)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(result, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline load test for the chat pipeline")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of unmeasured warm-up load")
+    parser.add_argument("--chat-weight", type=float, default=0.8)
+    parser.add_argument("--voice-weight", type=float, default=0.1)
+    parser.add_argument("--media-weight", type=float, default=0.1)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="share of chat messages that repeat")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--stub-base-port", type=int, default=18800)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mcp-latency", default="lognormal:0.25,0.4")
+    parser.add_argument("--cerebras-latency", default="lognormal:0.35,0.3")
+    parser.add_argument("--openrouter-latency", default="lognormal:0.9,0.4")
+    parser.add_argument("--deepgram-latency", default="lognormal:0.5,0.3")
+    parser.add_argument("--output", help="write the full JSON result here")
+    parser.add_argument("--baseline", help="compare against a previously saved result")
+    parser.add_argument("--save-baseline", help="save this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    sys.exit(asyncio.run(run(parse_args(argv))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Backend Launcher for Load Tests
+Runs backend/server.py under uvicorn with an event-loop lag probe mounted
+at /__bench/loop-lag. Upstream URLs are taken from the environment, which
+the harness points at the local stubs.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import uvicorn
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires - the time the loop spent blocked"""
+
+    def __init__(self, interval: float = 0.05, window_size: int = 20000):
+        self.interval = interval
+        self.samples = deque(maxlen=window_size)
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def reset(self):
+        self.samples.clear()
+
+    def report(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"samples": 0}
+
+        def pct(fraction):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 2)
+
+        return {
+            "samples": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p50_ms": pct(0.5),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "measured_at": time.time()
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the backend with an event-loop lag probe")
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server  # noqa: E402 - needs the stub environment set first
+
+    monitor = LoopLagMonitor()
+
+    @server.app.on_event("startup")
+    async def start_lag_monitor():
+        monitor.start()
+
+    @server.app.get("/__bench/loop-lag")
+    async def loop_lag(reset: bool = False):
+        report = monitor.report()
+        if reset:
+            monitor.reset()
+        return report
+
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
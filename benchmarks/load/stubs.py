@@ -0,0 +1,314 @@
+"""
+Local Stub Upstreams for Load Testing
+In-process stand-ins for the MCP gateway, the OpenAI-compatible LLM
+providers (Cerebras, OpenRouter) and Deepgram, each with a configurable
+latency distribution and error rate, so the backend can be benchmarked
+offline and reproducibly.
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_NAMES = ["mcp", "cerebras", "openrouter", "deepgram"]
+
+
+@dataclass
+class LatencyModel:
+    """
+    Latency distribution for a stub, parsed from a short spec string
+
+    Specs: "fixed:0.2", "uniform:0.1,0.4", "normal:0.3,0.05",
+    "lognormal:0.3,0.5" (median seconds, sigma). An optional "@0.02"
+    suffix adds an error rate, e.g. "lognormal:0.3,0.5@0.02".
+    """
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+    error_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        error_rate = 0.0
+        if "@" in spec:
+            spec, rate = spec.split("@", 1)
+            error_rate = float(rate)
+        kind, _, raw = spec.partition(":")
+        params = tuple(float(value) for value in raw.split(",") if value) or (0.0,)
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        return cls(kind, params, error_rate)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.params[:2])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params[:2]))
+        if self.kind == "lognormal":
+            median, sigma = self.params[:2]
+            return median * rng.lognormvariate(0.0, sigma)
+        return self.params[0]
+
+    def should_fail(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+class StubState:
+    """Shared latency model, RNG and hit counters for one stub server"""
+
+    def __init__(self, latency: LatencyModel, seed: int):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.hits: Dict[str, int] = {}
+        self.errors = 0
+
+    async def delay(self, route: str) -> bool:
+        """Sleep for a sampled latency; return True if this call should fail"""
+        self.hits[route] = self.hits.get(route, 0) + 1
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.latency.should_fail(self.rng):
+            self.errors += 1
+            return True
+        return False
+
+
+# ==================== MCP Gateway Stub ====================
+
+def _price_records(state: str, commodity: str, count: int = 12) -> List[Dict[str, Any]]:
+    base = 2000 + (sum(map(ord, commodity)) % 10) * 150
+    return [
+        {
+            "state": state,
+            "district": f"District {i % 4 + 1}",
+            "market": f"Mandi {i + 1}",
+            "commodity": commodity,
+            "variety": "Other",
+            "arrival_date": "01/10/2025",
+            "min_price": base - 100 + i * 5,
+            "max_price": base + 150 + i * 5,
+            "modal_price": base + i * 5
+        }
+        for i in range(count)
+    ]
+
+
+def create_mcp_app(state: StubState) -> FastAPI:
+    app = FastAPI(title="MCP gateway stub")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/rpc")
+    async def rpc(request: Request):
+        return {"jsonrpc": "2.0", "id": 1, "result": ["crop-price", "search", "soil-health", "weather",
+                                                      "pest-identifier", "mandi-price", "scheme-tool"]}
+
+    @app.post("/tools/{tool_name}")
+    async def call_tool(tool_name: str, request: Request):
+        arguments = await request.json()
+        if await state.delay(tool_name):
+            return JSONResponse({"success": False, "error": "stub upstream error"}, status_code=502)
+
+        if tool_name == "crop-price":
+            data = {"records": _price_records(arguments.get("state", "Punjab"), arguments.get("commodity", "Wheat"))}
+        elif tool_name == "search":
+            data = {"results": [
+                {"title": f"Result {i} for {arguments.get('query', '')}", "text": "Lorem ipsum agricultural update. " * 20}
+                for i in range(arguments.get("num_results", 5))
+            ]}
+        elif tool_name == "weather":
+            data = {"forecast": [{"day": d, "temp_max": 31 + d, "rain_mm": d % 3 * 4} for d in range(7)]}
+        else:
+            data = {"tool": tool_name, "arguments": arguments, "summary": "stub result"}
+        return {"success": True, "data": data}
+
+    return app
+
+
+# ==================== OpenAI-compatible LLM Stub ====================
+
+PRICE_WORDS = ("price", "rate", "bhav", "भाव", "ਭਾਅ", "mandi")
+
+ANSWER_TEXT = (
+    "Wheat prices in Punjab mandis are around 2,275 rupees per quintal this week. "
+    "Sell in smaller lots if arrivals are high, keep grain dry and check the nearest mandi before transport."
+)
+
+
+def _last_user_message(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            return content if isinstance(content, str) else json.dumps(content)
+    return ""
+
+
+def _stub_completion(messages: List[Dict[str, Any]]) -> str:
+    """Answer with the shape each pipeline call class expects"""
+    system = messages[0].get("content", "") if messages else ""
+    user = _last_user_message(messages)
+
+    if isinstance(messages[-1].get("content"), list):
+        return json.dumps({
+            "analysis_type": "crop_health", "diagnosis": "Leaf rust on wheat", "confidence_score": 0.82,
+            "severity": "medium", "treatment": "Spray propiconazole 25 EC", "cost_estimate": "₹400 per acre",
+            "additional_info": {}
+        })
+    if isinstance(system, str) and "data synthesis specialist" in system:
+        return json.dumps({
+            "key_insights": ["Prices stable", "Rain expected"], "data_correlations": [],
+            "risk_factors": ["Storage moisture"], "opportunities": ["Sell next week"],
+            "confidence_score": 0.8, "synthesis_summary": "Stable prices"
+        })
+    if isinstance(system, str) and "Respond in JSON format" in system:
+        wants_price = any(word in user.lower() for word in PRICE_WORDS)
+        return json.dumps({
+            "is_agricultural": True, "language": "en",
+            "complexity_level": "moderate" if wants_price else "simple", "reasoning_chain_depth": 2,
+            "needs_crop_price": wants_price, "needs_web_search": False, "needs_soil_health": False,
+            "needs_weather": False, "needs_pest_identifier": False, "needs_mandi_price": False,
+            "crop_price_params": {"state": "Punjab", "commodity": "Wheat", "district": ""} if wants_price else {},
+            "search_query": "", "reasoning_steps": [], "synthesis_requirements": ["price trend"] if wants_price else [],
+            "confidence": 0.9, "steps": []
+        })
+    return ANSWER_TEXT
+
+
+def create_llm_app(state: StubState, name: str) -> FastAPI:
+    app = FastAPI(title=f"{name} LLM stub")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if await state.delay("chat/completions"):
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429)
+
+        content = _stub_completion(body.get("messages", []))
+        if not body.get("stream"):
+            return {
+                "id": f"stub-{time.time_ns()}",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4}
+            }
+
+        async def events():
+            for start in range(0, len(content), 16):
+                chunk = {"choices": [{"index": 0, "delta": {"content": content[start:start + 16]}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0.002)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+# ==================== Deepgram Stub ====================
+
+def create_deepgram_app(state: StubState) -> FastAPI:
+    app = FastAPI(title="Deepgram stub")
+
+    @app.post("/v1/listen")
+    async def listen(request: Request):
+        await request.body()
+        if await state.delay("listen"):
+            return JSONResponse({"err_msg": "stub upstream error"}, status_code=500)
+        return {
+            "metadata": {"request_id": f"stub-{time.time_ns()}", "duration": 3.2, "channels": 1},
+            "results": {"channels": [{
+                "detected_language": "hi",
+                "alternatives": [{"transcript": "गेहूं का भाव क्या है", "confidence": 0.93, "words": []}]
+            }]}
+        }
+
+    return app
+
+
+# ==================== Runner ====================
+
+class StubCluster:
+    """Runs every stub upstream on localhost inside the current event loop"""
+
+    def __init__(self, latencies: Dict[str, str], base_port: int = 18800, seed: int = 42):
+        self.states = {
+            name: StubState(LatencyModel.parse(latencies.get(name, "fixed:0")), seed + index)
+            for index, name in enumerate(STUB_NAMES)
+        }
+        self.ports = {name: base_port + index for index, name in enumerate(self.states)}
+        self._servers: List[uvicorn.Server] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def _apps(self) -> Dict[str, FastAPI]:
+        return {
+            "mcp": create_mcp_app(self.states["mcp"]),
+            "cerebras": create_llm_app(self.states["cerebras"], "cerebras"),
+            "openrouter": create_llm_app(self.states["openrouter"], "openrouter"),
+            "deepgram": create_deepgram_app(self.states["deepgram"]),
+        }
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.ports[name]}"
+
+    def backend_env(self) -> Dict[str, str]:
+        """Environment pointing the backend at the stubs"""
+        return {
+            "MCP_GATEWAY_URL": self.url("mcp"),
+            "CEREBRAS_API_KEY": "stub-key",
+            "CEREBRAS_BASE_URL": f"{self.url('cerebras')}/v1/chat/completions",
+            "OPENROUTER_API_KEY": "stub-key",
+            "OPENROUTER_BASE_URL": f"{self.url('openrouter')}/v1/chat/completions",
+            "DEEPGRAM_API_KEY": "stub-key",
+            "DEEPGRAM_BASE_URL": self.url("deepgram"),
+            # Every loadgen request comes from 127.0.0.1; the IP bucket would measure 429s, not throughput
+            "RATE_LIMIT_ENABLED": "false",
+        }
+
+    async def start(self):
+        for name, app in self._apps().items():
+            config = uvicorn.Config(app, host="127.0.0.1", port=self.ports[name], log_level="warning", access_log=False)
+            server = uvicorn.Server(config)
+            self._servers.append(server)
+            self._tasks.append(asyncio.create_task(server.serve()))
+        while not all(server.started for server in self._servers):
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        for server in self._servers:
+            server.should_exit = True
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: {"hits": state.hits, "errors": state.errors} for name, state in self.states.items()}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the stubs standalone, e.g. to point a manually started backend at them"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run local stub upstreams")
+    parser.add_argument("--base-port", type=int, default=18800)
+    for name in STUB_NAMES:
+        parser.add_argument(f"--{name}-latency", default="lognormal:0.15,0.4")
+    args = parser.parse_args(argv)
+
+    cluster = StubCluster({name: getattr(args, f"{name}_latency") for name in STUB_NAMES}, args.base_port)
+
+    async def serve():
+        await cluster.start()
+        for key, value in cluster.backend_env().items():
+            print(f"{key}={value}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
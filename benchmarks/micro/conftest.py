@@ -0,0 +1,11 @@
+"""
+Shared setup for the CPU hot-path micro-benchmarks
+Puts backend/ on the import path; the benchmarked modules import without
+live services or server.py.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,66 @@
+"""
+Realistic multilingual inputs for the micro-benchmarks
+Farmer queries as they arrive from the chat/voice clients, and LLM
+answers of typical length for the response-side hot paths.
+"""
+
+QUERIES = {
+    "en": "What is the current price of wheat in Ludhiana mandi and when should I sell my crop?",
+    "hi": "लुधियाना मंडी में गेहूं का आज का भाव क्या है और मुझे अपनी फसल कब बेचनी चाहिए?",
+    "hi_romanized": "mere khet mein gehun ki fasal mein peele patte aa rahe hain, kaunsi khad daalun?",
+    "pa": "ਮੇਰੀ ਕਣਕ ਦੀ ਫ਼ਸਲ ਵਿੱਚ ਪੀਲੀ ਕੁੰਗੀ ਲੱਗ ਗਈ ਹੈ, ਕਿਹੜੀ ਦਵਾਈ ਛਿੜਕਾਂ?",
+    "ta": "என் நெல் வயலில் இலை சுருட்டு புழு தாக்குதல் உள்ளது, என்ன மருந்து தெளிக்க வேண்டும்?",
+    "te": "నా పత్తి పంటలో గులాబీ పురుగు వచ్చింది, ఏ మందు వాడాలి?",
+    "bn": "আমার ধানের জমিতে পাতা হলুদ হয়ে যাচ্ছে, কোন সার দেব?",
+    "mr": "माझ्या सोयाबीन पिकावर खोडकिडा आला आहे, कोणते औषध फवारावे?",
+    "gu": "મારા કપાસના પાકમાં ગુલાબી ઈયળ આવી છે, કઈ દવા છાંટવી?",
+    "kn": "ನನ್ನ ಟೊಮೆಟೊ ಬೆಳೆಯಲ್ಲಿ ಎಲೆ ಸುರುಳಿ ರೋಗ ಬಂದಿದೆ, ಏನು ಮಾಡಬೇಕು?",
+    "ml": "എന്റെ തെങ്ങിൽ കൊമ്പൻ ചെല്ലി ആക്രമണം ഉണ്ട്, എന്ത് ചെയ്യണം?",
+}
+
+# Plain-text answers of the length the 150-word response rules produce
+RESPONSES = {
+    "en": (
+        "Wheat is selling at 2,275 to 2,350 rupees per quintal in Ludhiana mandi this week. "
+        "Arrivals are high, so prices may dip slightly over the next few days. If your grain moisture "
+        "is below 12 percent you can store it safely and sell in smaller lots. Apply fertilizer and "
+        "irrigation as per soil test before the next crop, and watch for pest pressure in stored grain. "
+        "Check the MSP procurement centre timings before transporting your crop."
+    ),
+    "hi": (
+        "इस सप्ताह लुधियाना मंडी में गेहूं 2,275 से 2,350 रुपये प्रति क्विंटल बिक रहा है। आवक ज्यादा है, "
+        "इसलिए अगले कुछ दिनों में भाव थोड़ा गिर सकता है। अगर अनाज में नमी 12 प्रतिशत से कम है तो आप "
+        "इसे सुरक्षित रख सकते हैं और थोड़ा थोड़ा करके बेच सकते हैं। अगली फसल से पहले मिट्टी जांच के अनुसार "
+        "fertilizer और irrigation करें और भंडारित अनाज में pest का ध्यान रखें।"
+    ),
+    "pa": (
+        "ਇਸ ਹਫ਼ਤੇ ਲੁਧਿਆਣਾ ਮੰਡੀ ਵਿੱਚ ਕਣਕ 2,275 ਤੋਂ 2,350 ਰੁਪਏ ਪ੍ਰਤੀ ਕੁਇੰਟਲ ਵਿਕ ਰਹੀ ਹੈ। ਆਮਦ ਜ਼ਿਆਦਾ ਹੈ, "
+        "ਇਸ ਲਈ ਭਾਅ ਥੋੜ੍ਹਾ ਘੱਟ ਸਕਦਾ ਹੈ। ਜੇ ਦਾਣਿਆਂ ਵਿੱਚ ਨਮੀ 12 ਪ੍ਰਤੀਸ਼ਤ ਤੋਂ ਘੱਟ ਹੈ ਤਾਂ ਤੁਸੀਂ ਇਸਨੂੰ ਸੰਭਾਲ ਸਕਦੇ ਹੋ। "
+        "ਅਗਲੀ ਫ਼ਸਲ ਤੋਂ ਪਹਿਲਾਂ fertilizer ਅਤੇ irrigation ਮਿੱਟੀ ਦੀ ਜਾਂਚ ਅਨੁਸਾਰ ਕਰੋ ਅਤੇ pest ਦਾ ਧਿਆਨ ਰੱਖੋ।"
+    ),
+    "ta": (
+        "இந்த வாரம் நெல் குவிண்டாலுக்கு 2,183 ரூபாய்க்கு விற்கப்படுகிறது. இலை சுருட்டு புழுவுக்கு "
+        "ஏக்கருக்கு 400 மில்லி குளோரன்ட்ரானிலிப்ரோல் தெளிக்கவும். fertilizer அளவை மண் பரிசோதனைப்படி "
+        "வைக்கவும், irrigation இடைவெளியை குறைக்காதீர்கள், pest கண்காணிப்பை தொடரவும்."
+    ),
+}
+
+# LLM output with the markdown the response rules forbid but models still emit
+MARKDOWN_RESPONSE = (
+    "## Wheat price update\n\n"
+    "**Current price:** 2,275 - 2,350 Rs/quintal in *Ludhiana* mandi.\n\n"
+    "- Arrivals are __high__ this week\n"
+    "- Prices may dip for a few days\n"
+    "1. Dry grain below 12% moisture\n"
+    "2. Sell in `smaller lots`\n\n\n"
+    "```\nmodal_price: 2300\n```\n"
+    "_Check MSP centre timings before transport._"
+)
+
+RAG_QUERIES = [
+    ("How to control yellow rust in wheat?", "wheat"),
+    ("best irrigation schedule for paddy transplanting", "rice"),
+    ("pink bollworm management in cotton", "cotton"),
+    ("which fertilizer for better yield", None),
+    ("soil testing and organic farming practices", None),
+]
@@ -0,0 +1,82 @@
+"""
+Micro-benchmarks for the pure-Python paths run on every chat request
+
+Run and compare against the stored baseline (from the repo root):
+    python -m pytest benchmarks/micro --benchmark-storage=benchmarks/micro/baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Record a new baseline after an intentional change:
+    python -m pytest benchmarks/micro --benchmark-storage=benchmarks/micro/baselines \
+        --benchmark-save=baseline
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from cultural_context import CulturalContextManager  # noqa: E402
+from agricultural_rag import AgriculturalRAG  # noqa: E402
+from language_id import identify_language  # noqa: E402
+from text_helpers import clean_markdown, extract_crop_from_message, create_cache_key  # noqa: E402
+
+from .inputs import QUERIES, RESPONSES, MARKDOWN_RESPONSE, RAG_QUERIES  # noqa: E402
+
+PUNJAB_FARMER = {"location": "Ludhiana, Punjab", "farm_size": "small"}
+
+
+@pytest.fixture(scope="module")
+def cultural_context():
+    return CulturalContextManager()
+
+
+@pytest.fixture(scope="module")
+def agricultural_rag():
+    return AgriculturalRAG()
+
+
+@pytest.mark.parametrize("language", list(QUERIES))
+def test_detect_language_and_context(benchmark, cultural_context, language):
+    benchmark.group = "detect_language_and_context"
+    context = benchmark(cultural_context.detect_language_and_context, QUERIES[language], PUNJAB_FARMER)
+    assert context.language
+
+
+@pytest.mark.parametrize("language", list(QUERIES))
+def test_identify_language(benchmark, language):
+    benchmark.group = "identify_language"
+    guess = benchmark(identify_language, QUERIES[language])
+    assert guess.language == language.split("_")[0]
+
+
+@pytest.mark.parametrize("language", list(RESPONSES))
+def test_adapt_response(benchmark, cultural_context, language):
+    benchmark.group = "adapt_response"
+    query = QUERIES[language]
+    context = cultural_context.detect_language_and_context(query, PUNJAB_FARMER)
+    adapted = benchmark(cultural_context.adapt_response, RESPONSES[language], context, "price")
+    assert adapted
+
+
+@pytest.mark.parametrize("query,crop", RAG_QUERIES, ids=[crop or "generic" for _, crop in RAG_QUERIES])
+def test_retrieve_relevant_knowledge(benchmark, agricultural_rag, query, crop):
+    benchmark.group = "retrieve_relevant_knowledge"
+    benchmark(agricultural_rag.retrieve_relevant_knowledge, query, crop)
+
+
+def test_clean_markdown(benchmark):
+    benchmark.group = "clean_markdown"
+    cleaned = benchmark(clean_markdown, MARKDOWN_RESPONSE)
+    assert "**" not in cleaned
+
+
+@pytest.mark.parametrize("language", ["en", "hi", "pa", "ta"])
+def test_extract_crop_from_message(benchmark, language):
+    benchmark.group = "extract_crop_from_message"
+    benchmark(extract_crop_from_message, QUERIES[language])
+
+
+@pytest.mark.parametrize("language", ["en", "hi", "pa", "ta"])
+def test_create_cache_key(benchmark, language):
+    benchmark.group = "create_cache_key"
+    key = benchmark(create_cache_key, "bench-user", QUERIES[language], language)
+    assert key.startswith("response:")
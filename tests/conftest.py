@@ -0,0 +1,10 @@
+"""
+Shared setup for the backend unit tests
+Puts backend/ on the import path so its modules can be imported directly.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,105 @@
+"""
+Token bucket accounting: refill, per-request cost, post-hoc charges,
+multi-scope checks, bucket eviction and client IP resolution.
+"""
+
+import asyncio
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (
+    BucketLimit, InMemoryRateLimitBackend, RateLimiter, RateLimitMiddleware, SCOPE_IP, SCOPE_USER
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake)
+    return fake
+
+
+def make_limiter(**limits):
+    return RateLimiter({scope: BucketLimit(*limit) for scope, limit in limits.items()})
+
+
+def check(limiter, identities, cost):
+    return asyncio.run(limiter.check(identities, cost))
+
+
+def test_cost_drains_bucket_and_refills_over_time(clock):
+    limiter = make_limiter(ip=(10, 1))  # 10 tokens, 1 per second
+    assert check(limiter, {SCOPE_IP: "1.2.3.4"}, 5).allowed
+    assert check(limiter, {SCOPE_IP: "1.2.3.4"}, 5).allowed
+    refused = check(limiter, {SCOPE_IP: "1.2.3.4"}, 5)
+    assert not refused.allowed
+    assert refused.retry_after == pytest.approx(5)
+
+    clock.now += 5
+    assert check(limiter, {SCOPE_IP: "1.2.3.4"}, 5).allowed
+
+
+def test_refill_is_capped_at_capacity(clock):
+    limiter = make_limiter(ip=(10, 1))
+    assert check(limiter, {SCOPE_IP: "1.2.3.4"}, 10).allowed
+    clock.now += 3600
+    assert check(limiter, {SCOPE_IP: "1.2.3.4"}, 10).allowed
+    assert not check(limiter, {SCOPE_IP: "1.2.3.4"}, 1).allowed
+
+
+def test_any_short_scope_limits_the_request(clock):
+    limiter = make_limiter(user=(2, 1), ip=(100, 1))
+    identities = {SCOPE_USER: "farmer", SCOPE_IP: "1.2.3.4"}
+    assert check(limiter, identities, 2).allowed
+    decision = check(limiter, identities, 2)
+    assert not decision.allowed
+    assert limiter.stats["limited_by_scope"] == {SCOPE_USER: 1}
+    # A different user behind the same IP is unaffected
+    assert check(limiter, {SCOPE_USER: "other", SCOPE_IP: "1.2.3.4"}, 2).allowed
+
+
+def test_post_hoc_charge_overdraws_up_to_capacity(clock):
+    limiter = make_limiter(user=(10, 1))
+    assert check(limiter, {SCOPE_USER: "farmer"}, 1).allowed
+    asyncio.run(limiter.charge(SCOPE_USER, "farmer", 100))
+    tokens, _ = limiter.backend.buckets["user:farmer"]
+    assert tokens == -10
+    clock.now += 10
+    assert not check(limiter, {SCOPE_USER: "farmer"}, 1).allowed
+
+
+def test_disabled_limiter_allows_everything(clock):
+    limiter = RateLimiter({SCOPE_IP: BucketLimit(1, 1)}, enabled=False)
+    for _ in range(5):
+        assert check(limiter, {SCOPE_IP: "1.2.3.4"}, 1).allowed
+
+
+def test_least_recently_used_buckets_are_evicted(clock):
+    backend = InMemoryRateLimitBackend(max_buckets=3)
+    limit = BucketLimit(10, 1)
+    for key in ["a", "b", "c", "a", "d"]:
+        asyncio.run(backend.acquire(key, 1, limit, {}))
+    assert list(backend.buckets) == ["c", "a", "d"]
+
+
+@pytest.mark.parametrize("forwarded,hops,expected", [
+    # The client-supplied left part of the header is ignored
+    ("6.6.6.6, 1.2.3.4", 1, "1.2.3.4"),
+    ("6.6.6.6, 1.2.3.4, 10.0.0.1", 2, "1.2.3.4"),
+    (None, 1, "127.0.0.1"),
+    ("1.2.3.4", 0, "127.0.0.1"),
+])
+def test_client_ip_counts_trusted_hops_from_the_right(forwarded, hops, expected):
+    middleware = RateLimitMiddleware(None, make_limiter(), [], lambda header: None, lambda phone: phone, {},
+                                     trusted_proxy_hops=hops)
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    assert middleware._client_ip({"client": ("127.0.0.1", 5000)}, headers) == expected
@@ -0,0 +1,74 @@
+"""
+Template answer matching: only the question forms a template answers are
+deflected from the LLM, everything else falls through.
+"""
+
+import pytest
+
+from agricultural_rag import AgriculturalRAG
+from schemes_database import SchemesDatabase
+from template_answers import (
+    TemplateAnswerEngine, INTENT_CROP_CALENDAR, INTENT_FERTILIZER, INTENT_SCHEME_INFO
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return TemplateAnswerEngine(AgriculturalRAG(), SchemesDatabase(), ["en", "hi", "pa"])
+
+
+@pytest.mark.parametrize("message,intent,subject", [
+    ("When to sow wheat?", INTENT_CROP_CALENDAR, "wheat"),
+    ("गेहूं की बुवाई कब करें", INTENT_CROP_CALENDAR, "wheat"),
+    ("ਕਣਕ ਦੀ ਬਿਜਾਈ ਕਦੋਂ ਕਰੀਏ", INTENT_CROP_CALENDAR, "wheat"),
+    ("How much fertilizer for wheat?", INTENT_FERTILIZER, "wheat"),
+    ("धान में कितनी खाद डालें", INTENT_FERTILIZER, "rice"),
+    ("What is PM Kisan?", INTENT_SCHEME_INFO, "pm_kisan"),
+    ("crop insurance benefits", INTENT_SCHEME_INFO, "pmfby"),
+])
+def test_answers_supported_question_forms(engine, message, intent, subject):
+    answer = engine.match(message, "en")
+    assert answer is not None
+    assert (answer["intent"], answer["subject"]) == (intent, subject)
+
+
+@pytest.mark.parametrize("message", [
+    # Pesticides and herbicides are not fertilizer questions
+    "What dose of pesticide for wheat?",
+    "herbicide dose for paddy weeds",
+    "fungicide spray quantity for cotton",
+    # Diagnostic questions need the LLM
+    "wheat harvest was poor, what went wrong",
+    "why is my paddy not growing after sowing",
+    # Sowing technique rather than timing
+    "How to plant wheat seeds in clay soil?",
+    # Fertilizer mentioned without asking for a dose
+    "is urea good for wheat",
+    # Product quantities: 60 kg of nitrogen is about 130 kg of urea, not 60
+    "How much urea for wheat?",
+    "how many bags of DAP per acre for paddy",
+    "धान में कितना यूरिया डालें",
+    "ਕਣਕ ਵਿੱਚ ਕਿੰਨਾ ਯੂਰੀਆ ਪਾਈਏ",
+    "how much fertilizer and urea for wheat",
+    # The farmer's own payment status
+    "Is my PM Kisan installment credited?",
+    "पीएम किसान की किस्त नहीं आई",
+    # Scheme named without an information question
+    "pm kisan",
+])
+def test_falls_through_to_llm(engine, message):
+    assert engine.match(message, "en") is None
+
+
+@pytest.mark.parametrize("message,language,note", [
+    # The knowledge base gives wheat's basal dose only
+    ("How much fertilizer for wheat?", "en", "basal dose"),
+    ("गेहूं में कितनी खाद डालें", "hi", "बेसल मात्रा"),
+    # Paddy's dose is applied in splits
+    ("How much fertilizer for paddy?", "en", "split doses"),
+    ("ਝੋਨੇ ਵਿੱਚ ਕਿੰਨੀ ਖਾਦ ਪਾਈਏ", "pa", "ਕਿਸ਼ਤਾਂ"),
+])
+def test_fertilizer_answer_keeps_schedule(engine, message, language, note):
+    answer = engine.match(message, language)
+    assert answer is not None
+    assert note in answer["message"]